@@ -0,0 +1,31 @@
+import * as fs from 'fs';
+import * as path from 'path';
+import { renderTheCannonAlertEmail, renderTheCannonDigestEmail } from './emails/renderEmail';
+
+/**
+ * Renders the golden-output fixtures for functions/tests/test_email_templates.py.
+ * Each case in cases.json is rendered through the React Email components and
+ * written next to it as <name>.html; the Python test fills the precompiled
+ * templates with the same props and compares the bytes.
+ *
+ * Usage: yarn build:fixtures
+ */
+
+const FIXTURES_DIR = path.resolve(__dirname, '../../functions/tests/fixtures/email');
+
+interface FixtureCase {
+  name: string;
+  kind: 'alert' | 'digest';
+  props: any;
+}
+
+const cases: FixtureCase[] = JSON.parse(fs.readFileSync(path.join(FIXTURES_DIR, 'cases.json'), 'utf8'));
+
+for (const fixture of cases) {
+  const html = fixture.kind === 'alert'
+    ? renderTheCannonAlertEmail(fixture.props)
+    : renderTheCannonDigestEmail(fixture.props);
+  fs.writeFileSync(path.join(FIXTURES_DIR, `${fixture.name}.html`), html, 'utf8');
+}
+
+console.log(`Wrote ${cases.length} email fixtures to ${FIXTURES_DIR}`);
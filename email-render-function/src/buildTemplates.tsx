@@ -0,0 +1,171 @@
+import * as fs from 'fs';
+import * as path from 'path';
+import { renderToStaticMarkup } from 'react-dom/server';
+import { Preview } from '@react-email/components';
+import { renderTheCannonAlertEmail, renderTheCannonDigestEmail } from './emails/renderEmail';
+import { DigestListingCard, ListingItem } from './emails/TheCannonDigestEmail';
+
+/**
+ * Precompiles the React Email components into HTML templates for the Python
+ * in-process renderer (functions/main.py). Each template is the real render output
+ * with props replaced by {{name}} (escaped text) or {{{name}}} (raw HTML) tokens,
+ * one file per combination of the components' conditional branches.
+ *
+ * Usage: yarn build:templates
+ */
+
+const OUTPUT_DIR = path.resolve(__dirname, '../../functions/email_templates');
+
+// Sentinels only use [A-Za-z_], so React leaves them untouched when escaping
+const sentinel = (name: string) => `__TCA_${name}__`;
+
+function tokenize(html: string, names: string[]): string {
+  let result = html;
+  for (const name of names) {
+    result = result.split(sentinel(name)).join(`{{${name}}}`);
+  }
+  if (result.includes('__TCA_')) {
+    throw new Error('Template still contains an untokenized sentinel');
+  }
+  return result;
+}
+
+function replaceOnce(html: string, search: string, replacement: string): string {
+  const index = html.indexOf(search);
+  if (index === -1 || html.indexOf(search, index + search.length) !== -1) {
+    throw new Error(`Expected exactly one occurrence of ${search.slice(0, 60)}`);
+  }
+  return html.slice(0, index) + replacement + html.slice(index + search.length);
+}
+
+// The preview text is padded to a fixed length, so its markup can't be a simple
+// token substitution; templates get a {{{preview}}} token and the manifest records
+// how to rebuild the block
+const PREVIEW_MAX_LENGTH = 150;
+const longPreview = renderToStaticMarkup(<Preview>{'x'.repeat(PREVIEW_MAX_LENGTH)}</Preview>);
+const previewOpen = longPreview.slice(0, longPreview.indexOf('x'));
+const previewClose = longPreview.slice(longPreview.lastIndexOf('x') + 1);
+const emptyPreview = renderToStaticMarkup(<Preview>{''}</Preview>);
+const whitespaceBlock = emptyPreview.slice(previewOpen.length, emptyPreview.length - previewClose.length);
+if (!whitespaceBlock.startsWith('<div>') || !whitespaceBlock.endsWith('</div>')) {
+  throw new Error('Unexpected Preview whitespace markup');
+}
+const whitespace = whitespaceBlock.slice('<div>'.length, -'</div>'.length);
+const whitespaceUnit = whitespace.slice(0, whitespace.length / PREVIEW_MAX_LENGTH);
+
+function tokenizePreview(html: string): string {
+  const start = html.indexOf(previewOpen);
+  if (start === -1) {
+    throw new Error('Preview block not found');
+  }
+  let end = html.indexOf('<', start + previewOpen.length);
+  if (html.startsWith('<div>', end)) {
+    end = html.indexOf('</div>', end) + '</div>'.length;
+  }
+  if (!html.startsWith(previewClose, end)) {
+    throw new Error('Unexpected Preview block markup');
+  }
+  return html.slice(0, start) + '{{{preview}}}' + html.slice(end + previewClose.length);
+}
+
+const templates: Record<string, string> = {};
+
+// Alert email: with and without a cover image
+const alertFields = [
+  'price',
+  'bedrooms',
+  'address',
+  'description',
+  'coverImageUrl',
+  'listingUrl',
+  'subscriptionBedrooms',
+  'subscriptionPriceRange',
+  'postedAtText',
+  'unsubscribeUrl',
+  'listingsOverviewUrl',
+];
+for (const variant of ['image', 'noimage']) {
+  const html = renderTheCannonAlertEmail({
+    price: sentinel('price'),
+    bedrooms: sentinel('bedrooms'),
+    address: sentinel('address'),
+    description: sentinel('description'),
+    coverImageUrl: variant === 'image' ? sentinel('coverImageUrl') : undefined,
+    listingUrl: sentinel('listingUrl'),
+    subscriptionBedrooms: sentinel('subscriptionBedrooms'),
+    subscriptionPriceRange: sentinel('subscriptionPriceRange'),
+    postedAtText: sentinel('postedAtText'),
+    unsubscribeUrl: sentinel('unsubscribeUrl'),
+    listingsOverviewUrl: sentinel('listingsOverviewUrl'),
+  });
+  templates[`alert_${variant}`] = tokenize(tokenizePreview(html), alertFields);
+}
+
+// Digest listing cards: with/without image and date available
+const cardFields = ['price', 'bedrooms', 'address', 'coverImageUrl', 'listingUrl', 'dateAvailable'];
+const cardListing = (image: boolean, date: boolean): ListingItem => ({
+  price: sentinel('price'),
+  bedrooms: sentinel('bedrooms'),
+  address: sentinel('address'),
+  coverImageUrl: image ? sentinel('coverImageUrl') : undefined,
+  listingUrl: sentinel('listingUrl'),
+  dateAvailable: date ? sentinel('dateAvailable') : undefined,
+});
+for (const image of [true, false]) {
+  for (const date of [true, false]) {
+    const html = renderToStaticMarkup(<DigestListingCard listing={cardListing(image, date)} />);
+    templates[`digest_card_${image ? 'image' : 'noimage'}_${date ? 'date' : 'nodate'}`] = tokenize(html, cardFields);
+  }
+}
+
+// Digest email: per digest type, for zero, one and several listings
+const digestFields = [
+  'subscriptionBedrooms',
+  'subscriptionPriceRange',
+  'unsubscribeUrl',
+  'listingsOverviewUrl',
+  'periodStart',
+  'periodEnd',
+];
+const sampleListing = cardListing(true, true);
+const sampleCard = renderToStaticMarkup(<DigestListingCard listing={sampleListing} />);
+for (const digestType of ['daily', 'weekly'] as const) {
+  for (const [variant, count] of [['none', 0], ['one', 1], ['many', 2]] as const) {
+    const listings = Array.from({ length: count }, () => sampleListing);
+    let html = renderTheCannonDigestEmail({
+      listings,
+      digestType,
+      subscriptionBedrooms: sentinel('subscriptionBedrooms'),
+      subscriptionPriceRange: sentinel('subscriptionPriceRange'),
+      unsubscribeUrl: sentinel('unsubscribeUrl'),
+      listingsOverviewUrl: sentinel('listingsOverviewUrl'),
+      periodStart: sentinel('periodStart'),
+      periodEnd: sentinel('periodEnd'),
+    });
+    if (count > 0) {
+      html = replaceOnce(html, sampleCard.repeat(count), '{{{listings}}}');
+    }
+    html = replaceOnce(html, `>${count}</span> new listing`, '>{{listingCount}}</span> new listing');
+    templates[`digest_${digestType}_${variant}`] = tokenize(tokenizePreview(html), digestFields);
+  }
+}
+
+fs.mkdirSync(OUTPUT_DIR, { recursive: true });
+for (const [name, html] of Object.entries(templates)) {
+  fs.writeFileSync(path.join(OUTPUT_DIR, `${name}.html`), html, 'utf8');
+}
+fs.writeFileSync(
+  path.join(OUTPUT_DIR, 'manifest.json'),
+  JSON.stringify({
+    templates: Object.keys(templates),
+    preview: {
+      open: previewOpen,
+      close: previewClose,
+      maxLength: PREVIEW_MAX_LENGTH,
+      whitespaceUnit,
+    },
+  }, null, 2),
+  'utf8'
+);
+
+console.log(`Wrote ${Object.keys(templates).length} email templates to ${OUTPUT_DIR}`);
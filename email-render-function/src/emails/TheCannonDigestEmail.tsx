@@ -227,6 +227,43 @@ const styles = {
   },
 };
 
+export function DigestListingCard({ listing }: { listing: ListingItem }) {
+  return (
+    <Section style={styles.listingCard}>
+      <Row style={styles.listingRow}>
+        <Column style={styles.listingImageCol}>
+          {listing.coverImageUrl ? (
+            <Img
+              src={listing.coverImageUrl}
+              alt={`Listing at ${listing.address}`}
+              style={styles.listingImage}
+            />
+          ) : (
+            <Section style={styles.listingImagePlaceholder}>
+              <Text style={{ margin: 0, color: '#FFFFFF', fontSize: '11px', fontWeight: '600', textAlign: 'center' as const }}>
+                No Image
+              </Text>
+            </Section>
+          )}
+        </Column>
+        <Column style={styles.listingContentCol}>
+          <Text style={styles.listingPrice}>{listing.price}/mo</Text>
+          <Text style={styles.listingBedrooms}>{listing.bedrooms}</Text>
+          <Text style={styles.listingAddress}>{listing.address}</Text>
+          {listing.dateAvailable && (
+            <Text style={styles.listingFeatures}>
+              Available: {listing.dateAvailable}
+            </Text>
+          )}
+          <Button href={listing.listingUrl} style={styles.viewButton}>
+            View Listing
+          </Button>
+        </Column>
+      </Row>
+    </Section>
+  );
+}
+
 export default function TheCannonDigestEmail({
   listings,
   digestType,
@@ -281,38 +318,7 @@ export default function TheCannonDigestEmail({
               </Text>
               
               {listings.map((listing, index) => (
-                <Section key={index} style={styles.listingCard}>
-                  <Row style={styles.listingRow}>
-                    <Column style={styles.listingImageCol}>
-                      {listing.coverImageUrl ? (
-                        <Img
-                          src={listing.coverImageUrl}
-                          alt={`Listing at ${listing.address}`}
-                          style={styles.listingImage}
-                        />
-                      ) : (
-                        <Section style={styles.listingImagePlaceholder}>
-                          <Text style={{ margin: 0, color: '#FFFFFF', fontSize: '11px', fontWeight: '600', textAlign: 'center' as const }}>
-                            No Image
-                          </Text>
-                        </Section>
-                      )}
-                    </Column>
-                    <Column style={styles.listingContentCol}>
-                      <Text style={styles.listingPrice}>{listing.price}/mo</Text>
-                      <Text style={styles.listingBedrooms}>{listing.bedrooms}</Text>
-                      <Text style={styles.listingAddress}>{listing.address}</Text>
-                      {listing.dateAvailable && (
-                        <Text style={styles.listingFeatures}>
-                          Available: {listing.dateAvailable}
-                        </Text>
-                      )}
-                      <Button href={listing.listingUrl} style={styles.viewButton}>
-                        View Listing
-                      </Button>
-                    </Column>
-                  </Row>
-                </Section>
+                <DigestListingCard key={index} listing={listing} />
               ))}
             </Section>
           ) : (
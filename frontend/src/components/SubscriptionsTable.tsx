@@ -2,11 +2,10 @@ import React, { useMemo } from 'react';
 import {
   useReactTable,
   getCoreRowModel,
-  getSortedRowModel,
-  getFilteredRowModel,
   flexRender,
   createColumnHelper,
   SortingState,
+  OnChangeFn,
   ColumnDef,
 } from '@tanstack/react-table';
 import {
@@ -49,6 +48,9 @@ interface SubscriptionsTableProps {
   onDisable: (subscriptionId: string) => void;
   disablingId: string | null;
   showDisableButton?: boolean;
+  // Rows are one page sorted by the server; only the timestamp columns it can order by are sortable
+  sorting: SortingState;
+  onSortingChange: OnChangeFn<SortingState>;
 }
 
 const columnHelper = createColumnHelper<Subscription>();
@@ -59,11 +61,9 @@ export function SubscriptionsTable({
   onDisable,
   disablingId,
   showDisableButton = true,
+  sorting,
+  onSortingChange,
 }: SubscriptionsTableProps) {
-  const [sorting, setSorting] = React.useState<SortingState>([
-    { id: 'createdAt', desc: true },
-  ]);
-
   const formatDate = (dateString?: string) => {
     if (!dateString) return 'N/A';
     try {
@@ -92,13 +92,16 @@ export function SubscriptionsTable({
       columnHelper.accessor('createdAt', {
         header: 'Subscribed',
         cell: (info) => formatDate(info.getValue()),
-        sortingFn: 'datetime',
+        // The disabled tab can only be ordered by when the subscription was disabled
+        enableSorting: showDisableButton,
+        sortDescFirst: true,
       }),
       // Show "Disabled At" column for disabled tab, "Status" column for active tab
       showDisableButton
         ? columnHelper.accessor('disabled', {
             id: 'status',
             header: 'Status',
+            enableSorting: false,
             cell: (info) => {
               const isDisabled = info.getValue() !== null && info.getValue() !== undefined;
               return (
@@ -119,11 +122,12 @@ export function SubscriptionsTable({
             id: 'disabledAt',
             header: 'Disabled At',
             cell: (info) => formatDate(info.getValue() ?? undefined),
-            sortingFn: 'datetime',
+            sortDescFirst: true,
           }),
       columnHelper.accessor((row) => row.email || row.webhookUrl, {
         id: 'contact',
         header: 'Contact',
+        enableSorting: false,
         cell: (info) => {
           const row = info.row.original;
           return (
@@ -149,11 +153,13 @@ export function SubscriptionsTable({
       }),
       columnHelper.accessor('bedroomPreferences', {
         header: 'Bedrooms',
+        enableSorting: false,
         cell: (info) => formatPreferences(info.getValue(), getBedroomLabel),
       }),
       columnHelper.accessor((row) => ({ minPrice: row.minPrice, maxPrice: row.maxPrice }), {
         id: 'price',
         header: 'Price',
+        enableSorting: false,
         cell: (info) => {
           const { minPrice, maxPrice } = info.getValue();
           return formatPriceRange(minPrice, maxPrice);
@@ -161,6 +167,7 @@ export function SubscriptionsTable({
       }),
       columnHelper.accessor('frequency', {
         header: 'Frequency',
+        enableSorting: false,
         cell: (info) => getFrequencyLabel(info.getValue() || 'REAL_TIME'),
       }),
     ];
@@ -221,10 +228,10 @@ export function SubscriptionsTable({
     state: {
       sorting,
     },
-    onSortingChange: setSorting,
+    onSortingChange,
+    manualSorting: true,
+    enableSortingRemoval: false,
     getCoreRowModel: getCoreRowModel(),
-    getSortedRowModel: getSortedRowModel(),
-    getFilteredRowModel: getFilteredRowModel(),
   });
 
   if (loading) {
@@ -13,11 +13,35 @@ import {
   Alert,
   useTheme,
   Badge,
+  FormControl,
+  InputLabel,
+  Select,
+  MenuItem,
 } from '@mui/material';
-import { Logout, Refresh, VerifiedUser } from '@mui/icons-material';
+import { SortingState } from '@tanstack/react-table';
+import { Logout, Refresh, VerifiedUser, NavigateBefore, NavigateNext } from '@mui/icons-material';
 import { useAuth } from '../../contexts/AuthContext';
 import { SubscriptionsTable, Subscription } from '../../components/SubscriptionsTable';
 import { AdminStatCard } from '../../components/AdminStatCard';
+import {
+  bedroomValues,
+  frequencyValues,
+  getBedroomLabel,
+  getFrequencyLabel,
+} from '../../schemas/subscriptionSchema';
+
+const PAGE_SIZE_OPTIONS = [25, 50, 100, 200];
+
+interface SubscriptionFilters {
+  type: string;
+  frequency: string;
+  bedroom: string;
+}
+
+interface SubscriptionCounts {
+  active: number | null;
+  disabled: number | null;
+}
 
 interface TabPanelProps {
   children?: React.ReactNode;
@@ -55,6 +79,14 @@ export default function AdminHomePage() {
 
   const [tabValue, setTabValue] = useState(0);
   const [subscriptions, setSubscriptions] = useState<Subscription[]>([]);
+  const [counts, setCounts] = useState<SubscriptionCounts>({ active: null, disabled: null });
+  const [filters, setFilters] = useState<SubscriptionFilters>({ type: '', frequency: '', bedroom: '' });
+  const [sorting, setSorting] = useState<SortingState>([{ id: 'createdAt', desc: true }]);
+  const [pageSize, setPageSize] = useState(50);
+  // Cursor that loads each visited page (null for the first page), used to go back
+  const [pageCursors, setPageCursors] = useState<(string | null)[]>([null]);
+  const [pageIndex, setPageIndex] = useState(0);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [pendingVerificationsCount, setPendingVerificationsCount] = useState(0);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
@@ -66,7 +98,9 @@ export default function AdminHomePage() {
       : `https://us-central1-thecannonmonitor.cloudfunctions.net/${functionName}`;
   };
 
-  const fetchSubscriptions = useCallback(async () => {
+  // Fetch one page of subscriptions for the current tab, filters and sort order.
+  // Unverified EMAIL subscriptions are left to the verifications page.
+  const fetchPage = useCallback(async (cursor: string | null, includeCounts: boolean) => {
     setLoading(true);
     setError(null);
 
@@ -78,36 +112,39 @@ export default function AdminHomePage() {
         return;
       }
 
-      // Fetch subscriptions and pending verifications in parallel
-      const [subscriptionsResponse, verificationsResponse] = await Promise.all([
-        fetch(getFirebaseFunctionUrl('get_all_subscriptions'), {
-          method: 'GET',
-          headers: {
-            'Authorization': `Bearer ${token}`,
-            'Content-Type': 'application/json',
-          },
-        }),
-        fetch(getFirebaseFunctionUrl('get_pending_verifications'), {
-          method: 'GET',
-          headers: {
-            'Authorization': `Bearer ${token}`,
-            'Content-Type': 'application/json',
-          },
-        }),
-      ]);
-
-      if (!subscriptionsResponse.ok) {
-        const errorData = await subscriptionsResponse.json();
-        throw new Error(errorData.error || 'Failed to fetch subscriptions');
+      const params = new URLSearchParams({
+        status: tabValue === 0 ? 'active' : 'disabled',
+        exclude_unverified: 'true',
+        page_size: String(pageSize),
+        direction: sorting[0]?.desc === false ? 'asc' : 'desc',
+      });
+      if (tabValue === 0) {
+        params.set('sort', 'createdAt');
       }
+      if (filters.type) params.set('type', filters.type);
+      if (filters.frequency) params.set('frequency', filters.frequency);
+      if (filters.bedroom) params.set('bedroom', filters.bedroom);
+      if (cursor) params.set('cursor', cursor);
+      if (includeCounts) params.set('include_counts', 'true');
+
+      const response = await fetch(`${getFirebaseFunctionUrl('get_all_subscriptions')}?${params}`, {
+        method: 'GET',
+        headers: {
+          'Authorization': `Bearer ${token}`,
+          'Content-Type': 'application/json',
+        },
+      });
 
-      const subscriptionsData = await subscriptionsResponse.json();
-      setSubscriptions(subscriptionsData.subscriptions || []);
+      if (!response.ok) {
+        const errorData = await response.json();
+        throw new Error(errorData.error || 'Failed to fetch subscriptions');
+      }
 
-      // Set pending verifications count (don't throw error if this fails)
-      if (verificationsResponse.ok) {
-        const verificationsData = await verificationsResponse.json();
-        setPendingVerificationsCount((verificationsData.subscriptions || []).length);
+      const data = await response.json();
+      setSubscriptions(data.subscriptions || []);
+      setNextCursor(data.next_cursor || null);
+      if (data.counts) {
+        setCounts(data.counts);
       }
     } catch (err) {
       console.error('Error fetching subscriptions:', err);
@@ -115,6 +152,29 @@ export default function AdminHomePage() {
     } finally {
       setLoading(false);
     }
+  }, [getIdToken, tabValue, filters, sorting, pageSize]);
+
+  const fetchPendingVerificationsCount = useCallback(async () => {
+    try {
+      const token = await getIdToken();
+      if (!token) return;
+
+      const response = await fetch(`${getFirebaseFunctionUrl('get_pending_verifications')}?count_only=true`, {
+        method: 'GET',
+        headers: {
+          'Authorization': `Bearer ${token}`,
+          'Content-Type': 'application/json',
+        },
+      });
+
+      // Don't surface an error for the badge count
+      if (response.ok) {
+        const data = await response.json();
+        setPendingVerificationsCount(data.pending_count ?? 0);
+      }
+    } catch (err) {
+      console.error('Error fetching pending verifications:', err);
+    }
   }, [getIdToken]);
 
   // Redirect to login if not authenticated
@@ -124,15 +184,46 @@ export default function AdminHomePage() {
     }
   }, [user, authLoading, router]);
 
-  // Fetch subscriptions when authenticated
+  // Start from the first page whenever the tab, filters, sort order or page size change
+  useEffect(() => {
+    if (user && !authLoading) {
+      setPageCursors([null]);
+      setPageIndex(0);
+      fetchPage(null, true);
+    }
+  }, [user, authLoading, fetchPage]);
+
   useEffect(() => {
     if (user && !authLoading) {
-      fetchSubscriptions();
+      fetchPendingVerificationsCount();
     }
-  }, [user, authLoading, fetchSubscriptions]);
+  }, [user, authLoading, fetchPendingVerificationsCount]);
 
   const handleTabChange = (_event: React.SyntheticEvent, newValue: number) => {
     setTabValue(newValue);
+    setSorting([{ id: newValue === 0 ? 'createdAt' : 'disabledAt', desc: true }]);
+  };
+
+  const handleFilterChange = (name: keyof SubscriptionFilters, value: string) => {
+    setFilters((prev) => ({ ...prev, [name]: value }));
+  };
+
+  const handleNextPage = () => {
+    if (!nextCursor) return;
+    setPageCursors((prev) => [...prev.slice(0, pageIndex + 1), nextCursor]);
+    setPageIndex(pageIndex + 1);
+    fetchPage(nextCursor, false);
+  };
+
+  const handlePreviousPage = () => {
+    if (pageIndex === 0) return;
+    setPageIndex(pageIndex - 1);
+    fetchPage(pageCursors[pageIndex - 1], false);
+  };
+
+  const handleRefresh = () => {
+    fetchPage(pageCursors[pageIndex], true);
+    fetchPendingVerificationsCount();
   };
 
   const handleDisable = async (subscriptionId: string) => {
@@ -159,14 +250,12 @@ export default function AdminHomePage() {
         throw new Error(errorData.error || 'Failed to disable subscription');
       }
 
-      // Update local state to reflect the change
-      setSubscriptions((prev) =>
-        prev.map((sub) =>
-          sub.id === subscriptionId
-            ? { ...sub, disabled: new Date().toISOString() }
-            : sub
-        )
-      );
+      // The subscription moves to the disabled tab
+      setSubscriptions((prev) => prev.filter((sub) => sub.id !== subscriptionId));
+      setCounts((prev) => ({
+        active: prev.active !== null ? prev.active - 1 : null,
+        disabled: prev.disabled !== null ? prev.disabled + 1 : null,
+      }));
     } catch (err) {
       console.error('Error disabling subscription:', err);
       setError(err instanceof Error ? err.message : 'Failed to disable subscription');
@@ -180,13 +269,10 @@ export default function AdminHomePage() {
     router.push('/admin');
   };
 
-  // Filter subscriptions by status
-  const activeSubscriptions = subscriptions.filter(
-    (sub) => sub.disabled === null || sub.disabled === undefined
-  );
-  const disabledSubscriptions = subscriptions.filter(
-    (sub) => sub.disabled !== null && sub.disabled !== undefined
-  );
+  const activeCount = counts.active ?? 0;
+  const disabledCount = counts.disabled ?? 0;
+  const tabCount = tabValue === 0 ? activeCount : disabledCount;
+  const pageStart = pageIndex * pageSize;
 
   // Show loading while checking auth state
   if (authLoading) {
@@ -295,7 +381,7 @@ export default function AdminHomePage() {
                 <Button
                   variant="outlined"
                   startIcon={<Refresh />}
-                  onClick={fetchSubscriptions}
+                  onClick={handleRefresh}
                   disabled={loading}
                   sx={{ borderColor: 'divider', minWidth: 130 }}
                 >
@@ -324,9 +410,9 @@ export default function AdminHomePage() {
 
           {/* Stats Summary */}
           <Box sx={{ mb: 4, display: 'flex', gap: 2, flexWrap: 'wrap' }}>
-            <AdminStatCard label="Total Subscriptions" value={subscriptions.length} />
-            <AdminStatCard label="Active" value={activeSubscriptions.length} color="#22c55e" />
-            <AdminStatCard label="Disabled" value={disabledSubscriptions.length} color="#ef4444" />
+            <AdminStatCard label="Total Subscriptions" value={activeCount + disabledCount} />
+            <AdminStatCard label="Active" value={activeCount} color="#22c55e" />
+            <AdminStatCard label="Disabled" value={disabledCount} color="#ef4444" />
           </Box>
 
           {/* Tabs */}
@@ -350,30 +436,119 @@ export default function AdminHomePage() {
                 },
               }}
             >
-              <Tab label={`Active (${activeSubscriptions.length})`} {...a11yProps(0)} />
-              <Tab label={`Disabled (${disabledSubscriptions.length})`} {...a11yProps(1)} />
+              <Tab label={`Active (${activeCount})`} {...a11yProps(0)} />
+              <Tab label={`Disabled (${disabledCount})`} {...a11yProps(1)} />
             </Tabs>
           </Box>
 
+          {/* Filters */}
+          <Box sx={{ pt: 3, display: 'flex', gap: 2, flexWrap: 'wrap' }}>
+            <FormControl size="small" sx={{ minWidth: 160 }}>
+              <InputLabel id="filter-type-label">Type</InputLabel>
+              <Select
+                labelId="filter-type-label"
+                label="Type"
+                value={filters.type}
+                onChange={(e) => handleFilterChange('type', e.target.value)}
+              >
+                <MenuItem value="">All</MenuItem>
+                <MenuItem value="EMAIL">Email</MenuItem>
+                <MenuItem value="WEBHOOK">Webhook</MenuItem>
+              </Select>
+            </FormControl>
+            <FormControl size="small" sx={{ minWidth: 160 }}>
+              <InputLabel id="filter-frequency-label">Frequency</InputLabel>
+              <Select
+                labelId="filter-frequency-label"
+                label="Frequency"
+                value={filters.frequency}
+                onChange={(e) => handleFilterChange('frequency', e.target.value)}
+              >
+                <MenuItem value="">All</MenuItem>
+                {frequencyValues.map((value) => (
+                  <MenuItem key={value} value={value}>{getFrequencyLabel(value)}</MenuItem>
+                ))}
+              </Select>
+            </FormControl>
+            <FormControl size="small" sx={{ minWidth: 160 }}>
+              <InputLabel id="filter-bedroom-label">Bedrooms</InputLabel>
+              <Select
+                labelId="filter-bedroom-label"
+                label="Bedrooms"
+                value={filters.bedroom}
+                onChange={(e) => handleFilterChange('bedroom', e.target.value)}
+              >
+                <MenuItem value="">All</MenuItem>
+                {bedroomValues.map((value) => (
+                  <MenuItem key={value} value={value}>{getBedroomLabel(value)}</MenuItem>
+                ))}
+              </Select>
+            </FormControl>
+          </Box>
+
           {/* Tab Panels */}
           <TabPanel value={tabValue} index={0}>
             <SubscriptionsTable
-              subscriptions={activeSubscriptions}
+              subscriptions={subscriptions}
               loading={loading}
               onDisable={handleDisable}
               disablingId={disablingId}
               showDisableButton={true}
+              sorting={sorting}
+              onSortingChange={setSorting}
             />
           </TabPanel>
           <TabPanel value={tabValue} index={1}>
             <SubscriptionsTable
-              subscriptions={disabledSubscriptions}
+              subscriptions={subscriptions}
               loading={loading}
               onDisable={handleDisable}
               disablingId={disablingId}
               showDisableButton={false}
+              sorting={sorting}
+              onSortingChange={setSorting}
             />
           </TabPanel>
+
+          {/* Pagination */}
+          <Box sx={{ pt: 2, display: 'flex', alignItems: 'center', justifyContent: 'flex-end', gap: 2 }}>
+            <FormControl size="small" sx={{ minWidth: 120 }}>
+              <InputLabel id="page-size-label">Rows per page</InputLabel>
+              <Select
+                labelId="page-size-label"
+                label="Rows per page"
+                value={pageSize}
+                onChange={(e) => setPageSize(Number(e.target.value))}
+              >
+                {PAGE_SIZE_OPTIONS.map((size) => (
+                  <MenuItem key={size} value={size}>{size}</MenuItem>
+                ))}
+              </Select>
+            </FormControl>
+            <Typography variant="body2" sx={{ color: 'text.secondary' }}>
+              {subscriptions.length > 0
+                ? `${pageStart + 1}-${pageStart + subscriptions.length} of ${tabCount}`
+                : `0 of ${tabCount}`}
+            </Typography>
+            <Button
+              variant="outlined"
+              startIcon={<NavigateBefore />}
+              onClick={handlePreviousPage}
+              disabled={loading || pageIndex === 0}
+              sx={{ borderColor: 'divider' }}
+            >
+              Previous
+            </Button>
+            <Button
+              variant="outlined"
+              endIcon={<NavigateNext />}
+              onClick={handleNextPage}
+              disabled={loading || !nextCursor}
+              sx={{ borderColor: 'divider' }}
+            >
+              Next
+            </Button>
+          </Box>
         </Container>
       </Box>
     </>
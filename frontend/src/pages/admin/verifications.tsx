@@ -10,7 +10,7 @@ import {
   CircularProgress,
   Alert,
 } from '@mui/material';
-import { Logout, Refresh, ArrowBack } from '@mui/icons-material';
+import { Logout, Refresh, ArrowBack, DoneAll } from '@mui/icons-material';
 import { useAuth } from '../../contexts/AuthContext';
 import { VerificationsTable } from '../../components/VerificationsTable';
 import { Subscription } from '../../components/SubscriptionsTable';
@@ -21,10 +21,14 @@ export default function AdminVerificationsPage() {
   const { user, loading: authLoading, signOut, getIdToken } = useAuth();
 
   const [subscriptions, setSubscriptions] = useState<Subscription[]>([]);
+  const [pendingCount, setPendingCount] = useState(0);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const [processingId, setProcessingId] = useState<string | null>(null);
   const [processingAction, setProcessingAction] = useState<'verify' | 'decline' | null>(null);
+  const [bulkProcessing, setBulkProcessing] = useState(false);
 
   const getFirebaseFunctionUrl = (functionName: string) => {
     return process.env.NODE_ENV === 'development'
@@ -32,8 +36,13 @@ export default function AdminVerificationsPage() {
       : `https://us-central1-thecannonmonitor.cloudfunctions.net/${functionName}`;
   };
 
-  const fetchPendingVerifications = useCallback(async () => {
-    setLoading(true);
+  // Fetch the oldest page of the queue, or append the page after the given cursor
+  const fetchPendingVerifications = useCallback(async (cursor: string | null = null) => {
+    if (cursor) {
+      setLoadingMore(true);
+    } else {
+      setLoading(true);
+    }
     setError(null);
 
     try {
@@ -44,7 +53,10 @@ export default function AdminVerificationsPage() {
         return;
       }
 
-      const response = await fetch(getFirebaseFunctionUrl('get_pending_verifications'), {
+      const url = cursor
+        ? `${getFirebaseFunctionUrl('get_pending_verifications')}?cursor=${encodeURIComponent(cursor)}`
+        : getFirebaseFunctionUrl('get_pending_verifications');
+      const response = await fetch(url, {
         method: 'GET',
         headers: {
           'Authorization': `Bearer ${token}`,
@@ -58,12 +70,16 @@ export default function AdminVerificationsPage() {
       }
 
       const data = await response.json();
-      setSubscriptions(data.subscriptions || []);
+      const page: Subscription[] = data.subscriptions || [];
+      setSubscriptions((prev) => (cursor ? [...prev, ...page] : page));
+      setNextCursor(data.next_cursor || null);
+      setPendingCount(data.pending_count ?? 0);
     } catch (err) {
       console.error('Error fetching pending verifications:', err);
       setError(err instanceof Error ? err.message : 'Failed to fetch pending verifications');
     } finally {
       setLoading(false);
+      setLoadingMore(false);
     }
   }, [getIdToken]);
 
@@ -108,6 +124,7 @@ export default function AdminVerificationsPage() {
 
       // Remove from local state
       setSubscriptions((prev) => prev.filter((sub) => sub.id !== subscriptionId));
+      setPendingCount((prev) => Math.max(prev - 1, 0));
     } catch (err) {
       console.error('Error verifying subscription:', err);
       setError(err instanceof Error ? err.message : 'Failed to verify subscription');
@@ -144,6 +161,7 @@ export default function AdminVerificationsPage() {
 
       // Remove from local state
       setSubscriptions((prev) => prev.filter((sub) => sub.id !== subscriptionId));
+      setPendingCount((prev) => Math.max(prev - 1, 0));
     } catch (err) {
       console.error('Error declining subscription:', err);
       setError(err instanceof Error ? err.message : 'Failed to decline subscription');
@@ -153,6 +171,51 @@ export default function AdminVerificationsPage() {
     }
   };
 
+  // Verify every loaded subscription with a single bulk request
+  const handleVerifyAll = async () => {
+    if (!window.confirm(`Verify all ${subscriptions.length} subscriptions shown?`)) return;
+    setBulkProcessing(true);
+
+    try {
+      const token = await getIdToken();
+      if (!token) {
+        setError('Failed to get authentication token');
+        return;
+      }
+
+      const response = await fetch(getFirebaseFunctionUrl('admin_bulk_subscription_action'), {
+        method: 'POST',
+        headers: {
+          'Authorization': `Bearer ${token}`,
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+          action: 'verify',
+          subscription_ids: subscriptions.map((sub) => sub.id),
+        }),
+      });
+
+      if (!response.ok) {
+        const errorData = await response.json();
+        throw new Error(errorData.error || 'Failed to verify subscriptions');
+      }
+
+      // Remove the verified ones from local state, keep any that failed
+      const data = await response.json();
+      const results: Record<string, { success: boolean; error?: string }> = data.results || {};
+      setSubscriptions((prev) => prev.filter((sub) => !results[sub.id]?.success));
+      setPendingCount((prev) => Math.max(prev - (data.succeeded || 0), 0));
+      if (data.failed) {
+        setError(`${data.failed} subscriptions could not be verified`);
+      }
+    } catch (err) {
+      console.error('Error verifying subscriptions:', err);
+      setError(err instanceof Error ? err.message : 'Failed to verify subscriptions');
+    } finally {
+      setBulkProcessing(false);
+    }
+  };
+
   const handleSignOut = async () => {
     await signOut();
     router.push('/admin');
@@ -249,7 +312,7 @@ export default function AdminVerificationsPage() {
                 <Button
                   variant="outlined"
                   startIcon={<Refresh />}
-                  onClick={fetchPendingVerifications}
+                  onClick={() => fetchPendingVerifications()}
                   disabled={loading}
                   sx={{ borderColor: 'divider', minWidth: 130 }}
                 >
@@ -278,15 +341,25 @@ export default function AdminVerificationsPage() {
 
           {/* Stats Summary */}
           <Box sx={{ mb: 4, display: 'flex', gap: 2, flexWrap: 'wrap' }}>
-            <AdminStatCard label="Pending Verifications" value={subscriptions.length} />
+            <AdminStatCard label="Pending Verifications" value={pendingCount} />
           </Box>
 
           {/* Description */}
-          <Box sx={{ mb: 3 }}>
+          <Box sx={{ mb: 3, display: 'flex', justifyContent: 'space-between', alignItems: 'center', gap: 2 }}>
             <Typography variant="body1" sx={{ color: 'text.secondary' }}>
               Review and verify email subscriptions before they can receive notifications.
               Webhook subscriptions are automatically verified.
             </Typography>
+            <Button
+              variant="outlined"
+              color="success"
+              startIcon={bulkProcessing ? <CircularProgress size={16} /> : <DoneAll />}
+              onClick={handleVerifyAll}
+              disabled={loading || bulkProcessing || processingId !== null || subscriptions.length === 0}
+              sx={{ minWidth: 160, flexShrink: 0 }}
+            >
+              Verify all shown
+            </Button>
           </Box>
 
           {/* Table */}
@@ -298,6 +371,19 @@ export default function AdminVerificationsPage() {
             processingId={processingId}
             processingAction={processingAction}
           />
+
+          {nextCursor && !loading && (
+            <Box sx={{ pt: 2, display: 'flex', justifyContent: 'center' }}>
+              <Button
+                variant="outlined"
+                onClick={() => fetchPendingVerifications(nextCursor)}
+                disabled={loadingMore}
+                sx={{ borderColor: 'divider', minWidth: 130 }}
+              >
+                {loadingMore ? <CircularProgress size={20} /> : 'Load more'}
+              </Button>
+            </Box>
+          )}
         </Container>
       </Box>
     </>
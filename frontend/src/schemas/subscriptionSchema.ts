@@ -1,7 +1,7 @@
 import { z } from 'zod';
 
-const bedroomValues = ['ANY', 'B1', 'B2', 'B3', 'B4', 'B5_PLUS'] as const;
-const frequencyValues = ['REAL_TIME', 'DAILY', 'WEEKLY'] as const;
+export const bedroomValues = ['ANY', 'B1', 'B2', 'B3', 'B4', 'B5_PLUS'] as const;
+export const frequencyValues = ['REAL_TIME', 'DAILY', 'WEEKLY'] as const;
 
 export const subscriptionSchema = z.object({
   type: z.enum(['EMAIL', 'WEBHOOK']),
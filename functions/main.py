@@ -1,32 +1,424 @@
-from firebase_functions import https_fn, scheduler_fn
-from firebase_functions.options import set_global_options
-from firebase_admin import initialize_app, firestore, auth
+from firebase_functions import https_fn, scheduler_fn, tasks_fn
+from firebase_functions.options import set_global_options, RetryConfig, RateLimits
+from firebase_admin import initialize_app, firestore, auth, functions as admin_functions
 from google.cloud.firestore_v1.base_query import FieldFilter
+from google.api_core.exceptions import AlreadyExists
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
 import re
 import json
 import urllib.parse
-from datetime import datetime, timedelta
+from html import escape as html_escape
+from datetime import datetime, timedelta, time as dt_time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import OrderedDict
+import hashlib
+from bisect import bisect_left, bisect_right
+import threading
 import time
+import uuid
 import os
+import random
+import pytz
 
 set_global_options(max_instances=10)
 
+# Outbound HTTP client configuration (shared pooled sessions, one per host)
+HTTP_CONNECT_TIMEOUT = 5
+HTTP_READ_TIMEOUT = 15
+HTTP_POOL_MAXSIZE = 32
+
+# Notification outbox (one delivery record per listing + recipient)
+OUTBOX_BATCH_SIZE = 400
+OUTBOX_MAX_WORKERS = 8
+OUTBOX_DRAIN_LIMIT = 500
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_BASE_RETRY_SECONDS = 60
+OUTBOX_MAX_RETRY_SECONDS = 3600
+OUTBOX_LEASE_SECONDS = 300
+
+# Discord message limits
+DISCORD_MAX_EMBEDS_PER_MESSAGE = 10
+DISCORD_MAX_MESSAGE_EMBED_CHARS = 6000
+DISCORD_FIELD_VALUE_LIMIT = 1024
+DISCORD_DESCRIPTION_PREVIEW_LENGTH = 200
+
+# In-process email rendering from templates precompiled by email-render-function
+# (yarn build:templates); the Node renderEmail function is the fallback
+EMAIL_TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), 'email_templates')
+LOCAL_EMAIL_RENDER_ENABLED = os.environ.get('LOCAL_EMAIL_RENDER', 'true').lower() != 'false'
+
+# Digest scheduling (send times are wall-clock hours in this timezone)
+DIGEST_TIMEZONE = pytz.timezone('America/New_York')
+DEFAULT_DIGEST_SEND_HOUR = 9
+DIGEST_BACKFILL_BATCH_SIZE = 400
+DIGEST_MAX_WORKERS = 8
+DIGEST_COMMIT_BATCH_SIZE = 20
+DIGEST_PAGE_SIZE = 200
+DIGEST_FREQUENCIES = ('DAILY', 'WEEKLY')
+DIGEST_WINDOW_DAYS = {'DAILY': 1, 'WEEKLY': 7}
+DIGEST_CHECKPOINT_ID = 'DIGEST'
+DIGEST_CHECKPOINT_LEASE_SECONDS = 600
+# A failed digest send is retried after DIGEST_RETRY_BASE_SECONDS, doubling each time;
+# after DIGEST_SEND_MAX_ATTEMPTS failures that digest is skipped for the next regular slot
+DIGEST_SEND_MAX_ATTEMPTS = 4
+DIGEST_RETRY_BASE_SECONDS = 3600
+
+# Digest fan-out: "tasks" dispatches one shard per page of due subscriptions to
+# digest_shard_worker through Cloud Tasks, "local" runs the same shards in-process
+# (tests/emulator), "inline" sends everything from the scheduler invocation
+DIGEST_FANOUT_MODE = os.environ.get('DIGEST_FANOUT_MODE', 'tasks').lower()
+DIGEST_SHARD_QUEUE = 'digest_shard_worker'
+DIGEST_SHARD_MAX_CONCURRENCY = 10
+DIGEST_SHARD_MAX_ATTEMPTS = 3
+# Kept shorter than the hourly schedule, so a run with a lost shard is closed out by the next tick
+DIGEST_SHARD_LEASE_SECONDS = 2700
+
+# Admin Discord ping for new email subscriptions, sent off the create_subscription
+# response path by verification_notification_worker
+VERIFICATION_NOTIFY_QUEUE = 'verification_notification_worker'
+VERIFICATION_NOTIFY_MAX_ATTEMPTS = 5
+
+# Bedroom buckets (see get_bedroom_bucket); each gets one bit in a subscription's bedroom mask
+BEDROOM_BUCKETS = ('B1', 'B2', 'B3', 'B4', 'B5_PLUS', 'UNKNOWN')
+BEDROOM_BUCKET_BITS = {bucket: 1 << index for index, bucket in enumerate(BEDROOM_BUCKETS)}
+ANY_BEDROOM_MASK = (1 << len(BEDROOM_BUCKETS)) - 1
+UNSUBSCRIBE_URL = 'https://thecannonalerts.ca/unsubscribe?id={}'
+
+# Field projections for hot Firestore reads (query.select), one per call site, listing
+# exactly the fields that call site uses so large fields (listing descriptions,
+# ingestion_runs.processed_listings, ...) are never transferred or deserialized
+FIELD_PROJECTIONS = {
+    # get_active_subscriptions -> find_matching_subscriptions -> notification outbox
+    'active_subscriptions': [
+        'type', 'email', 'webhookUrl', 'isVerified', 'disabled',
+        'frequency', 'bedroomPreferences', 'minPrice', 'maxPrice',
+    ],
+    # get_subscriptions_for_digest -> digest rendering and rescheduling
+    'digest_subscriptions': [
+        'type', 'email', 'frequency', 'sendTime', 'nextDigestDueAt', 'digestFailures',
+        'bedroomPreferences', 'minPrice', 'maxPrice',
+    ],
+    # read_recipient_index seed (see build_recipient_index_entry)
+    'subscription_filters': ['bedroomPreferences', 'minPrice', 'maxPrice'],
+    # admin_backfill_recipient_index
+    'recipient_index': ['type', 'email', 'webhookUrl', 'bedroomPreferences', 'minPrice', 'maxPrice'],
+    # get_all_subscriptions / get_pending_verifications (fields shown in the admin tables)
+    'admin_subscriptions': [
+        'type', 'email', 'webhookUrl', 'bedroomPreferences', 'minPrice', 'maxPrice',
+        'frequency', 'sendTime', 'disabled', 'createdAt', 'isVerified', 'verifiedAt', 'declinedAt',
+    ],
+    # admin_backfill_digest_schedule
+    'digest_schedule': ['type', 'frequency', 'sendTime', 'nextDigestDueAt', 'lastDigestSentAt'],
+    # merge_listing_rollup seed (see build_listing_summary)
+    'listing_summary': [
+        'created_at', 'listing_url', 'image_url', 'address', 'price_int', 'price_string',
+        'bedroom_bucket', 'additional_details.date_available', 'additional_details.features',
+    ],
+    # continue_notifications_reconciliation (chunked fallback for the sum() aggregation)
+    'ingestion_run_totals': ['notifications_sent'],
+    # archive_old_listings (see build_archived_listing)
+    'listing_archive': [
+        'listing_url', 'image_url', 'address', 'price_int', 'price_string',
+        'bedroom_count', 'bedroom_bucket', 'created_at',
+    ],
+    # compact_run_collection (see RUN_COMPACTION_SPECS)
+    'ingestion_runs_compaction': [
+        'timestamp', 'duration_seconds', 'new_listings_count', 'notifications_sent', 'notification_errors',
+    ],
+    'digest_runs_compaction': ['timestamp', 'duration_seconds', 'shard_seconds', 'sent', 'errors', 'subscribers'],
+    # Queries that only need document references
+    'references': [],
+    # suppress_recipient_subscriptions (pending verification count)
+    'recipient_subscriptions': ['disabled', 'isVerified'],
+    # admin_bulk_subscription_action
+    'admin_action_state': ['type', 'email', 'webhookUrl', 'disabled', 'isVerified'],
+}
+
+# Delivery health tracking (per recipient)
+HARD_FAILURE_STATUS_CODES = (401, 403, 404)
+# Failures the recipient caused, the only ones that count toward suppression: a deleted or
+# revoked Discord webhook, or Mailgun rejecting the address. Missing responses (None),
+# 5xx, 429 and failures on our side (render, Mailgun config) never count.
+RECIPIENT_FAILURE_STATUS_CODES = {'WEBHOOK': HARD_FAILURE_STATUS_CODES, 'EMAIL': (400,)}
+HEALTH_MAX_CONSECUTIVE_FAILURES = 8
+HEALTH_BASE_COOLDOWN_SECONDS = 300
+HEALTH_MAX_COOLDOWN_SECONDS = 86400
+
+# Stats counter: increments go to one of N shard documents under metadata/stats/shards,
+# reads sum the shards (plus the pre-sharding totals on metadata/stats)
+STATS_COUNTER_SHARDS = 10
+STATS_CACHE_SECONDS = 60
+
+# Public get_stats response caching: fresh for STATS_RESPONSE_TTL_SECONDS, then served
+# stale (while one request refreshes it) for up to STATS_RESPONSE_STALE_SECONDS
+STATS_RESPONSE_TTL_SECONDS = 60
+STATS_RESPONSE_STALE_SECONDS = 600
+
+# Fallback reconciliation of the notifications total when sum() aggregation is unavailable
+STATS_RECONCILE_CHUNK_SIZE = 500
+STATS_RECONCILE_MAX_CHUNKS = 40
+
+# Run history compaction: ingestion_runs/digest_runs older than the retention window are
+# rolled into daily and monthly run_rollups documents and then deleted
+RUN_RETENTION_DAYS = 30
+RUN_COMPACTION_MAX_DOCS = 5000
+RUN_COMPACTION_BATCH_WRITES = 450
+RUN_DURATION_BUCKETS = (1, 2, 5, 10, 30, 60, 120, 300, 600)
+RUN_COMPACTION_SPECS = {
+    'ingestion_runs': {
+        'kind': 'ingestion',
+        'sum_fields': ['new_listings_count', 'notifications_sent', 'notification_errors'],
+        'has_shards': False,
+    },
+    'digest_runs': {
+        'kind': 'digest',
+        'sum_fields': ['sent', 'errors', 'subscribers'],
+        'has_shards': True,
+    },
+}
+
+# Listing archival: listings older than the hot window move to the slim listings_archive
+# collection. The hot window always covers the longest digest window plus a day.
+LISTING_HOT_RETENTION_DAYS = max(int(os.environ.get('LISTING_HOT_RETENTION_DAYS', '30')), 8)
+LISTING_ARCHIVE_BATCH_SIZE = 200
+LISTING_ARCHIVE_MAX_DOCS = 2000
+
+# Admin subscriptions listing: cursor-paginated, each filter maps to an indexed query clause
+ADMIN_PAGE_SIZE_DEFAULT = 50
+ADMIN_PAGE_SIZE_MAX = 200
+ADMIN_SUBSCRIPTION_FILTERS = {
+    # query parameter: (field, operator, allowed values)
+    'type': ('type', '==', ('EMAIL', 'WEBHOOK')),
+    'frequency': ('frequency', '==', ('REAL_TIME', 'DAILY', 'WEEKLY')),
+    'bedroom': ('bedroomPreferences', 'array_contains', ('ANY', 'B1', 'B2', 'B3', 'B4', 'B5_PLUS')),
+}
+ADMIN_SUBSCRIPTION_SORT_FIELDS = ('createdAt', 'disabled')
+# Queries per page when exclude_unverified skips documents; a page still short after
+# that many is returned as is, with a cursor after the last document read
+ADMIN_PAGE_MAX_FETCHES = 3
+PENDING_VERIFICATIONS_PAGE_SIZE_DEFAULT = 50
+
+# Bulk admin actions: IDs per request and subscriptions per WriteBatch commit (each is
+# up to two writes, the update and its recipient index removal)
+ADMIN_BULK_ACTIONS = ('verify', 'decline', 'disable')
+ADMIN_BULK_MAX_IDS = 500
+ADMIN_BULK_BATCH_SIZE = 200
+RECIPIENT_INDEX_BACKFILL_BATCH_SIZE = 400
+
 # Cloudflare Turnstile configuration
 TURNSTILE_SECRET_KEY = os.environ.get('TURNSTILE_SECRET_KEY', '')
 TURNSTILE_VERIFY_URL = 'https://challenges.cloudflare.com/turnstile/v0/siteverify'
 
-# Admin emails allowed to access admin endpoints
-ADMIN_EMAILS = [email.strip() for email in os.environ.get('ADMIN_EMAILS', '').split(',') if email.strip()]
+# Admin emails allowed to access admin endpoints (parsed once per instance)
+ADMIN_EMAILS = frozenset(email.strip() for email in os.environ.get('ADMIN_EMAILS', '').split(',') if email.strip())
+
+# Verified admin ID tokens are cached per instance (keyed by token hash) until the token
+# expires; revocation is re-checked every ADMIN_TOKEN_REVOCATION_CHECK_SECONDS (0 = always)
+ADMIN_TOKEN_CACHE_MAX_ENTRIES = 128
+ADMIN_TOKEN_REVOCATION_CHECK_SECONDS = int(os.environ.get('ADMIN_TOKEN_REVOCATION_CHECK_SECONDS', '300'))
 
 initialize_app()
 
 
+def select_fields(query, projection):
+    """
+    Restrict a query to one of the FIELD_PROJECTIONS; an empty projection returns
+    document references only
+    """
+    return query.select(FIELD_PROJECTIONS[projection])
+
+
+_http_sessions = {}
+_http_host_stats = {}
+_http_lock = threading.Lock()
+
+
+def get_http_session(url):
+    """
+    Get the pooled requests.Session for the host of the given URL.
+    Sessions are created once per instance and reused so repeated calls to the
+    same host (Discord, Mailgun, thecannon.ca, ...) keep their connections alive.
+    """
+    parsed = urllib.parse.urlsplit(url)
+    host_key = f"{parsed.scheme}://{parsed.netloc}"
+
+    with _http_lock:
+        session = _http_sessions.get(host_key)
+        if session is None:
+            session = requests.Session()
+            # One host per session, so a single connection pool of HTTP_POOL_MAXSIZE
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_MAXSIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _http_sessions[host_key] = session
+        return session
+
+
+def make_retry_policy(max_attempts=3, retry_statuses=(429, 500, 502, 503, 504), base_delay=1, max_delay=30,
+                      idempotent=True):
+    """
+    Build a retry policy for http_request.
+
+    The policy is called as policy(attempt, response, error) after each attempt and
+    returns the number of seconds to wait before retrying, or None to stop.
+    Honors Retry-After (seconds) on 429 responses.
+
+    Pass idempotent=False for requests that must not be repeated once the server
+    may have acted on them (sending an email or a webhook message): only 429s and
+    connection errors are retried then, since a 5xx or a read timeout can follow
+    a delivered message.
+    """
+    if not idempotent:
+        retry_statuses = tuple(status for status in retry_statuses if status == 429)
+
+    def policy(attempt, response, error):
+        if attempt >= max_attempts:
+            return None
+        if error is not None and not idempotent and not isinstance(error, requests.exceptions.ConnectionError):
+            return None
+        if error is None and response.status_code not in retry_statuses:
+            return None
+
+        if response is not None and response.status_code == 429:
+            retry_after = response.headers.get('Retry-After')
+            try:
+                return min(float(retry_after), max_delay)
+            except (TypeError, ValueError):
+                pass
+
+        return min(base_delay * 2 ** (attempt - 1), max_delay)
+
+    return policy
+
+
+def record_http_call(host, latency_ms, is_error):
+    """
+    Record a single outbound call in the per-host latency/error counters
+    """
+    with _http_lock:
+        stats = _http_host_stats.setdefault(host, {
+            'requests': 0,
+            'errors': 0,
+            'total_latency_ms': 0.0,
+            'max_latency_ms': 0.0
+        })
+        stats['requests'] += 1
+        if is_error:
+            stats['errors'] += 1
+        stats['total_latency_ms'] += latency_ms
+        stats['max_latency_ms'] = max(stats['max_latency_ms'], latency_ms)
+
+
+def get_http_stats():
+    """
+    Snapshot of the per-host counters, suitable for storing in a run summary
+    """
+    with _http_lock:
+        snapshot = {}
+        for host, stats in _http_host_stats.items():
+            snapshot[host] = {
+                'requests': stats['requests'],
+                'errors': stats['errors'],
+                'avg_latency_ms': round(stats['total_latency_ms'] / stats['requests'], 1) if stats['requests'] else 0,
+                'max_latency_ms': round(stats['max_latency_ms'], 1)
+            }
+        return snapshot
+
+
+def reset_http_stats():
+    """Clear the per-host counters (called at the start of each scheduled run)"""
+    with _http_lock:
+        _http_host_stats.clear()
+
+
+def http_request(method, url, timeout=None, retry_policy=None, **kwargs):
+    """
+    Send an outbound HTTP request through the shared pooled client.
+
+    Every request gets a (connect, read) timeout; pass timeout to override the
+    read timeout (a number) or both (a tuple). retry_policy is an optional callable
+    from make_retry_policy. Returns the final response, or re-raises the last
+    requests exception if no attempt produced one.
+    """
+    if timeout is None:
+        timeout = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+    elif not isinstance(timeout, tuple):
+        timeout = (HTTP_CONNECT_TIMEOUT, timeout)
+
+    session = get_http_session(url)
+    host = urllib.parse.urlsplit(url).netloc
+
+    attempt = 0
+    while True:
+        attempt += 1
+        response = None
+        error = None
+        started = time.monotonic()
+        try:
+            response = session.request(method, url, timeout=timeout, **kwargs)
+        except requests.exceptions.RequestException as e:
+            error = e
+        latency_ms = (time.monotonic() - started) * 1000
+        record_http_call(host, latency_ms, error is not None or response.status_code >= 400)
+
+        delay = retry_policy(attempt, response, error) if retry_policy else None
+        if delay is None:
+            if error is not None:
+                raise error
+            return response
+
+        print(f"HTTP {method} to {host} attempt {attempt} failed; retrying in {delay} seconds")
+        time.sleep(delay)
+
+
+_admin_token_cache = OrderedDict()
+_admin_token_lock = threading.Lock()
+
+
+def get_cached_admin_token(token_hash, now):
+    """
+    Look up a verified admin token in the cache, dropping it once the token has expired
+    
+    Returns:
+        dict: The cache entry ({'decoded_token', 'expires_at', 'checked_at'}) or None
+    """
+    with _admin_token_lock:
+        entry = _admin_token_cache.get(token_hash)
+        if entry is None:
+            return None
+        if now >= entry['expires_at']:
+            del _admin_token_cache[token_hash]
+            return None
+        _admin_token_cache.move_to_end(token_hash)
+        return entry
+
+
+def cache_admin_token(token_hash, decoded_token, now):
+    """
+    Cache a verified admin token until its exp claim, evicting the least recently
+    used entries beyond ADMIN_TOKEN_CACHE_MAX_ENTRIES
+    """
+    with _admin_token_lock:
+        _admin_token_cache[token_hash] = {
+            'decoded_token': decoded_token,
+            'expires_at': decoded_token.get('exp', now),
+            'checked_at': now,
+        }
+        _admin_token_cache.move_to_end(token_hash)
+        while len(_admin_token_cache) > ADMIN_TOKEN_CACHE_MAX_ENTRIES:
+            _admin_token_cache.popitem(last=False)
+
+
 def verify_admin_token(req):
     """
     Verify Firebase Auth ID token and check admin permissions.
     
+    Successful verifications are cached by token hash until the token expires, so
+    repeated dashboard requests skip signature verification. The cached entry is
+    re-verified with a revocation check every ADMIN_TOKEN_REVOCATION_CHECK_SECONDS.
+    
     Returns:
         dict: {'success': True, 'user': decoded_token} if valid admin
               {'success': False, 'error': str, 'status': int} if invalid
@@ -36,21 +428,34 @@ def verify_admin_token(req):
         return {'success': False, 'error': 'Missing or invalid Authorization header', 'status': 401}
     
     id_token = auth_header.split('Bearer ')[1]
+    token_hash = hashlib.sha256(id_token.encode('utf-8')).hexdigest()
+    now = time.time()
+    
+    entry = get_cached_admin_token(token_hash, now)
+    if entry is not None:
+        if now - entry['checked_at'] < ADMIN_TOKEN_REVOCATION_CHECK_SECONDS:
+            return {'success': True, 'user': entry['decoded_token']}
+        # Due for a revocation check: drop the entry and verify from scratch
+        with _admin_token_lock:
+            _admin_token_cache.pop(token_hash, None)
     
     try:
-        # Verify the ID token with Firebase Admin SDK
-        decoded_token = auth.verify_id_token(id_token)
+        # Verify the ID token with Firebase Admin SDK (also checks it wasn't revoked)
+        decoded_token = auth.verify_id_token(id_token, check_revoked=True)
         user_email = decoded_token.get('email', '')
         
         # Check if user is in admin list
         if user_email not in ADMIN_EMAILS:
             return {'success': False, 'error': 'Unauthorized: Not an admin user', 'status': 403}
         
+        cache_admin_token(token_hash, decoded_token, now)
         return {'success': True, 'user': decoded_token}
-    except auth.InvalidIdTokenError:
-        return {'success': False, 'error': 'Invalid ID token', 'status': 401}
+    except auth.RevokedIdTokenError:
+        return {'success': False, 'error': 'Revoked ID token', 'status': 401}
     except auth.ExpiredIdTokenError:
         return {'success': False, 'error': 'Expired ID token', 'status': 401}
+    except auth.InvalidIdTokenError:
+        return {'success': False, 'error': 'Invalid ID token', 'status': 401}
     except Exception as e:
         return {'success': False, 'error': f'Token verification failed: {str(e)}', 'status': 401}
 
@@ -88,7 +493,7 @@ def verify_turnstile_token(token, remote_ip=None):
         if remote_ip:
             payload['remoteip'] = remote_ip
         
-        response = requests.post(TURNSTILE_VERIFY_URL, data=payload, timeout=10)
+        response = http_request('POST', TURNSTILE_VERIFY_URL, data=payload, timeout=10)
         result = response.json()
         
         if result.get('success'):
@@ -122,30 +527,131 @@ def get_firestore_client():
     """Get Firestore client instance"""
     return firestore.client()
 
-def increment_stats(notifications_sent=0, subscribers_delta=0):
+_pending_stats = {'total_notifications_sent': 0, 'total_subscribers': 0, 'pending_verifications': 0}
+_stats_lock = threading.Lock()
+_stats_cache = {'totals': None, 'expires_at': 0}
+
+
+def increment_stats(notifications_sent=0, subscribers_delta=0, pending_verifications_delta=0, defer=False):
     """
-    Atomically increment stats counters in the metadata/stats document.
+    Increment the stats counters.
+
+    Deltas are accumulated in-process; unless defer is True they are flushed right away.
+    Callers that increment repeatedly within one invocation pass defer=True and call
+    flush_stats() once at the end.
     
     Args:
         notifications_sent: Number of notifications sent to add to the total
         subscribers_delta: Change in subscriber count (+1 for new, -1 for unsubscribe)
+        pending_verifications_delta: Change in the number of EMAIL subscriptions awaiting
+            verification (see is_pending_verification)
+        defer: Keep the deltas in memory until the next flush_stats()
+    """
+    with _stats_lock:
+        _pending_stats['total_notifications_sent'] += notifications_sent
+        _pending_stats['total_subscribers'] += subscribers_delta
+        _pending_stats['pending_verifications'] += pending_verifications_delta
+    
+    if not defer:
+        flush_stats()
+
+
+def flush_stats():
+    """
+    Write the accumulated stats deltas to a random counter shard in a single write.
+    Spreading writes over STATS_COUNTER_SHARDS documents avoids the one-write-per-second
+    limit of a single hot document.
     """
+    with _stats_lock:
+        pending = dict(_pending_stats)
+        for field in _pending_stats:
+            _pending_stats[field] = 0
+    
+    update_data = {field: firestore.Increment(delta) for field, delta in pending.items() if delta != 0}
+    if not update_data:
+        return
+    
     try:
-        if notifications_sent == 0 and subscribers_delta == 0:
-            return
-        
         db = get_firestore_client()
-        stats_ref = db.collection('metadata').document('stats')
-        
-        update_data = {}
-        if notifications_sent != 0:
-            update_data['total_notifications_sent'] = firestore.Increment(notifications_sent)
-        if subscribers_delta != 0:
-            update_data['total_subscribers'] = firestore.Increment(subscribers_delta)
-        
-        stats_ref.set(update_data, merge=True)
+        shard_ref = (
+            db.collection('metadata').document('stats')
+            .collection('shards').document(str(random.randrange(STATS_COUNTER_SHARDS)))
+        )
+        shard_ref.set(update_data, merge=True)
     except Exception as e:
         print(f"Error updating stats: {e}")
+        # Keep the deltas for the next flush
+        with _stats_lock:
+            for field, delta in pending.items():
+                _pending_stats[field] += delta
+
+
+def get_stats_totals(use_cache=True):
+    """
+    Sum the stats counter: the totals on metadata/stats (written before the counter
+    was sharded) plus every shard. Cached per instance for STATS_CACHE_SECONDS.
+    
+    Returns:
+        dict: total_notifications_sent, total_subscribers and pending_verifications
+            (None if never recorded), and pending_verifications_seeded. Until
+            reconcile_stats_core has seeded pending_verifications from a count() of the
+            queue, it only holds the deltas since deploy and must not be used as a total.
+    """
+    if use_cache:
+        with _stats_lock:
+            if _stats_cache['totals'] is not None and time.time() < _stats_cache['expires_at']:
+                return dict(_stats_cache['totals'])
+    
+    db = get_firestore_client()
+    stats_ref = db.collection('metadata').document('stats')
+    stats_doc = stats_ref.get()
+    base = stats_doc.to_dict() if stats_doc.exists else {}
+    
+    totals = {field: base.get(field) for field in ('total_notifications_sent', 'total_subscribers', 'pending_verifications')}
+    for shard in stats_ref.collection('shards').stream():
+        shard_data = shard.to_dict()
+        for field in totals:
+            if field in shard_data:
+                totals[field] = (totals[field] or 0) + shard_data[field]
+    totals['pending_verifications_seeded'] = base.get('pending_verifications_seeded') is True
+    
+    with _stats_lock:
+        _stats_cache['totals'] = dict(totals)
+        _stats_cache['expires_at'] = time.time() + STATS_CACHE_SECONDS
+    return totals
+
+
+def is_pending_verification(subscription_data):
+    """
+    Whether a subscription is in the admin verification queue: an active EMAIL
+    subscription that has been neither verified nor declined
+    """
+    return (
+        subscription_data.get('type') == 'EMAIL'
+        and subscription_data.get('disabled') is None
+        and subscription_data.get('isVerified') is False
+    )
+
+
+def is_unverified_email(subscription_data):
+    """
+    Whether a subscription is an EMAIL subscription that was never verified (pending
+    or declined). The admin subscriptions list leaves these to the verifications page.
+    """
+    return subscription_data.get('type') == 'EMAIL' and subscription_data.get('isVerified') is False
+
+
+def get_pending_verifications_query(db):
+    """
+    Query for the verification queue, served by the (type, isVerified, disabled, createdAt)
+    composite index. Mirrors is_pending_verification.
+    """
+    return (
+        db.collection('subscriptions')
+        .where(filter=FieldFilter('type', '==', 'EMAIL'))
+        .where(filter=FieldFilter('isVerified', '==', False))
+        .where(filter=FieldFilter('disabled', '==', None))
+    )
 
 def get_bedroom_bucket(bedroom_count):
     """
@@ -177,23 +683,19 @@ def get_active_subscriptions():
     Fetch all active (non-disabled) and verified subscriptions from Firestore.
     - EMAIL subscriptions require isVerified=True to receive notifications
     - WEBHOOK subscriptions are always verified (auto-verified on creation)
+    Returns Subscription models.
     """
     try:
         db = get_firestore_client()
         subscriptions_ref = db.collection('subscriptions')
         query = subscriptions_ref.where(filter=FieldFilter('disabled', '==', None))
-        docs = query.stream()
+        docs = select_fields(query, 'active_subscriptions').stream()
         
         active_subscriptions = []
         for doc in docs:
-            subscription_data = doc.to_dict()
-            subscription_data['id'] = doc.id
-            
-            if subscription_data.get('disabled') is None:
-                sub_type = subscription_data.get('type')
-                is_verified = subscription_data.get('isVerified')
-                if sub_type == 'WEBHOOK' or is_verified is True:
-                    active_subscriptions.append(subscription_data)
+            subscription = Subscription.from_document(doc)
+            if subscription.type == 'WEBHOOK' or subscription.is_verified is True:
+                active_subscriptions.append(subscription)
         
         return active_subscriptions
     
@@ -209,12 +711,13 @@ def find_matching_subscriptions(listing_data, frequency_filter=None):
         listing_data: The listing data to match against
         frequency_filter: Optional. If provided, only return subscriptions with this frequency.
                          Can be a string or list of strings (e.g., 'REAL_TIME' or ['DAILY', 'WEEKLY'])
+
+    Returns:
+        list: matching Subscription models
     """
     matching_subscriptions = []
     active_subscriptions = get_active_subscriptions()
-    
-    listing_bedroom_bucket = listing_data.get('bedroom_bucket')
-    listing_price_int = listing_data.get('price_int')
+    listing = Listing(get_listing_id(listing_data.get('listing_url') or ''), listing_data)
 
     # Normalize frequency_filter to a list
     if frequency_filter is None:
@@ -226,18 +729,10 @@ def find_matching_subscriptions(listing_data, frequency_filter=None):
 
     for subscription in active_subscriptions:
         # Check frequency filter first
-        sub_frequency = subscription.get('frequency', 'REAL_TIME')
-        if frequency_list is not None and sub_frequency not in frequency_list:
+        if frequency_list is not None and subscription.frequency not in frequency_list:
             continue
 
-        bedroom_prefs = subscription.get('bedroomPreferences', ['ANY'])
-        sub_min = subscription.get('minPrice')
-        sub_max = subscription.get('maxPrice')
-
-        bedroom_match = ('ANY' in bedroom_prefs or listing_bedroom_bucket in bedroom_prefs)
-        p_match = price_matches(listing_price_int, sub_min, sub_max)
-
-        if bedroom_match and p_match:
+        if subscription.matches(listing):
             matching_subscriptions.append(subscription)
     return matching_subscriptions
 
@@ -254,6 +749,25 @@ def get_readable_bedrooms(bucket):
     }
     return bedroom_map.get(bucket, 'Unknown bedrooms')
 
+def get_readable_bedroom_preferences(bedroom_prefs):
+    """
+    Format a subscription's bedroom preferences for display
+    """
+    if 'ANY' in bedroom_prefs:
+        return 'Any'
+    elif len(bedroom_prefs) == 1:
+        return get_readable_bedrooms(bedroom_prefs[0])
+    else:
+        return ', '.join([get_readable_bedrooms(b) for b in bedroom_prefs])
+
+
+def get_unsubscribe_url(subscription_id):
+    """
+    Unsubscribe link included in every notification
+    """
+    return UNSUBSCRIBE_URL.format(urllib.parse.quote(subscription_id or '', safe=''))
+
+
 def format_price_range(min_price, max_price):
     """
     Format min/max price values into a human-readable string
@@ -284,6 +798,167 @@ def price_matches(price_int, min_price, max_price):
     return True
 
 
+def get_filter_signature(subscription):
+    """
+    Hash of a subscription's normalized filters (bedroom set, minPrice, maxPrice).
+    Subscriptions with the same signature match exactly the same listings.
+    """
+    bedroom_prefs = subscription.get('bedroomPreferences', ['ANY'])
+    bedrooms = ['ANY'] if 'ANY' in bedroom_prefs else sorted(set(bedroom_prefs))
+    key = json.dumps([bedrooms, subscription.get('minPrice'), subscription.get('maxPrice')])
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+
+class Listing:
+    """
+    Listing as used by the matching loop, built once per ingested listing
+    """
+    __slots__ = (
+        'id', 'listing_url', 'image_url', 'address', 'description', 'price_int', 'price_string',
+        'bedroom_count', 'bedroom_bucket', 'bedroom_bit', 'additional_details',
+    )
+    
+    def __init__(self, listing_id, data):
+        self.id = listing_id
+        self.listing_url = data.get('listing_url')
+        self.image_url = data.get('image_url')
+        self.address = data.get('address')
+        self.description = data.get('description')
+        self.price_int = data.get('price_int')
+        self.price_string = data.get('price_string')
+        self.bedroom_count = data.get('bedroom_count')
+        self.bedroom_bucket = data.get('bedroom_bucket') or 'UNKNOWN'
+        self.bedroom_bit = BEDROOM_BUCKET_BITS.get(self.bedroom_bucket, 0)
+        self.additional_details = data.get('additional_details') or {}
+    
+    @classmethod
+    def from_document(cls, doc):
+        return cls(doc.id, doc.to_dict())
+    
+    def to_dict(self):
+        """
+        Firestore-shaped dict (derived fields are dropped)
+        """
+        return {
+            'listing_url': self.listing_url,
+            'image_url': self.image_url,
+            'address': self.address,
+            'description': self.description,
+            'price_int': self.price_int,
+            'price_string': self.price_string,
+            'bedroom_count': self.bedroom_count,
+            'bedroom_bucket': self.bedroom_bucket,
+            'additional_details': self.additional_details,
+        }
+
+
+def get_bedroom_mask(bedroom_preferences):
+    """
+    Bit mask of the bedroom buckets a subscription's preferences cover (ANY covers all)
+    """
+    if 'ANY' in bedroom_preferences:
+        return ANY_BEDROOM_MASK
+    mask = 0
+    for bucket in bedroom_preferences:
+        mask |= BEDROOM_BUCKET_BITS.get(bucket, 0)
+    return mask
+
+
+class Subscription:
+    """
+    Subscription as used by matching and digests, built once per Firestore document.
+    Derived fields (bedroom mask, display strings, recipient key, unsubscribe URL,
+    filter signature) are computed here instead of on every match and render.
+    """
+    __slots__ = (
+        'id', 'type', 'email', 'webhook_url', 'frequency', 'bedroom_preferences', 'min_price', 'max_price',
+        'send_time', 'is_verified', 'next_digest_due_at', 'digest_failures', 'bedroom_mask', 'readable_bedrooms',
+        'readable_price_range', 'recipient_key', 'unsubscribe_url', 'filter_signature',
+    )
+    
+    def __init__(self, subscription_id, data):
+        self.id = subscription_id
+        self.type = data.get('type')
+        self.email = data.get('email')
+        self.webhook_url = data.get('webhookUrl')
+        self.frequency = data.get('frequency', 'REAL_TIME')
+        self.bedroom_preferences = data.get('bedroomPreferences', ['ANY'])
+        self.min_price = data.get('minPrice')
+        self.max_price = data.get('maxPrice')
+        self.send_time = data.get('sendTime')
+        self.is_verified = data.get('isVerified')
+        self.next_digest_due_at = data.get('nextDigestDueAt')
+        self.digest_failures = data.get('digestFailures') or 0
+        
+        self.bedroom_mask = get_bedroom_mask(self.bedroom_preferences)
+        self.readable_bedrooms = get_readable_bedroom_preferences(self.bedroom_preferences)
+        self.readable_price_range = format_price_range(self.min_price, self.max_price)
+        self.recipient_key = get_recipient_key(data)
+        self.unsubscribe_url = get_unsubscribe_url(subscription_id)
+        self.filter_signature = get_filter_signature(data)
+    
+    @classmethod
+    def from_document(cls, doc):
+        return cls(doc.id, doc.to_dict())
+    
+    def matches(self, listing):
+        """
+        Check a Listing against this subscription's bedroom and price filters
+        """
+        return bool(self.bedroom_mask & listing.bedroom_bit) and price_matches(listing.price_int, self.min_price, self.max_price)
+    
+    def to_dict(self):
+        """
+        Firestore-shaped dict with the document ID (derived fields are dropped)
+        """
+        return {
+            'id': self.id,
+            'type': self.type,
+            'email': self.email,
+            'webhookUrl': self.webhook_url,
+            'frequency': self.frequency,
+            'bedroomPreferences': self.bedroom_preferences,
+            'minPrice': self.min_price,
+            'maxPrice': self.max_price,
+            'sendTime': self.send_time,
+        }
+
+
+def get_price_sort_key(listing):
+    """
+    Sort key for price-ordered listing summaries; missing prices sort first as 0
+    """
+    return listing.get('price_int') or 0
+
+
+def filter_rollup_for_subscription(rollup, subscription):
+    """
+    Return the listings in a rollup window ({bedroom_bucket: summaries sorted by price})
+    that match a Subscription's bedroom and price filters, newest first.
+
+    Only the subscription's buckets are visited, and the price bounds are located by
+    bisection, so non-matching price ranges are never scanned. Same semantics as
+    price_matches: with any bound set, listings without a positive price are excluded.
+    """
+    sub_min = subscription.min_price
+    sub_max = subscription.max_price
+    buckets = [bucket for bucket in rollup if BEDROOM_BUCKET_BITS.get(bucket, 0) & subscription.bedroom_mask]
+    
+    matching_listings = []
+    for bucket in buckets:
+        summaries = rollup[bucket]
+        if sub_min is None and sub_max is None:
+            matching_listings.extend(summaries)
+            continue
+        lower = max(sub_min, 1) if sub_min is not None else 1
+        start = bisect_left(summaries, lower, key=get_price_sort_key)
+        end = bisect_right(summaries, sub_max, key=get_price_sort_key) if sub_max is not None else len(summaries)
+        matching_listings.extend(summaries[start:end])
+    
+    matching_listings.sort(key=lambda listing: listing['created_at'].timestamp(), reverse=True)
+    return matching_listings
+
+
 def price_intervals_overlap(min1, max1, min2, max2):
     """
     Check if two price intervals overlap.
@@ -294,21 +969,173 @@ def price_intervals_overlap(min1, max1, min2, max2):
     return not (left1_gt_right2 or left2_gt_right1)
 
 
+_email_templates = None
+_email_templates_lock = threading.Lock()
+EMAIL_TEMPLATE_TOKEN_PATTERN = re.compile(r'\{\{\{(\w+)\}\}\}|\{\{(\w+)\}\}')
+
+
+def load_email_templates():
+    """
+    Load the precompiled email templates once per instance.
+    Returns None if they were not built, so callers fall back to the Node renderer.
+    """
+    global _email_templates
+    with _email_templates_lock:
+        if _email_templates is None:
+            manifest_path = os.path.join(EMAIL_TEMPLATES_DIR, 'manifest.json')
+            try:
+                with open(manifest_path, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+                templates = {}
+                for name in manifest['templates']:
+                    with open(os.path.join(EMAIL_TEMPLATES_DIR, f'{name}.html'), 'r', encoding='utf-8') as f:
+                        templates[name] = f.read()
+                _email_templates = {'templates': templates, 'preview': manifest['preview']}
+            except Exception as e:
+                print(f"Precompiled email templates unavailable, using render API: {e}")
+                _email_templates = {}
+        return _email_templates or None
+
+
+def js_length(text):
+    """String length as JavaScript counts it (UTF-16 code units)"""
+    return len(text.encode('utf-16-le')) // 2
+
+
+def js_slice(text, length):
+    """Equivalent of JavaScript text.substring(0, length)"""
+    return text.encode('utf-16-le')[:length * 2].decode('utf-16-le', errors='ignore')
+
+
+def fill_email_template(template, values):
+    """
+    Substitute template tokens: {{name}} is HTML-escaped the same way React escapes
+    text and attributes, {{{name}}} is inserted as-is (pre-rendered markup)
+    """
+    def replace(match):
+        if match.group(1):
+            return values[match.group(1)]
+        return html_escape(values[match.group(2)], quote=True)
+    return EMAIL_TEMPLATE_TOKEN_PATTERN.sub(replace, template)
+
+
+def render_preview_block(preview_config, text):
+    """
+    Rebuild the React Email <Preview> block, including its whitespace padding
+    """
+    max_length = preview_config['maxLength']
+    text = js_slice(text, max_length)
+    padding = ''
+    if js_length(text) < max_length:
+        padding = '<div>' + preview_config['whitespaceUnit'] * (max_length - js_length(text)) + '</div>'
+    return preview_config['open'] + html_escape(text, quote=True) + padding + preview_config['close']
+
+
+def render_alert_email_locally(email_props):
+    """
+    Render TheCannonAlertEmail in-process from the precompiled templates.
+    Returns None when the templates are unavailable or the props need a branch
+    the templates don't cover, so the caller can use the render API instead.
+    """
+    compiled = load_email_templates() if LOCAL_EMAIL_RENDER_ENABLED else None
+    if not compiled:
+        return None
+    
+    text_fields = ['price', 'bedrooms', 'address', 'description', 'listingUrl',
+                   'subscriptionBedrooms', 'subscriptionPriceRange', 'postedAtText',
+                   'unsubscribeUrl', 'listingsOverviewUrl']
+    if not all(isinstance(email_props.get(field), str) for field in text_fields) or not email_props['postedAtText']:
+        return None
+    
+    values = {field: email_props[field] for field in text_fields}
+    
+    description = values['description']
+    if js_length(description) > 200:
+        values['description'] = js_slice(description, 197) + '...'
+    
+    cover_image_url = email_props.get('coverImageUrl')
+    if cover_image_url:
+        values['coverImageUrl'] = cover_image_url
+        template = compiled['templates']['alert_image']
+    else:
+        template = compiled['templates']['alert_noimage']
+    
+    preview_text = f"New listing on TheCannon matches your alerts: {values['price']} - {values['bedrooms']} - {values['address']}"
+    values['preview'] = render_preview_block(compiled['preview'], preview_text)
+    
+    return fill_email_template(template, values)
+
+
+def render_digest_email_locally(email_props, render_cache=None):
+    """
+    Render TheCannonDigestEmail in-process from the precompiled templates.
+    Returns None when it can't, so the caller can use the render API instead.
+
+    render_cache is an optional dict shared by subscribers with the same filters;
+    the rendered listing-card section is stored there and reused.
+    """
+    compiled = load_email_templates() if LOCAL_EMAIL_RENDER_ENABLED else None
+    if not compiled:
+        return None
+    
+    text_fields = ['subscriptionBedrooms', 'subscriptionPriceRange', 'unsubscribeUrl',
+                   'listingsOverviewUrl', 'periodStart', 'periodEnd']
+    if not all(isinstance(email_props.get(field), str) and email_props[field] for field in text_fields):
+        return None
+    
+    digest_type = email_props.get('digestType')
+    if digest_type not in ('daily', 'weekly'):
+        return None
+    
+    cards_html = render_cache.get('cards_html') if render_cache is not None else None
+    if cards_html is None:
+        cards = []
+        for listing in email_props['listings']:
+            card_fields = ['price', 'bedrooms', 'address', 'listingUrl']
+            if not all(isinstance(listing.get(field), str) for field in card_fields):
+                return None
+            card_values = {field: listing[field] for field in card_fields}
+            
+            if listing.get('coverImageUrl'):
+                card_values['coverImageUrl'] = listing['coverImageUrl']
+            if listing.get('dateAvailable'):
+                card_values['dateAvailable'] = listing['dateAvailable']
+            
+            card_name = 'digest_card_{}_{}'.format(
+                'image' if listing.get('coverImageUrl') else 'noimage',
+                'date' if listing.get('dateAvailable') else 'nodate'
+            )
+            cards.append(fill_email_template(compiled['templates'][card_name], card_values))
+        
+        cards_html = ''.join(cards)
+        if render_cache is not None:
+            render_cache['cards_html'] = cards_html
+    
+    listing_count = len(email_props['listings'])
+    period_text = 'today' if digest_type == 'daily' else 'this week'
+    if listing_count > 0:
+        preview_text = (
+            f"{listing_count} new listing{'' if listing_count == 1 else 's'} "
+            f"match{'es' if listing_count == 1 else ''} your alerts {period_text}"
+        )
+    else:
+        preview_text = f"No new listings matched your alerts {period_text}"
+    
+    variant = 'none' if listing_count == 0 else 'one' if listing_count == 1 else 'many'
+    values = {field: email_props[field] for field in text_fields}
+    values['listings'] = cards_html
+    values['listingCount'] = str(listing_count)
+    values['preview'] = render_preview_block(compiled['preview'], preview_text)
+    
+    return fill_email_template(compiled['templates'][f'digest_{digest_type}_{variant}'], values)
+
+
 def render_email_via_api(listing_data, subscription):
     """
     Call the Next.js API to render the React Email template
     """
     try:
-        bedroom_prefs = subscription.get('bedroomPreferences', ['ANY'])
-
-        # Format bedroom preferences for display
-        if 'ANY' in bedroom_prefs:
-            readable_sub_bedrooms = 'Any'
-        elif len(bedroom_prefs) == 1:
-            readable_sub_bedrooms = get_readable_bedrooms(bedroom_prefs[0])
-        else:
-            readable_sub_bedrooms = ', '.join([get_readable_bedrooms(b) for b in bedroom_prefs])
-
+        readable_sub_bedrooms = get_readable_bedroom_preferences(subscription.get('bedroomPreferences', ['ANY']))
         readable_sub_price = format_price_range(subscription.get('minPrice'), subscription.get('maxPrice'))
 
         email_props = {
@@ -321,9 +1148,15 @@ def render_email_via_api(listing_data, subscription):
             'subscriptionBedrooms': readable_sub_bedrooms,
             'subscriptionPriceRange': readable_sub_price,
             'postedAtText': 'Posted today',
-            'unsubscribeUrl': f'https://thecannonalerts.ca/unsubscribe?id={urllib.parse.quote(subscription.get("id", ""), safe="")}',
+            'unsubscribeUrl': get_unsubscribe_url(subscription.get('id')),
             'listingsOverviewUrl': 'https://thecannon.ca/housing/?wanted_forsale=forsale&sortby=date'
         }
+        
+        # Zero-hop fast path; falls through to the render API if it can't handle these props
+        html_content = render_alert_email_locally(email_props)
+        if html_content:
+            return html_content
+        
         is_production = os.environ.get('FUNCTIONS_EMULATOR') is None
         
         custom_urls = os.environ.get("EMAIL_RENDER_URLS")
@@ -356,22 +1189,20 @@ def render_email_via_api(listing_data, subscription):
             else:
                 api_urls = [f"http://127.0.0.1:5001/{project_id}/us-central1/renderEmail"]
         
-        max_attempts = 5
-        for attempt in range(1, max_attempts + 1):
-            for api_url in api_urls:
-                try:
-                    response = requests.post(api_url, json=email_props, timeout=10)
-                    
-                    if response.status_code == 200:
-                        return response.text
-                    print(f"Render attempt {attempt} to {api_url} returned status {response.status_code}")
-                except requests.exceptions.RequestException as e:
-                    print(f"Failed to connect to {api_url} on attempt {attempt}: {e}")
-                # If one URL fails, try the next URL before deciding to back off
-            if attempt < max_attempts:
-                delay_seconds = min(2 ** attempt, 30)
-                print(f"Render attempt {attempt} failed; retrying in {delay_seconds} seconds")
-                time.sleep(delay_seconds)
+        # Rendering has no side effects, so each URL gets the full retry policy;
+        # if one URL still fails, try the next
+        for api_url in api_urls:
+            try:
+                response = http_request(
+                    'POST', api_url, json=email_props, timeout=10,
+                    retry_policy=make_retry_policy(max_attempts=5, base_delay=2, idempotent=True)
+                )
+                
+                if response.status_code == 200:
+                    return response.text
+                print(f"Render request to {api_url} returned status {response.status_code}")
+            except requests.exceptions.RequestException as e:
+                print(f"Failed to connect to {api_url}: {e}")
         
         print("Exhausted email render attempts; not sending email")
         return None
@@ -384,6 +1215,15 @@ def send_email_via_mailgun(to_email, subject, html_content):
     """
     Send email using Mailgun API
     """
+    return post_email_via_mailgun(to_email, subject, html_content) == 200
+
+def post_email_via_mailgun(to_email, subject, html_content):
+    """
+    Send email using Mailgun API
+
+    Returns:
+        int: Mailgun's HTTP status code, or None if no request was made or it failed
+    """
     try:
         MAILGUN_DOMAIN = os.environ.get('MAILGUN_DOMAIN', '').strip()
         MAILGUN_API_KEY = os.environ.get('MAILGUN_API_KEY', '').strip()
@@ -401,7 +1241,7 @@ def send_email_via_mailgun(to_email, subject, html_content):
         
         if not MAILGUN_DOMAIN or not MAILGUN_API_KEY:
             print(f"Error: Mailgun configuration not found in environment variables or .runtimeconfig.json")
-            return False
+            return None
         
         url = f"https://api.mailgun.net/v3/{MAILGUN_DOMAIN}/messages"
         
@@ -412,51 +1252,47 @@ def send_email_via_mailgun(to_email, subject, html_content):
             "html": html_content
         }
         
-        response = requests.post(
+        response = http_request(
+            'POST',
             url,
             auth=("api", MAILGUN_API_KEY),
-            data=data
+            data=data,
+            retry_policy=make_retry_policy(idempotent=False)
         )
         
-        if response.status_code == 200:
-            return True
-        else:
+        if response.status_code != 200:
             print(f"Mailgun error {response.status_code}: {response.text}")
-            return False
+        return response.status_code
             
     except Exception as e:
         print(f"Error sending email via Mailgun: {e}")
-        return False
+        return None
 
-def render_digest_email_via_api(listings_data, subscription, digest_type):
+def render_digest_email_via_api(listings_data, subscription, digest_type, render_cache=None):
     """
     Call the Next.js API to render the React Email digest template
+
+    subscription is a Subscription model, whose display strings are precomputed.
+    render_cache is an optional dict shared by subscribers with the same filter
+    signature, so the formatted listings and card markup are built once per group.
     """
     try:
-        bedroom_prefs = subscription.get('bedroomPreferences', ['ANY'])
-
-        # Format bedroom preferences for display
-        if 'ANY' in bedroom_prefs:
-            readable_sub_bedrooms = 'Any'
-        elif len(bedroom_prefs) == 1:
-            readable_sub_bedrooms = get_readable_bedrooms(bedroom_prefs[0])
-        else:
-            readable_sub_bedrooms = ', '.join([get_readable_bedrooms(b) for b in bedroom_prefs])
-
-        readable_sub_price = format_price_range(subscription.get('minPrice'), subscription.get('maxPrice'))
-
         # Format listings for the digest email
-        formatted_listings = []
-        for listing in listings_data:
-            formatted_listings.append({
-                'price': listing.get('price_string', f'${listing.get("price_int", "Unknown")}'),
-                'bedrooms': get_readable_bedrooms(listing.get('bedroom_bucket', '')),
-                'address': listing.get('address', 'Address not available'),
-                'coverImageUrl': listing.get('image_url'),
-                'listingUrl': listing.get('listing_url', '#'),
-                'dateAvailable': listing.get('additional_details', {}).get('date_available'),
-                'features': listing.get('additional_details', {}).get('features', []),
-            })
+        formatted_listings = render_cache.get('formatted_listings') if render_cache is not None else None
+        if formatted_listings is None:
+            formatted_listings = []
+            for listing in listings_data:
+                formatted_listings.append({
+                    'price': listing.get('price_string', f'${listing.get("price_int", "Unknown")}'),
+                    'bedrooms': get_readable_bedrooms(listing.get('bedroom_bucket', '')),
+                    'address': listing.get('address', 'Address not available'),
+                    'coverImageUrl': listing.get('image_url'),
+                    'listingUrl': listing.get('listing_url', '#'),
+                    'dateAvailable': listing.get('additional_details', {}).get('date_available'),
+                    'features': listing.get('additional_details', {}).get('features', []),
+                })
+            if render_cache is not None:
+                render_cache['formatted_listings'] = formatted_listings
         
         # Calculate period dates
         now = datetime.now()
@@ -470,14 +1306,19 @@ def render_digest_email_via_api(listings_data, subscription, digest_type):
         email_props = {
             'listings': formatted_listings,
             'digestType': digest_type,
-            'subscriptionBedrooms': readable_sub_bedrooms,
-            'subscriptionPriceRange': readable_sub_price,
-            'unsubscribeUrl': f'https://thecannonalerts.ca/unsubscribe?id={urllib.parse.quote(subscription.get("id", ""), safe="")}',
+            'subscriptionBedrooms': subscription.readable_bedrooms,
+            'subscriptionPriceRange': subscription.readable_price_range,
+            'unsubscribeUrl': subscription.unsubscribe_url,
             'listingsOverviewUrl': 'https://thecannon.ca/housing/?wanted_forsale=forsale&sortby=date',
             'periodStart': period_start,
             'periodEnd': period_end,
         }
         
+        # Zero-hop fast path; falls through to the render API if it can't handle these props
+        html_content = render_digest_email_locally(email_props, render_cache)
+        if html_content:
+            return html_content
+        
         is_production = os.environ.get('FUNCTIONS_EMULATOR') is None
         
         custom_urls = os.environ.get("EMAIL_RENDER_URLS")
@@ -509,21 +1350,20 @@ def render_digest_email_via_api(listings_data, subscription, digest_type):
             else:
                 api_urls = [f"http://127.0.0.1:5001/{project_id}/us-central1/renderDigestEmail"]
         
-        max_attempts = 5
-        for attempt in range(1, max_attempts + 1):
-            for api_url in api_urls:
-                try:
-                    response = requests.post(api_url, json=email_props, timeout=15)
-                    
-                    if response.status_code == 200:
-                        return response.text
-                    print(f"Digest render attempt {attempt} to {api_url} returned status {response.status_code}")
-                except requests.exceptions.RequestException as e:
-                    print(f"Failed to connect to {api_url} on attempt {attempt}: {e}")
-            if attempt < max_attempts:
-                delay_seconds = min(2 ** attempt, 30)
-                print(f"Digest render attempt {attempt} failed; retrying in {delay_seconds} seconds")
-                time.sleep(delay_seconds)
+        # Rendering has no side effects, so each URL gets the full retry policy;
+        # if one URL still fails, try the next
+        for api_url in api_urls:
+            try:
+                response = http_request(
+                    'POST', api_url, json=email_props, timeout=15,
+                    retry_policy=make_retry_policy(max_attempts=5, base_delay=2, idempotent=True)
+                )
+                
+                if response.status_code == 200:
+                    return response.text
+                print(f"Digest render request to {api_url} returned status {response.status_code}")
+            except requests.exceptions.RequestException as e:
+                print(f"Failed to connect to {api_url}: {e}")
         
         print("Exhausted digest email render attempts; not sending email")
         return None
@@ -533,16 +1373,16 @@ def render_digest_email_via_api(listings_data, subscription, digest_type):
         return None
 
 
-def send_digest_email_notification(subscription, listings_data, digest_type):
+def send_digest_email_notification(subscription, listings_data, digest_type, render_cache=None):
     """
     Send digest email notification for multiple listings using Mailgun and React Email
     """
     try:
-        email = subscription.get('email')
+        email = subscription.email
         if not email:
             return False
         
-        html_content = render_digest_email_via_api(listings_data, subscription, digest_type)
+        html_content = render_digest_email_via_api(listings_data, subscription, digest_type, render_cache)
         
         if not html_content:
             print(f"Failed to render digest email template for {email}")
@@ -565,114 +1405,201 @@ def send_email_notification(subscription, listing_data):
     """
     Send email notification for a matching listing using Mailgun and React Email
     """
+    return deliver_email_notification(subscription, listing_data) == 200
+
+def deliver_email_notification(subscription, listing_data):
+    """
+    Send email notification for a matching listing using Mailgun and React Email
+
+    Returns:
+        int: Mailgun's HTTP status code, or None if the email wasn't sent (no address,
+             render failure, Mailgun unreachable)
+    """
     try:
         email = subscription.get('email')
         if not email:
-            return False
+            return None
         
         html_content = render_email_via_api(listing_data, subscription)
         
         if not html_content:
             print(f"Failed to render email template for {email}")
-            return False
+            return None
         
         price = listing_data.get('price_string', f'${listing_data.get("price_int", "Unknown")}')
         address = listing_data.get('address', 'New listing')
         subject = f"New TheCannon Match: {price} - {address}"
         
-        success = send_email_via_mailgun(email, subject, html_content)
-        
-        return success
+        return post_email_via_mailgun(email, subject, html_content)
         
     except Exception as e:
         print(f"Error sending email notification: {e}")
-        return False
+        return None
 
-def send_webhook_notification(subscription, listing_data):
+def truncate_embed_text(text, limit):
     """
-    Send Discord webhook notification for a matching listing
+    Trim text to a Discord embed field limit, marking the cut with an ellipsis
     """
-    try:
-        webhook_url = subscription.get('webhookUrl')
-        if not webhook_url:
-            return False
-        
-        embed = {
-            "title": "New TheCannon Listing Match!",
-            "description": f"A new listing matches your criteria",
-            "color": 0xEAB308,
-            "fields": [
-                {
-                    "name": "Address",
-                    "value": listing_data.get('address', 'Unknown address'),
-                    "inline": True
-                },
-                {
-                    "name": "Price",
-                    "value": listing_data.get('price_string', 'Unknown price'),
-                    "inline": True
-                },
-                {
-                    "name": "Bedrooms",
-                    "value": listing_data.get('bedroom_count', 'Unknown'),
-                    "inline": True
-                }
-            ],
-            "url": listing_data.get('listing_url', ''),
-            "timestamp": datetime.now().isoformat()
+    text = str(text)
+    if len(text) > limit:
+        return text[:limit - 3] + "..."
+    return text
+
+
+def get_embed_char_count(embed):
+    """
+    Count the characters Discord includes in its per-message embed total
+    """
+    count = len(embed.get('title', '')) + len(embed.get('description', ''))
+    count += len(embed.get('footer', {}).get('text', ''))
+    count += len(embed.get('author', {}).get('name', ''))
+    for field in embed.get('fields', []):
+        count += len(field['name']) + len(field['value'])
+    return count
+
+
+def build_listing_embed(subscription, listing_data):
+    """
+    Build the Discord embed for a single listing match, enforcing embed limits
+    """
+    fields = [
+        {
+            "name": "Address",
+            "value": truncate_embed_text(listing_data.get('address') or 'Unknown address', DISCORD_FIELD_VALUE_LIMIT),
+            "inline": True
+        },
+        {
+            "name": "Price",
+            "value": truncate_embed_text(listing_data.get('price_string') or 'Unknown price', DISCORD_FIELD_VALUE_LIMIT),
+            "inline": True
+        },
+        {
+            "name": "Bedrooms",
+            "value": truncate_embed_text(listing_data.get('bedroom_count') or 'Unknown', DISCORD_FIELD_VALUE_LIMIT),
+            "inline": True
         }
-        
-        if listing_data.get('image_url'):
-            embed["thumbnail"] = {"url": listing_data['image_url']}
-        
-        if listing_data.get('description'):
-            description = listing_data['description']
-            if len(description) > 200:
-                description = description[:197] + "..."
-            embed["fields"].append({
-                "name": "Description",
-                "value": description,
-                "inline": False
-            })
-        
-        embed["fields"].append({
-            "name": "Manage Subscription",
-            "value": f"[Unsubscribe from alerts](https://thecannonalerts.ca/unsubscribe?id={urllib.parse.quote(subscription.get('id', ''), safe='')})",
+    ]
+    
+    if listing_data.get('description'):
+        fields.append({
+            "name": "Description",
+            "value": truncate_embed_text(listing_data['description'], DISCORD_DESCRIPTION_PREVIEW_LENGTH),
             "inline": False
         })
-        
-        payload = {
-            "embeds": [embed]
-        }
-        
-        response = requests.post(webhook_url, json=payload)
-        
-        if response.status_code == 204:
-            return True
-        else:
-            return False
-            
+    
+    fields.append({
+        "name": "Manage Subscription",
+        "value": f"[Unsubscribe from alerts]({get_unsubscribe_url(subscription.get('id'))})",
+        "inline": False
+    })
+    
+    embed = {
+        "title": "New TheCannon Listing Match!",
+        "description": "A new listing matches your criteria",
+        "color": 0xEAB308,
+        "fields": fields,
+        "timestamp": datetime.now().isoformat()
+    }
+    
+    if listing_data.get('listing_url'):
+        embed["url"] = listing_data['listing_url']
+    
+    if listing_data.get('image_url'):
+        embed["thumbnail"] = {"url": listing_data['image_url']}
+    
+    return embed
+
+
+def chunk_embeds(embeds):
+    """
+    Split embeds into message-sized groups that respect Discord's per-message
+    embed count and total character limits
+    """
+    chunks = []
+    current = []
+    current_chars = 0
+    for embed in embeds:
+        embed_chars = get_embed_char_count(embed)
+        if current and (len(current) >= DISCORD_MAX_EMBEDS_PER_MESSAGE or
+                        current_chars + embed_chars > DISCORD_MAX_MESSAGE_EMBED_CHARS):
+            chunks.append(current)
+            current = []
+            current_chars = 0
+        current.append(embed)
+        current_chars += embed_chars
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def send_webhook_batch(webhook_url, matches):
+    """
+    Send several listing matches to one Discord webhook as multi-embed messages.
+
+    Args:
+        webhook_url: The Discord webhook URL
+        matches: List of (subscription, listing_data) tuples
+
+    Returns:
+        list: One HTTP status code per match, in the same order (204 means delivered,
+              None means the request itself failed)
+    """
+    if not webhook_url:
+        return [None] * len(matches)
+    
+    embeds = [build_listing_embed(subscription, listing_data) for subscription, listing_data in matches]
+    
+    status_codes = []
+    for chunk in chunk_embeds(embeds):
+        try:
+            response = http_request('POST', webhook_url, json={"embeds": chunk}, retry_policy=make_retry_policy(idempotent=False))
+            status_code = response.status_code
+            if status_code != 204:
+                print(f"Discord webhook returned status {status_code}")
+        except Exception as e:
+            print(f"Error sending webhook notification: {e}")
+            status_code = None
+        status_codes.extend([status_code] * len(chunk))
+    
+    return status_codes
+
+
+def send_webhook_notification(subscription, listing_data):
+    """
+    Send Discord webhook notification for a matching listing
+    """
+    try:
+        return send_webhook_batch(subscription.get('webhookUrl'), [(subscription, listing_data)])[0] == 204
     except Exception as e:
         print(f"Error sending webhook notification: {e}")
         return False
 
+def get_verification_webhook_url():
+    """
+    Discord webhook URL for admin verification pings (VERIFICATION_WEBHOOK_URL, or
+    .runtimeconfig.json for local development); empty if not configured
+    """
+    webhook_url = os.environ.get('VERIFICATION_WEBHOOK_URL', '').strip()
+    
+    # For local development, check .runtimeconfig.json
+    if not webhook_url:
+        runtimeconfig_path = os.path.join(os.path.dirname(__file__), '.runtimeconfig.json')
+        if os.path.exists(runtimeconfig_path):
+            try:
+                with open(runtimeconfig_path, 'r') as f:
+                    config = json.load(f)
+                    webhook_url = config.get('verification_webhook_url', '').strip() or webhook_url
+            except Exception as e:
+                print(f"Error reading .runtimeconfig.json: {e}")
+    
+    return webhook_url
+
 def send_verification_webhook_notification(subscription_data, subscription_id):
     """
     Send Discord webhook notification when a new email subscription requires verification
     """
     try:
-        webhook_url = os.environ.get('VERIFICATION_WEBHOOK_URL', '').strip()
-        
-        # For local development, check .runtimeconfig.json
-        if not webhook_url:
-            runtimeconfig_path = os.path.join(os.path.dirname(__file__), '.runtimeconfig.json')
-            if os.path.exists(runtimeconfig_path):
-                try:
-                    with open(runtimeconfig_path, 'r') as f:
-                        config = json.load(f)
-                        webhook_url = config.get('verification_webhook_url', '').strip() or webhook_url
-                except Exception as e:
-                    print(f"Error reading .runtimeconfig.json: {e}")
+        webhook_url = get_verification_webhook_url()
         
         if not webhook_url:
             print("VERIFICATION_WEBHOOK_URL not configured, skipping notification")
@@ -730,7 +1657,9 @@ def send_verification_webhook_notification(subscription_data, subscription_id):
             "embeds": [embed]
         }
         
-        response = requests.post(webhook_url, json=payload, timeout=10)
+        response = http_request(
+            'POST', webhook_url, json=payload, timeout=10, retry_policy=make_retry_policy(idempotent=False)
+        )
         
         if response.status_code in [200, 204]:
             return True
@@ -742,171 +1671,719 @@ def send_verification_webhook_notification(subscription_data, subscription_id):
         print(f"Error sending verification webhook notification: {e}")
         return False
 
-def send_notifications_for_listing(listing_data):
+def enqueue_verification_notification(subscription_data, subscription_id):
+    """
+    Hand the admin verification ping to verification_notification_worker, which
+    retries on its own. If the task can't be enqueued (e.g. in the emulator), send
+    it inline instead; a background thread could be starved once the response is sent.
+    """
+    try:
+        admin_functions.task_queue(VERIFICATION_NOTIFY_QUEUE).enqueue({'subscription_id': subscription_id})
+    except Exception as e:
+        print(f"Could not enqueue verification notification, sending inline: {e}")
+        if not send_verification_webhook_notification(subscription_data, subscription_id):
+            print(f"Verification notification for {subscription_id} failed; "
+                  "it is still listed under pending verifications")
+
+def get_listing_id(listing_url):
+    """
+    Derive the Firestore listing document ID from a listing URL
+    """
+    if listing_url.endswith('/'):
+        return listing_url.split('/')[-2]
+    return listing_url.split('/')[-1]
+
+
+def get_recipient_key(subscription):
+    """
+    Normalized recipient identity used to deduplicate deliveries.
+    Emails are compared case-insensitively; webhook URLs as-is.
+    """
+    if subscription.get('type') == 'EMAIL':
+        email = (subscription.get('email') or '').strip().lower()
+        return f"EMAIL:{email}" if email else None
+    if subscription.get('type') == 'WEBHOOK':
+        webhook_url = (subscription.get('webhookUrl') or '').strip()
+        return f"WEBHOOK:{webhook_url}" if webhook_url else None
+    return None
+
+
+def get_outbox_key(listing_id, recipient_key):
+    """
+    Idempotency key for a (listing, recipient) delivery, used as the outbox document ID
+    """
+    recipient_hash = hashlib.sha256(recipient_key.encode('utf-8')).hexdigest()[:24]
+    return f"{listing_id}_{recipient_hash}"
+
+
+def send_notification(subscription, listing_data):
+    """
+    Send a single real-time notification using the subscription's delivery method
+    """
+    if subscription.get('type') == 'EMAIL':
+        return send_email_notification(subscription, listing_data)
+    if subscription.get('type') == 'WEBHOOK':
+        return send_webhook_notification(subscription, listing_data)
+    return False
+
+
+def enqueue_notifications_for_listing(listing_data):
     """
-    Find matching subscriptions and send notifications.
-    Only sends to REAL_TIME subscribers (digest subscribers get batched notifications).
-    Deduplicates by email/webhook to prevent sending multiple notifications
-    to the same recipient for the same listing.
+    Find matching REAL_TIME subscriptions and record one outbox entry per unique recipient.
+    Digest subscribers get batched notifications instead.
+
+    Entries are keyed by (listing, recipient) and written with create(), so the
+    document ID is the guard: enqueueing the same listing twice, even from concurrent
+    runs, never creates a second delivery. Returns the number of new entries written.
     """
     try:
-        # Only find subscriptions with REAL_TIME frequency
         matching_subscriptions = find_matching_subscriptions(listing_data, frequency_filter='REAL_TIME')
         
         if not matching_subscriptions:
-            return {"sent": 0, "errors": 0}
+            return 0
         
-        # Deduplicate subscriptions by email/webhook
-        # Use the first matching subscription for each unique recipient
-        seen_emails = set()
-        seen_webhooks = set()
-        unique_subscriptions = []
+        listing_id = get_listing_id(listing_data['listing_url'])
         
+        # Use the first matching subscription for each unique recipient
+        entries = {}
         for subscription in matching_subscriptions:
-            if subscription['type'] == 'EMAIL':
-                email = subscription.get('email', '').lower()
-                if email and email not in seen_emails:
-                    seen_emails.add(email)
-                    unique_subscriptions.append(subscription)
-            elif subscription['type'] == 'WEBHOOK':
-                webhook_url = subscription.get('webhookUrl', '')
-                if webhook_url and webhook_url not in seen_webhooks:
-                    seen_webhooks.add(webhook_url)
-                    unique_subscriptions.append(subscription)
-        
-        sent_count = 0
-        error_count = 0
-        
-        for subscription in unique_subscriptions:
+            recipient_key = subscription.recipient_key
+            if not recipient_key:
+                continue
+            outbox_key = get_outbox_key(listing_id, recipient_key)
+            if outbox_key not in entries:
+                entries[outbox_key] = (recipient_key, subscription)
+        
+        db = get_firestore_client()
+        outbox_ref = db.collection('notification_outbox')
+        refs = [outbox_ref.document(key) for key in entries]
+        
+        # Skip entries that already exist so retries keep their status and attempt count
+        # (a cheap pre-check; create() below is what rules out duplicates)
+        existing_keys = set()
+        for i in range(0, len(refs), OUTBOX_BATCH_SIZE):
+            for snapshot in db.get_all(refs[i:i + OUTBOX_BATCH_SIZE]):
+                if snapshot.exists:
+                    existing_keys.add(snapshot.id)
+        
+        now = datetime.now()
+        
+        def build_entry(key):
+            recipient_key, subscription = entries[key]
+            return {
+                'listing_id': listing_id,
+                'recipient_key': recipient_key,
+                # Snapshot with the filters, so alerts can show what the recipient subscribed to
+                'subscription': subscription.to_dict(),
+                'status': 'PENDING',
+                'attempts': 0,
+                'next_attempt_at': now,
+                'last_error': None,
+                'created_at': now,
+                'updated_at': now,
+            }
+        
+        new_keys = [key for key in entries if key not in existing_keys]
+        created_count = 0
+        for i in range(0, len(new_keys), OUTBOX_BATCH_SIZE):
+            chunk = new_keys[i:i + OUTBOX_BATCH_SIZE]
+            batch = db.batch()
+            for key in chunk:
+                batch.create(outbox_ref.document(key), build_entry(key))
             try:
-                if subscription['type'] == 'EMAIL':
-                    success = send_email_notification(subscription, listing_data)
-                elif subscription['type'] == 'WEBHOOK':
-                    success = send_webhook_notification(subscription, listing_data)
-                else:
-                    continue
-                
-                if success:
-                    sent_count += 1
-                else:
-                    error_count += 1
-                    
-            except Exception as e:
-                print(f"Error processing subscription {subscription['id']}: {e}")
-                error_count += 1
+                batch.commit()
+                created_count += len(chunk)
+            except AlreadyExists:
+                # A concurrent run created some of these since the pre-check; the batch
+                # is all-or-nothing, so create the chunk one by one and skip those
+                for key in chunk:
+                    try:
+                        outbox_ref.document(key).create(build_entry(key))
+                        created_count += 1
+                    except AlreadyExists:
+                        pass
         
-        return {"sent": sent_count, "errors": error_count}
+        return created_count
         
     except Exception as e:
-        print(f"Error in send_notifications_for_listing: {e}")
-        return {"sent": 0, "errors": 1}
+        print(f"Error enqueueing notifications for listing: {e}")
+        raise
 
-def CheckIfListingNew(listing_url):
+
+def get_health_doc_id(recipient_key):
     """
-    Check if a listing already exists in Firestore
-    Returns True if listing is new, False if it already exists
+    Document ID for a recipient's delivery health record
     """
-    try:
-        if listing_url.endswith('/'):
-            listing_id = listing_url.split('/')[-2]
-        else:
-            listing_id = listing_url.split('/')[-1]
-        
-        db = get_firestore_client()
-        doc_ref = db.collection('listings').document(listing_id)
-        doc = doc_ref.get()
-        
-        if doc.exists:
-            return False
-        else:
-            return True
-            
-    except Exception as e:
-        print(f"Error checking if listing is new: {e}")
-        return True
+    return hashlib.sha256(recipient_key.encode('utf-8')).hexdigest()[:24]
+
 
-def addListingToFirestore(listing_data):
+def get_delivery_health(recipient_keys):
     """
-    Add a listing to Firestore
+    Batch-read delivery health records for the given recipients.
+    Returns a dict of recipient_key -> health data (recipients without a record are omitted).
+    """
+    db = get_firestore_client()
+    health_ref = db.collection('delivery_health')
+    refs = [health_ref.document(get_health_doc_id(key)) for key in recipient_keys]
+    
+    health = {}
+    for i in range(0, len(refs), OUTBOX_BATCH_SIZE):
+        for snapshot in db.get_all(refs[i:i + OUTBOX_BATCH_SIZE]):
+            if snapshot.exists:
+                data = snapshot.to_dict()
+                health[data['recipient_key']] = data
+    return health
+
+
+def is_hard_delivery_failure(recipient_type, status_code):
+    """
+    Check if a failed delivery means the endpoint is gone for good
+    (e.g. a deleted Discord webhook returns 404, a revoked one 401)
+    """
+    return recipient_type == 'WEBHOOK' and status_code in HARD_FAILURE_STATUS_CODES
+
+
+def is_recipient_delivery_failure(recipient_type, status_code):
+    """
+    Check if a failed delivery was caused by the recipient (see RECIPIENT_FAILURE_STATUS_CODES)
+    rather than by the renderer, Mailgun, Discord or the network
+    """
+    return status_code in RECIPIENT_FAILURE_STATUS_CODES.get(recipient_type, ())
+
+
+def is_in_cooldown(health):
+    """
+    Check if a recipient is still inside its failure cool-down window
+    """
+    if not health:
+        return False
+    cooldown_until = health.get('cooldown_until')
+    return cooldown_until is not None and cooldown_until.timestamp() > time.time()
+
+
+def record_delivery_health(recipient_key, subscription, health, success, status_code=None):
+    """
+    Update a recipient's delivery health after a delivery attempt.
+
+    Successes reset the failure streak (only written if there was one). Failures the
+    recipient caused extend an exponential cool-down; hard failures or too many
+    consecutive ones suppress the recipient and disable its subscriptions. Other
+    failures (outages, 5xx, no response) leave the recipient's health untouched.
+
+    Returns the suppression reason if the recipient was suppressed, otherwise None.
     """
     try:
-        listing_url = listing_data['listing_url']
-        if listing_url.endswith('/'):
-            listing_id = listing_url.split('/')[-2]
-        else:
-            listing_id = listing_url.split('/')[-1]
+        db = get_firestore_client()
+        health_ref = db.collection('delivery_health').document(get_health_doc_id(recipient_key))
+        now = datetime.now()
         
-        firestore_data = listing_data.copy()
-        firestore_data['created_at'] = datetime.now()
-        firestore_data['updated_at'] = datetime.now()
-        firestore_data['listing_id'] = listing_id
+        if success:
+            if health and health.get('consecutive_failures', 0) > 0:
+                health_ref.set({
+                    'consecutive_failures': 0,
+                    'cooldown_until': None,
+                    'last_success_at': now,
+                    'updated_at': now,
+                }, merge=True)
+            return None
+        
+        if not is_recipient_delivery_failure(subscription.get('type'), status_code):
+            return None
+        
+        consecutive_failures = (health or {}).get('consecutive_failures', 0) + 1
+        cooldown_seconds = min(
+            HEALTH_BASE_COOLDOWN_SECONDS * 2 ** (consecutive_failures - 1),
+            HEALTH_MAX_COOLDOWN_SECONDS
+        )
         
-        db = get_firestore_client()
-        doc_ref = db.collection('listings').document(listing_id)
-        doc_ref.set(firestore_data)
+        suppressed_reason = None
+        if is_hard_delivery_failure(subscription.get('type'), status_code):
+            suppressed_reason = f"Endpoint returned HTTP {status_code}"
+        elif consecutive_failures >= HEALTH_MAX_CONSECUTIVE_FAILURES:
+            suppressed_reason = f"{consecutive_failures} consecutive delivery failures"
+        
+        update_data = {
+            'recipient_key': recipient_key,
+            'type': subscription.get('type'),
+            'consecutive_failures': consecutive_failures,
+            'last_status_code': status_code,
+            'last_failure_at': now,
+            'cooldown_until': now + timedelta(seconds=cooldown_seconds),
+            'suppressed': suppressed_reason is not None,
+            'updated_at': now,
+        }
+        if suppressed_reason:
+            update_data['suppressed_reason'] = suppressed_reason
+            update_data['suppressed_at'] = now
+        health_ref.set(update_data, merge=True)
         
-        return True
+        if suppressed_reason:
+            suppress_recipient_subscriptions(subscription, suppressed_reason)
+            print(f"Suppressed {subscription.get('type')} recipient: {suppressed_reason}")
+        
+        return suppressed_reason
         
     except Exception as e:
-        print(f"Error adding listing to Firestore: {e}")
-        return False
+        print(f"Error updating delivery health: {e}")
+        return None
 
-def ingestHouseListings():
-    response = requests.get('https://thecannon.ca/housing/?search=&search2=&wanted_forsale=forsale&sortby=date&viewmode=grid')
-    soup = BeautifulSoup(response.text, 'html.parser')
-    house_listing = soup.find_all('li', class_='housing-item')
-    return house_listing
 
-def ingestListingDetails(listing_url):
-    response = requests.get(listing_url)
-    soup = BeautifulSoup(response.text, 'html.parser')
+def reset_delivery_health(health_ref):
+    """
+    Clear a recipient's failure streak, cool-down and suppression, e.g. when it
+    subscribes again or an admin lifts the suppression.
 
-    image_url = None
-    og_image = soup.find('meta', property='og:image')
-    if og_image:
-        image_url = og_image.get('content')
-    else:
-        first_photo = soup.select_one('.masonry.lightbox-gallery li a')
-        if first_photo:
-            image_url = first_photo.get('href')
+    Returns True if there was anything to reset.
+    """
+    snapshot = health_ref.get()
+    if not snapshot.exists:
+        return False
+    health = snapshot.to_dict()
+    if not health.get('suppressed') and not health.get('consecutive_failures'):
+        return False
+    
+    now = datetime.now()
+    health_ref.update({
+        'suppressed': False,
+        'consecutive_failures': 0,
+        'cooldown_until': None,
+        'unsuppressed_at': now,
+        'updated_at': now,
+    })
+    return True
 
-    address = None
-    address_div = soup.select_one('.classified-details .row .md')
-    if address_div:
-        address = address_div.get_text(strip=True)
 
-    description = None
-    description_dd = soup.select_one('.classified-details .description')
-    if description_dd:
-        description_text = description_dd.get_text(separator=' ', strip=True)
-        if "More Information" in description_text:
-            description_text = description_text.replace("More Information", "").strip()
-        description = description_text
+def reset_recipient_health(subscription_data):
+    """
+    Reset the delivery health of a subscription's recipient so a re-subscribing
+    recipient isn't left suppressed. Errors are logged, never raised.
+    """
+    recipient_key = get_recipient_key(subscription_data)
+    if not recipient_key:
+        return
+    try:
+        health_ref = get_firestore_client().collection('delivery_health').document(get_health_doc_id(recipient_key))
+        if reset_delivery_health(health_ref):
+            print(f"Reset delivery health for re-subscribed {subscription_data.get('type')} recipient")
+    except Exception as e:
+        print(f"Error resetting delivery health: {e}")
 
-    price = None
-    price_strong = soup.select_one('.classified-details .row strong')
-    if price_strong:
-        price_text = price_strong.get_text(strip=True)
-        price_match = re.search(r'\$?([\d,]+)', price_text)
-        if price_match:
-            price = int(price_match.group(1).replace(',', ''))
 
-    price_string = None
-    if price_strong:
-        price_string = price_strong.get_text(strip=True)
+def suppress_recipient_subscriptions(subscription, reason):
+    """
+    Disable every active subscription for a dead recipient so it drops out of matching.
+    The subscriptions come from the recipient index, so every case variant of an
+    email address is disabled along with the one that failed.
+    """
+    db = get_firestore_client()
+    _, entries = read_recipient_index(db, subscription)
+    if not entries:
+        return
+    
+    subscriptions_ref = db.collection('subscriptions')
+    refs = [subscriptions_ref.document(subscription_id) for subscription_id in entries]
+    
+    now = datetime.now()
+    disabled_ids = []
+    pending_count = 0
+    batch = db.batch()
+    for doc in db.get_all(refs, field_paths=FIELD_PROJECTIONS['recipient_subscriptions']):
+        if not doc.exists or doc.to_dict().get('disabled') is not None:
+            continue
+        batch.update(doc.reference, {
+            'disabled': now,
+            'disabledReason': reason,
+            'updated_at': now,
+        })
+        disabled_ids.append(doc.id)
+        if subscription.get('type') == 'EMAIL' and doc.to_dict().get('isVerified') is False:
+            pending_count += 1
+    
+    disabled_count = len(disabled_ids)
+    if disabled_count:
+        # Stale index entries (already disabled) are dropped too
+        remove_from_recipient_index(batch, db, get_recipient_key(subscription), list(entries))
+        batch.commit()
+        increment_stats(
+            subscribers_delta=-disabled_count,
+            pending_verifications_delta=-pending_count,
+            defer=True,
+        )
 
-    bedroom_count = None
-    beds_row = soup.find('dt', string='Beds')
-    if beds_row:
-        beds_dd = beds_row.find_next_sibling('dd')
-        if beds_dd:
-            bedroom_count = beds_dd.get_text(strip=True)
 
-    additional_details = {}
+@firestore.transactional
+def claim_outbox_entry(transaction, entry_ref):
+    """
+    Atomically move a due outbox entry to SENDING with a lease.
+    Returns the entry data, or None if another worker already claimed or finished it.
+    """
+    snapshot = entry_ref.get(transaction=transaction)
+    if not snapshot.exists:
+        return None
     
-    category_dt = soup.find('dt', string='Category')
-    if category_dt:
-        category_dd = category_dt.find_next_sibling('dd')
+    entry = snapshot.to_dict()
+    if entry.get('status') not in ('PENDING', 'SENDING'):
+        return None
+    
+    next_attempt_at = entry.get('next_attempt_at')
+    if next_attempt_at is not None and next_attempt_at.timestamp() > time.time():
+        return None
+    
+    # If this worker dies mid-send, the lease expiry makes the entry due again
+    transaction.update(entry_ref, {
+        'status': 'SENDING',
+        'next_attempt_at': datetime.now() + timedelta(seconds=OUTBOX_LEASE_SECONDS),
+        'updated_at': datetime.now(),
+    })
+    return entry
+
+
+def try_claim_outbox_entry(entry_ref):
+    """
+    Claim an outbox entry in its own transaction, returning (entry_ref, entry) or None.
+    A failed claim (e.g. transaction contention) is logged and the entry left unclaimed
+    for the next drain, so one entry can't abort the whole drain.
+    """
+    try:
+        db = get_firestore_client()
+        entry = claim_outbox_entry(db.transaction(), entry_ref)
+    except Exception as e:
+        print(f"Error claiming outbox entry {entry_ref.id}: {e}")
+        return None
+    if entry is None:
+        return None
+    return entry_ref, entry
+
+
+def get_outbox_listing(listing_id, listing_cache):
+    """
+    Look up the listing for an outbox entry, reading from Firestore on a cache miss
+    """
+    listing_data = listing_cache.get(listing_id)
+    if listing_data is None:
+        listing_data = get_listing(listing_id)
+        if listing_data is not None:
+            listing_cache[listing_id] = listing_data
+    return listing_data
+
+
+def record_outbox_result(entry_ref, entry, error_message, final_status=None):
+    """
+    Store the outcome of a delivery attempt on its outbox entry.
+    Failed attempts are rescheduled with exponential backoff until the attempt limit,
+    unless final_status (e.g. SUPPRESSED) ends the entry immediately.
+    Returns 'sent' or 'error'.
+    """
+    attempts = entry.get('attempts', 0) + 1
+    now = datetime.now()
+    if error_message is None:
+        entry_ref.update({
+            'status': 'SENT',
+            'attempts': attempts,
+            'sent_at': now,
+            'last_error': None,
+            'updated_at': now,
+        })
+        return 'sent'
+    
+    if final_status:
+        status = final_status
+        next_attempt_at = None
+    elif attempts >= OUTBOX_MAX_ATTEMPTS:
+        status = 'FAILED'
+        next_attempt_at = None
+    else:
+        status = 'PENDING'
+        delay_seconds = min(OUTBOX_BASE_RETRY_SECONDS * 2 ** (attempts - 1), OUTBOX_MAX_RETRY_SECONDS)
+        next_attempt_at = now + timedelta(seconds=delay_seconds)
+    
+    entry_ref.update({
+        'status': status,
+        'attempts': attempts,
+        'next_attempt_at': next_attempt_at,
+        'last_error': error_message,
+        'updated_at': now,
+    })
+    print(f"Outbox delivery {entry_ref.id} failed (attempt {attempts}): {error_message}")
+    return 'error'
+
+
+def defer_outbox_entries(claimed_entries, status, next_attempt_at, reason):
+    """
+    Release claimed entries without attempting delivery (recipient cooling down or suppressed)
+    """
+    now = datetime.now()
+    for entry_ref, _ in claimed_entries:
+        entry_ref.update({
+            'status': status,
+            'next_attempt_at': next_attempt_at,
+            'last_error': reason,
+            'updated_at': now,
+        })
+
+
+def deliver_outbox_group(claimed_entries, listing_cache, health=None):
+    """
+    Deliver a group of claimed outbox entries for one recipient.
+    Email entries are sent one per listing; webhook entries are coalesced into
+    multi-embed Discord messages. Returns one outcome per entry.
+
+    Recipients that are suppressed or cooling down are skipped without a request.
+    """
+    if health and health.get('suppressed'):
+        defer_outbox_entries(claimed_entries, 'SUPPRESSED', None, health.get('suppressed_reason'))
+        return []
+    if is_in_cooldown(health):
+        defer_outbox_entries(claimed_entries, 'PENDING', health['cooldown_until'], 'Recipient cooling down')
+        return []
+    
+    ready = []
+    outcomes = []
+    for entry_ref, entry in claimed_entries:
+        listing_data = get_outbox_listing(entry['listing_id'], listing_cache)
+        if listing_data is None:
+            outcomes.append(record_outbox_result(entry_ref, entry, 'Listing not found'))
+        else:
+            ready.append((entry_ref, entry, listing_data))
+    
+    if not ready:
+        return outcomes
+    
+    first_entry = ready[0][1]
+    if first_entry['subscription'].get('type') == 'WEBHOOK':
+        try:
+            status_codes = send_webhook_batch(
+                first_entry['subscription'].get('webhookUrl'),
+                [(entry['subscription'], listing_data) for _, entry, listing_data in ready]
+            )
+        except Exception as e:
+            print(f"Error sending coalesced webhook notification: {e}")
+            status_codes = [None] * len(ready)
+    else:
+        status_codes = []
+        for _, entry, listing_data in ready:
+            try:
+                status_code = deliver_email_notification(entry['subscription'], listing_data)
+            except Exception as e:
+                print(f"Error sending email notification: {e}")
+                status_code = None
+            status_codes.append(status_code)
+    
+    delivered = [code in (200, 204) for code in status_codes]
+    recipient_type = first_entry['subscription'].get('type')
+    # Report a failure the recipient caused if there was one; others don't affect health
+    failed_codes = sorted(
+        (code for code, ok in zip(status_codes, delivered) if not ok),
+        key=lambda code: is_recipient_delivery_failure(recipient_type, code)
+    )
+    suppressed_reason = record_delivery_health(
+        first_entry['recipient_key'],
+        first_entry['subscription'],
+        health,
+        success=any(delivered),
+        status_code=failed_codes[-1] if failed_codes else None
+    )
+    
+    final_status = 'SUPPRESSED' if suppressed_reason else None
+    for (entry_ref, entry, _), ok in zip(ready, delivered):
+        outcomes.append(record_outbox_result(
+            entry_ref, entry, None if ok else 'Delivery failed', final_status=final_status
+        ))
+    return outcomes
+
+
+def drain_notification_outbox(listing_cache=None, max_workers=None, limit=None):
+    """
+    Deliver every due outbox entry using a pool of concurrent workers.
+    Picks up entries from earlier runs too: retries whose backoff has elapsed and
+    entries left in SENDING by an invocation that died before recording the result.
+
+    Webhook entries are coalesced per recipient so one scrape with several new
+    listings sends one multi-embed message instead of one POST per listing.
+    """
+    max_workers = max_workers or OUTBOX_MAX_WORKERS
+    limit = limit or OUTBOX_DRAIN_LIMIT
+    listing_cache = dict(listing_cache or {})
+    
+    try:
+        db = get_firestore_client()
+        query = (
+            db.collection('notification_outbox')
+            .where(filter=FieldFilter('status', 'in', ['PENDING', 'SENDING']))
+            .where(filter=FieldFilter('next_attempt_at', '<=', datetime.now()))
+            .order_by('next_attempt_at')
+            .limit(limit)
+        )
+        entry_refs = [doc.reference for doc in select_fields(query, 'references').stream()]
+    except Exception as e:
+        print(f"Error querying notification outbox: {e}")
+        return {"sent": 0, "errors": 1}
+    
+    sent_count = 0
+    error_count = 0
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        claimed = []
+        for claim in executor.map(try_claim_outbox_entry, entry_refs):
+            if claim is not None:
+                claimed.append(claim)
+        
+        # One group per recipient, so each recipient's deliveries (and health updates) are serial
+        groups = {}
+        for entry_ref, entry in claimed:
+            groups.setdefault(entry['recipient_key'], []).append((entry_ref, entry))
+        
+        try:
+            health = get_delivery_health(list(groups.keys()))
+        except Exception as e:
+            print(f"Error loading delivery health: {e}")
+            health = {}
+        
+        futures = [
+            executor.submit(deliver_outbox_group, group, listing_cache, health.get(recipient_key))
+            for recipient_key, group in groups.items()
+        ]
+        for future in as_completed(futures):
+            try:
+                outcomes = future.result()
+            except Exception as e:
+                print(f"Error delivering outbox entries: {e}")
+                outcomes = ['error']
+            sent_count += outcomes.count('sent')
+            error_count += outcomes.count('error')
+    
+    return {"sent": sent_count, "errors": error_count}
+
+def get_listings_by_id(listing_ids):
+    """
+    Look up listings by ID across both tiers: the hot listings collection first, then
+    the slim listings_archive collection for IDs not found there. Archived listings
+    come back with 'archived': True and without the fields the archive drops.
+    
+    Returns:
+        dict: listing_id -> listing data (IDs found in neither tier are omitted)
+    """
+    if not listing_ids:
+        return {}
+    
+    db = get_firestore_client()
+    listings = {}
+    for snapshot in db.get_all([db.collection('listings').document(listing_id) for listing_id in listing_ids]):
+        if snapshot.exists:
+            listings[snapshot.id] = snapshot.to_dict()
+    
+    missing_ids = [listing_id for listing_id in listing_ids if listing_id not in listings]
+    if missing_ids:
+        archive_ref = db.collection('listings_archive')
+        for snapshot in db.get_all([archive_ref.document(listing_id) for listing_id in missing_ids]):
+            if snapshot.exists:
+                listings[snapshot.id] = dict(snapshot.to_dict(), archived=True)
+    
+    return listings
+
+
+def get_listing(listing_id):
+    """
+    Look up a single listing in either tier (see get_listings_by_id); None if unknown
+    """
+    return get_listings_by_id([listing_id]).get(listing_id)
+
+
+def CheckIfListingNew(listing_url):
+    """
+    Check if a listing already exists in Firestore (hot or archived)
+    Returns True if listing is new, False if it already exists
+    """
+    try:
+        listing_id = get_listing_id(listing_url)
+        
+        if get_listing(listing_id) is not None:
+            return False
+        else:
+            return True
+            
+    except Exception as e:
+        print(f"Error checking if listing is new: {e}")
+        return True
+
+def addListingToFirestore(listing_data, created_at=None):
+    """
+    Add a listing to Firestore
+    """
+    try:
+        listing_id = get_listing_id(listing_data['listing_url'])
+        
+        firestore_data = listing_data.copy()
+        firestore_data['created_at'] = created_at or datetime.now()
+        firestore_data['updated_at'] = datetime.now()
+        firestore_data['listing_id'] = listing_id
+        
+        db = get_firestore_client()
+        doc_ref = db.collection('listings').document(listing_id)
+        doc_ref.set(firestore_data)
+        
+        return True
+        
+    except Exception as e:
+        print(f"Error adding listing to Firestore: {e}")
+        return False
+
+def ingestHouseListings():
+    response = http_request('GET', 'https://thecannon.ca/housing/?search=&search2=&wanted_forsale=forsale&sortby=date&viewmode=grid', retry_policy=make_retry_policy())
+    soup = BeautifulSoup(response.text, 'html.parser')
+    house_listing = soup.find_all('li', class_='housing-item')
+    return house_listing
+
+def ingestListingDetails(listing_url):
+    response = http_request('GET', listing_url, retry_policy=make_retry_policy())
+    soup = BeautifulSoup(response.text, 'html.parser')
+
+    image_url = None
+    og_image = soup.find('meta', property='og:image')
+    if og_image:
+        image_url = og_image.get('content')
+    else:
+        first_photo = soup.select_one('.masonry.lightbox-gallery li a')
+        if first_photo:
+            image_url = first_photo.get('href')
+
+    address = None
+    address_div = soup.select_one('.classified-details .row .md')
+    if address_div:
+        address = address_div.get_text(strip=True)
+
+    description = None
+    description_dd = soup.select_one('.classified-details .description')
+    if description_dd:
+        description_text = description_dd.get_text(separator=' ', strip=True)
+        if "More Information" in description_text:
+            description_text = description_text.replace("More Information", "").strip()
+        description = description_text
+
+    price = None
+    price_strong = soup.select_one('.classified-details .row strong')
+    if price_strong:
+        price_text = price_strong.get_text(strip=True)
+        price_match = re.search(r'\$?([\d,]+)', price_text)
+        if price_match:
+            price = int(price_match.group(1).replace(',', ''))
+
+    price_string = None
+    if price_strong:
+        price_string = price_strong.get_text(strip=True)
+
+    bedroom_count = None
+    beds_row = soup.find('dt', string='Beds')
+    if beds_row:
+        beds_dd = beds_row.find_next_sibling('dd')
+        if beds_dd:
+            bedroom_count = beds_dd.get_text(strip=True)
+
+    additional_details = {}
+    
+    category_dt = soup.find('dt', string='Category')
+    if category_dt:
+        category_dd = category_dt.find_next_sibling('dd')
         if category_dd:
             additional_details['category'] = category_dd.get_text(strip=True)
     
@@ -957,7 +2434,9 @@ def ingest_listings_core():
     """
     house_listings = ingestHouseListings()
     listing_data = []
-    notification_summary = {"total_sent": 0, "total_errors": 0}
+    listing_cache = {}
+    new_listings = []
+    notifications_enqueued = 0
 
     for listing in house_listings:
         listing_url = listing.find('h2').find('a')['href']
@@ -965,31 +2444,65 @@ def ingest_listings_core():
         if new_listing:
             try:
                 single_listing_data = ingestListingDetails(listing_url)
-                listing_data.append(single_listing_data)
-                firestore_success = addListingToFirestore(single_listing_data)
+                
+                # Enqueue before marking the listing seen, so a crash in between
+                # re-ingests the listing next run instead of dropping its alerts
+                notifications_enqueued += enqueue_notifications_for_listing(single_listing_data)
+                created_at = datetime.now()
+                firestore_success = addListingToFirestore(single_listing_data, created_at)
                 
                 if firestore_success:
-                    notification_result = send_notifications_for_listing(single_listing_data)
-                    notification_summary["total_sent"] += notification_result["sent"]
-                    notification_summary["total_errors"] += notification_result["errors"]
+                    listing_data.append(single_listing_data)
+                    listing_cache[get_listing_id(listing_url)] = single_listing_data
+                    new_listings.append((get_listing_id(listing_url), single_listing_data, created_at))
                     
             except Exception as e:
                 print(f"Error processing listing {listing_url}: {e}")
                 continue
 
-    # Increment the stats counter for notifications sent
-    if notification_summary["total_sent"] > 0:
-        increment_stats(notifications_sent=notification_summary["total_sent"])
+    # Keep the digest rollups current with this run's listings
+    update_listing_rollups(new_listings)
+
+    # Deliver this run's notifications along with any unfinished ones from earlier runs
+    drain_result = drain_notification_outbox(listing_cache)
+    notification_summary = {"total_sent": drain_result["sent"], "total_errors": drain_result["errors"]}
+
+    # Increment the stats counter for notifications sent, together with any
+    # suppressions from the drain, in one counter write
+    increment_stats(notifications_sent=notification_summary["total_sent"], defer=True)
+    flush_stats()
     
     response_data = {
         "listings_processed": len(listing_data),
         "listing_data": listing_data,
+        "notifications_enqueued": notifications_enqueued,
         "notifications_sent": notification_summary["total_sent"],
         "notification_errors": notification_summary["total_errors"]
     }
     
     return response_data
 
+def timed_call(timings, step, func, *args):
+    """
+    Call func(*args), recording its duration in milliseconds under timings[step]
+    """
+    start = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        timings[step] = (time.perf_counter() - start) * 1000
+
+def get_timing_headers(timings):
+    """
+    JSON response headers plus a Server-Timing header for the recorded steps
+    """
+    return {
+        "Content-Type": "application/json",
+        "Access-Control-Allow-Origin": "*",
+        "Timing-Allow-Origin": "*",
+        "Server-Timing": ", ".join(f"{step};dur={duration:.1f}" for step, duration in timings.items()),
+    }
+
 @https_fn.on_request(secrets=["TURNSTILE_SECRET_KEY", "VERIFICATION_WEBHOOK_URL"])
 def create_subscription(req: https_fn.Request) -> https_fn.Response:
     """
@@ -1036,32 +2549,50 @@ def create_subscription(req: https_fn.Request) -> https_fn.Response:
                 headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
             )
         
-        # Verify Turnstile token for bot protection
+        request_start = time.perf_counter()
+        timings = {}
+        
         turnstile_token = request_data.get('turnstileToken')
         remote_ip = req.headers.get('CF-Connecting-IP') or req.headers.get('X-Forwarded-For', '').split(',')[0].strip() or req.remote_addr
         
-        turnstile_result = verify_turnstile_token(turnstile_token, remote_ip)
+        validation_result = validate_subscription_data(request_data)
+        
+        # The duplicate/overlap lookup is independent of Turnstile verification (bot
+        # protection), so it starts alongside it; its result is only used once the
+        # token has been verified. Skipped for invalid data
+        executor = ThreadPoolExecutor(max_workers=1)
+        lookup_timings = {}
+        try:
+            existing_future = None
+            if not validation_result["error"]:
+                existing_future = executor.submit(
+                    timed_call, lookup_timings, 'lookup', check_existing_subscription, request_data
+                )
+            turnstile_result = timed_call(timings, 'turnstile', verify_turnstile_token, turnstile_token, remote_ip)
+        finally:
+            executor.shutdown(wait=False)
         
         if not turnstile_result['success']:
             return https_fn.Response(
                 json.dumps({"error": turnstile_result['error'] or "Security verification failed"}),
                 status=403,
-                headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
+                headers=get_timing_headers(timings)
             )
         
-        validation_result = validate_subscription_data(request_data)
         if validation_result["error"]:
             return https_fn.Response(
                 json.dumps({"error": validation_result["error"]}),
                 status=400,
-                headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
+                headers=get_timing_headers(timings)
             )
         
-        existing_subscription_result = check_existing_subscription(request_data)
-        
+        existing_subscription_result = existing_future.result()
+        timings.update(lookup_timings)
         if existing_subscription_result["exists"]:
             if existing_subscription_result["disabled"]:
-                subscription_document_reference = renable_subscription(existing_subscription_result["subscription_id"])
+                subscription_document_reference = timed_call(
+                    timings, 'write', renable_subscription, existing_subscription_result["subscription_id"]
+                )
                 response_message = "Your previous subscription has been re-enabled successfully"
             else:
                 return https_fn.Response(
@@ -1070,7 +2601,7 @@ def create_subscription(req: https_fn.Request) -> https_fn.Response:
                         "existing_subscription_id": existing_subscription_result["subscription_id"]
                     }),
                     status=409,
-                    headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
+                    headers=get_timing_headers(timings)
                 )
         elif existing_subscription_result.get("overlap"):
             return https_fn.Response(
@@ -1078,21 +2609,32 @@ def create_subscription(req: https_fn.Request) -> https_fn.Response:
                     "error": existing_subscription_result["overlap_details"]
                 }),
                 status=409,
-                headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
+                headers=get_timing_headers(timings)
             )
         else:
-            subscription_document_reference = create_subscription_document(request_data)
+            subscription_document_reference = timed_call(timings, 'write', create_subscription_document, request_data)
             response_message = "Subscription created successfully"
         
+        # Lost a race with a concurrent request for the same recipient
+        if subscription_document_reference is None:
+            return https_fn.Response(
+                json.dumps({"error": "You already have an active subscription that overlaps with these preferences"}),
+                status=409,
+                headers=get_timing_headers(timings)
+            )
+        
         response_data = {
             "success": True,
             "subscriptionDocumentReference": subscription_document_reference,
             "message": response_message
         }
         
+        timings['total'] = (time.perf_counter() - request_start) * 1000
+        print(f"create_subscription timings (ms): {', '.join(f'{step}={duration:.1f}' for step, duration in timings.items())}")
+        
         return https_fn.Response(
             json.dumps(response_data),
-            headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
+            headers=get_timing_headers(timings)
         )
         
     except Exception as e:
@@ -1296,109 +2838,196 @@ def validate_subscription_data(data):
     
     return {"error": None}
 
-def check_existing_subscription(data):
+def get_recipient_index_ref(db, recipient_key):
+    """
+    Reference to a recipient's index document (recipient_index/{hash of the
+    normalized recipient key, see get_recipient_key})
+    """
+    doc_id = hashlib.sha256(recipient_key.encode('utf-8')).hexdigest()[:24]
+    return db.collection('recipient_index').document(doc_id)
+
+def build_recipient_index_entry(subscription_data):
     """
-    Check if a subscription already exists for the same email/webhook and preferences.
-    Also checks for overlapping subscriptions that would cause duplicate notifications.
+    Compact filter summary of an active subscription, as stored in the recipient index
+    """
+    return {
+        'bedroom_mask': get_bedroom_mask(subscription_data.get('bedroomPreferences') or ['ANY']),
+        'minPrice': subscription_data.get('minPrice'),
+        'maxPrice': subscription_data.get('maxPrice'),
+    }
+
+def read_recipient_index(db, subscription_data, transaction=None):
+    """
+    Read the filter summaries of a recipient's active subscriptions with one document
+    read. An index document that was never seeded (created before the index existed,
+    or only holding removals) is seeded from the subscriptions query instead.
+    
+    Returns:
+        tuple: (index document reference, {subscription_id: entry})
+    """
+    index_ref = get_recipient_index_ref(db, get_recipient_key(subscription_data))
+    snapshot = index_ref.get(transaction=transaction)
+    index_data = snapshot.to_dict() if snapshot.exists else {}
+    if index_data.get('seeded'):
+        return index_ref, dict(index_data.get('subscriptions') or {})
+    
+    subscriptions_ref = db.collection('subscriptions')
+    if subscription_data["type"] == "EMAIL":
+        query = subscriptions_ref.where(filter=FieldFilter('email', '==', subscription_data["email"]))
+    else:
+        query = subscriptions_ref.where(filter=FieldFilter('webhookUrl', '==', subscription_data["webhookUrl"]))
+    query = (
+        query.where(filter=FieldFilter('type', '==', subscription_data["type"]))
+        .where(filter=FieldFilter('disabled', '==', None))
+    )
+    query = select_fields(query, 'subscription_filters')
+    docs = transaction.get(query) if transaction is not None else query.stream()
+    return index_ref, {doc.id: build_recipient_index_entry(doc.to_dict()) for doc in docs}
+
+def find_recipient_conflict(entries, data):
+    """
+    Check new subscription filters against a recipient's active subscriptions
+    (recipient index entries) for an exact duplicate or an overlap.
     
     Overlap occurs when a listing could match BOTH subscriptions, which happens when:
-    - There's at least one bedroom value in common (or either has ANY)
-    - AND there's at least one price value in common (or either has ANY)
+    - The bedroom masks share a bucket (ANY covers every bucket)
+    - AND the price intervals overlap (missing bounds are unbounded)
     Returns: {"exists": bool, "disabled": bool, "subscription_id": str, "overlap": bool, "overlap_details": str}
     """
-    try:
-        db = get_firestore_client()
-        subscriptions_ref = db.collection('subscriptions')
-        
-        # Query by email/webhook and type only, then filter by preferences in code
-        if data["type"] == "EMAIL":
-            query = subscriptions_ref.where('email', '==', data["email"])
-        else:
-            query = subscriptions_ref.where('webhookUrl', '==', data["webhookUrl"])
+    incoming_mask = get_bedroom_mask(data.get("bedroomPreferences") or ["ANY"])
+    incoming_min = data.get("minPrice")
+    incoming_max = data.get("maxPrice")
+    
+    for subscription_id, entry in entries.items():
+        existing_mask = entry.get('bedroom_mask', ANY_BEDROOM_MASK)
+        existing_min = entry.get('minPrice')
+        existing_max = entry.get('maxPrice')
         
-        query = query.where('type', '==', data["type"])
+        # Check for exact match
+        if existing_mask == incoming_mask and existing_min == incoming_min and existing_max == incoming_max:
+            return {
+                "exists": True,
+                "disabled": False,
+                "subscription_id": subscription_id,
+                "overlap": False,
+                "overlap_details": None
+            }
         
-        incoming_bedroom_prefs = data.get("bedroomPreferences", ["ANY"])
-        incoming_bedroom_set = set(incoming_bedroom_prefs)
-
-        incoming_min = data.get("minPrice")
-        incoming_max = data.get("maxPrice")
-
-        docs = query.stream()
-
-        for doc in docs:
-            subscription_data = doc.to_dict()
-
-            # Skip disabled subscriptions
-            if subscription_data.get('disabled') is not None:
-                continue
-
-            existing_bedroom_prefs = subscription_data.get('bedroomPreferences', ['ANY'])
-            existing_bedroom_set = set(existing_bedroom_prefs)
-
-            # Get existing subscription's price bounds
-            existing_min = subscription_data.get('minPrice')
-            existing_max = subscription_data.get('maxPrice')
-
-            # Check for exact match
-            if sorted(existing_bedroom_prefs) == sorted(incoming_bedroom_prefs) and \
-               existing_min == incoming_min and existing_max == incoming_max:
-                return {
-                    "exists": True,
-                    "disabled": False,
-                    "subscription_id": doc.id,
-                    "overlap": False,
-                    "overlap_details": None
-                }
-
-            # Check for overlapping preferences
-            has_bedroom_overlap = ('ANY' in incoming_bedroom_set or
-                                   'ANY' in existing_bedroom_set or
-                                   bool(incoming_bedroom_set & existing_bedroom_set))
-
-            has_price_overlap = price_intervals_overlap(incoming_min, incoming_max, existing_min, existing_max)
-
-            if has_bedroom_overlap and has_price_overlap:
-                if 'ANY' in incoming_bedroom_set or 'ANY' in existing_bedroom_set:
-                    bedroom_overlap_str = "any bedrooms"
-                else:
-                    overlap_bedrooms = incoming_bedroom_set & existing_bedroom_set
-                    bedroom_overlap_str = ", ".join(sorted(overlap_bedrooms))
-
-                price_overlap_str = (
-                    f"{format_price_range(incoming_min, incoming_max)} overlaps with "
-                    f"{format_price_range(existing_min, existing_max)}"
-                )
+        # Check for overlapping preferences
+        shared_mask = existing_mask & incoming_mask
+        if shared_mask and price_intervals_overlap(incoming_min, incoming_max, existing_min, existing_max):
+            if ANY_BEDROOM_MASK in (incoming_mask, existing_mask):
+                bedroom_overlap_str = "any bedrooms"
+            else:
+                bedroom_overlap_str = ", ".join(sorted(
+                    bucket for bucket, bit in BEDROOM_BUCKET_BITS.items() if shared_mask & bit
+                ))
+            
+            price_overlap_str = (
+                f"{format_price_range(incoming_min, incoming_max)} overlaps with "
+                f"{format_price_range(existing_min, existing_max)}"
+            )
+            
+            return {
+                "exists": False,
+                "disabled": False,
+                "subscription_id": None,
+                "overlap": True,
+                "overlap_details": f"Your new subscription overlaps with an existing one. Overlapping filters: bedrooms ({bedroom_overlap_str}), prices ({price_overlap_str}). Please choose non-overlapping filters."
+            }
+    
+    return {"exists": False, "disabled": False, "subscription_id": None, "overlap": False, "overlap_details": None}
 
-                return {
-                    "exists": False,
-                    "disabled": False,
-                    "subscription_id": None,
-                    "overlap": True,
-                    "overlap_details": f"Your new subscription overlaps with an existing one. Overlapping filters: bedrooms ({bedroom_overlap_str}), prices ({price_overlap_str}). Please choose non-overlapping filters."
-                }
+def check_existing_subscription(data):
+    """
+    Check if a subscription already exists for the same email/webhook and preferences,
+    or overlaps one so a listing would be delivered twice. Reads only the recipient's
+    index document; emails are matched case-insensitively.
+    Returns: {"exists": bool, "disabled": bool, "subscription_id": str, "overlap": bool, "overlap_details": str}
+    """
+    try:
+        if not get_recipient_key(data):
+            return {"exists": False, "disabled": False, "subscription_id": None, "overlap": False, "overlap_details": None}
         
-        return {"exists": False, "disabled": False, "subscription_id": None, "overlap": False, "overlap_details": None}
+        _, entries = read_recipient_index(get_firestore_client(), data)
+        return find_recipient_conflict(entries, data)
         
     except Exception as e:
         print(f"Error checking existing subscription: {e}")
         return {"exists": False, "disabled": False, "subscription_id": None, "overlap": False, "overlap_details": None}
 
-def renable_subscription(subscription_id):
+@firestore.transactional
+def write_subscription_with_recipient_index(transaction, db, subscription_ref, subscription_data, update_data=None):
     """
-    Re-enable a disabled subscription
-    Returns: subscription_id
+    Create a subscription (or apply update_data to re-enable it) together with its
+    recipient index entry in one transaction, re-checking for duplicates and
+    overlaps so concurrent requests can't both get through.
+    
+    Returns:
+        dict: The conflict (see find_recipient_conflict) if nothing was written, else None
+    """
+    index_ref, entries = read_recipient_index(db, subscription_data, transaction=transaction)
+    entries.pop(subscription_ref.id, None)
+    
+    indexed_data = {**subscription_data, **(update_data or {})}
+    conflict = find_recipient_conflict(entries, indexed_data)
+    if conflict["exists"] or conflict["overlap"]:
+        return conflict
+    
+    if update_data is None:
+        transaction.create(subscription_ref, subscription_data)
+    else:
+        transaction.update(subscription_ref, update_data)
+    
+    entries[subscription_ref.id] = build_recipient_index_entry(indexed_data)
+    transaction.set(index_ref, {
+        'recipient_key': get_recipient_key(indexed_data),
+        'subscriptions': entries,
+        'seeded': True,
+        'updated_at': datetime.now()
+    })
+    return None
+
+def remove_from_recipient_index(writer, db, recipient_key, subscription_ids):
+    """
+    Queue the removal of disabled subscriptions from their recipient's index document
+    on a batch or transaction (written alongside the disabling update)
+    """
+    if not recipient_key or not subscription_ids:
+        return
+    writer.set(get_recipient_index_ref(db, recipient_key), {
+        'subscriptions': {subscription_id: firestore.DELETE_FIELD for subscription_id in subscription_ids},
+        'updated_at': datetime.now()
+    }, merge=True)
+
+def renable_subscription(subscription_id):
+    """
+    Re-enable a disabled subscription
+    Returns: subscription_id, or None if it failed or now conflicts with an active subscription
     """
     try:
         db = get_firestore_client()
         doc_ref = db.collection('subscriptions').document(subscription_id)
-        doc_ref.update({
+        subscription_data = doc_ref.get().to_dict() or {}
+        
+        # Reschedule the digest so a stale due time doesn't trigger an off-hour send
+        conflict = write_subscription_with_recipient_index(db.transaction(), db, doc_ref, subscription_data, {
             'disabled': None,
+            'nextDigestDueAt': compute_next_digest_due_at(subscription_data),
             'updated_at': datetime.now()
         })
-        
-        # Increment subscriber count since they're re-subscribing
-        increment_stats(subscribers_delta=1)
+        if conflict:
+            print(f"Not re-enabling subscription {subscription_id}: conflicts with an active subscription")
+            return None
+        reset_recipient_health(subscription_data)
+        
+        # Increment subscriber count since they're re-subscribing; an unverified
+        # email subscription also goes back into the verification queue
+        was_pending = (
+            subscription_data.get('disabled') is not None
+            and is_pending_verification({**subscription_data, 'disabled': None})
+        )
+        increment_stats(subscribers_delta=1, pending_verifications_delta=1 if was_pending else 0)
         
         return subscription_id
         
@@ -1408,9 +3037,9 @@ def renable_subscription(subscription_id):
 
 def create_subscription_document(data):
     """
-    Create subscription document in Firestore.
+    Create subscription document in Firestore, together with its recipient index entry.
     Stores preferences in the new array format.
-    Returns: document reference
+    Returns: subscription ID, or None if a conflicting subscription was created concurrently
     """
     bedroom_prefs = data.get("bedroomPreferences", ["ANY"])
 
@@ -1435,17 +3064,26 @@ def create_subscription_document(data):
         "lastDigestSentAt": None,
         "isVerified": is_verified,
     }
+    subscription_data["nextDigestDueAt"] = compute_next_digest_due_at(subscription_data)
     
     db = get_firestore_client()
-    doc_ref = db.collection('subscriptions').add(subscription_data)
-    subscription_id = doc_ref[1].id
+    doc_ref = db.collection('subscriptions').document()
+    conflict = write_subscription_with_recipient_index(db.transaction(), db, doc_ref, subscription_data)
+    if conflict:
+        print(f"Not creating subscription: conflicts with active subscription {conflict['subscription_id']}")
+        return None
+    subscription_id = doc_ref.id
+    reset_recipient_health(subscription_data)
     
-    # Increment the subscriber count
-    increment_stats(subscribers_delta=1)
+    # Increment the subscriber count (and the verification queue for emails)
+    increment_stats(
+        subscribers_delta=1,
+        pending_verifications_delta=1 if is_pending_verification(subscription_data) else 0,
+    )
     
-    # Send Discord webhook notification if this is an EMAIL subscription requiring verification
+    # Notify admins (in the background) if this is an EMAIL subscription requiring verification
     if not is_verified and data["type"] == "EMAIL":
-        send_verification_webhook_notification(subscription_data, subscription_id)
+        enqueue_verification_notification(subscription_data, subscription_id)
 
     return subscription_id
 
@@ -1498,14 +3136,20 @@ def unsubscribe(req: https_fn.Request) -> https_fn.Response:
         subscription_data = doc.to_dict()
         already_disabled = subscription_data.get('disabled') is not None
         
-        doc_ref.update({
+        batch = db.batch()
+        batch.update(doc_ref, {
             'disabled': datetime.now(),
             'updated_at': datetime.now()
         })
+        remove_from_recipient_index(batch, db, get_recipient_key(subscription_data), [subscription_id])
+        batch.commit()
         
         # Decrement subscriber count only if not already disabled
         if not already_disabled:
-            increment_stats(subscribers_delta=-1)
+            increment_stats(
+                subscribers_delta=-1,
+                pending_verifications_delta=-1 if is_pending_verification(subscription_data) else 0,
+            )
         
         html_response = """
         <!DOCTYPE html>
@@ -1547,7 +3191,10 @@ def scheduled_listing_ingestion(event: scheduler_fn.ScheduledEvent) -> None:
     Scheduled function that runs every 5 minutes to check for new listings
     """
     try:
+        reset_http_stats()
+        started = time.monotonic()
         result = ingest_listings_core()
+        duration_seconds = round(time.monotonic() - started, 2)
         
         print(
             f"Scheduled ingestion complete: new={result['listings_processed']}, "
@@ -1560,7 +3207,9 @@ def scheduled_listing_ingestion(event: scheduler_fn.ScheduledEvent) -> None:
                 "new_listings_count": result["listings_processed"],
                 "notifications_sent": result["notifications_sent"],
                 "notification_errors": result["notification_errors"],
-                "processed_listings": [listing.get('listing_url') for listing in result.get('listing_data', [])]
+                "duration_seconds": duration_seconds,
+                "processed_listings": [listing.get('listing_url') for listing in result.get('listing_data', [])],
+                "http_stats": get_http_stats()
             }
             
             db = get_firestore_client()
@@ -1575,33 +3224,479 @@ def scheduled_listing_ingestion(event: scheduler_fn.ScheduledEvent) -> None:
 
 def calculate_total_notifications_from_runs():
     """
-    Calculate total notifications sent by summing up all ingestion_runs.
-    Used for one-time initialization if the counter doesn't exist.
+    Calculate total notifications sent across all ingestion_runs with a server-side
+    sum() aggregation (no documents are transferred), plus the runs already compacted
+    into run_rollups.
+    Returns None if the aggregation fails; reconcile_stats_core then falls back to
+    the chunked reconciliation job.
     """
     try:
         db = get_firestore_client()
-        runs_ref = db.collection('ingestion_runs')
-        total = 0
-        
-        for doc in runs_ref.stream():
-            run_data = doc.to_dict()
-            total += run_data.get('notifications_sent', 0)
-        
-        return total
+        sum_result = db.collection('ingestion_runs').sum('notifications_sent').get()
+        return int(sum_result[0][0].value or 0) + get_compacted_notifications_total()
     except Exception as e:
-        print(f"Error calculating notifications from runs: {e}")
-        return 0
+        print(f"Error aggregating notifications from runs: {e}")
+        return None
 
 
-@https_fn.on_request()
-def get_stats(req: https_fn.Request) -> https_fn.Response:
-    """Get application statistics including subscriber count and notifications sent.
+def get_compacted_notifications_total(use_aggregation=True):
+    """
+    Total notifications_sent of ingestion runs that were compacted into daily run_rollups
+    """
+    db = get_firestore_client()
+    query = (
+        db.collection('run_rollups')
+        .where(filter=FieldFilter('kind', '==', 'ingestion'))
+        .where(filter=FieldFilter('granularity', '==', 'daily'))
+    )
+    if use_aggregation:
+        sum_result = query.sum('notifications_sent').get()
+        return int(sum_result[0][0].value or 0)
+    return sum(doc.to_dict().get('notifications_sent', 0) for doc in select_fields(query, 'ingestion_run_totals').stream())
+
+
+def continue_notifications_reconciliation(chunk_size=None, max_chunks=None):
+    """
+    Sum notifications_sent over ingestion_runs in chunks, checkpointed in
+    metadata/stats_reconciliation so the work is spread over several invocations.
+    
+    Returns:
+        int: the total once the last chunk is summed, or None if more chunks remain
+    """
+    chunk_size = chunk_size or STATS_RECONCILE_CHUNK_SIZE
+    max_chunks = max_chunks or STATS_RECONCILE_MAX_CHUNKS
+    
+    db = get_firestore_client()
+    runs_ref = db.collection('ingestion_runs')
+    checkpoint_ref = db.collection('metadata').document('stats_reconciliation')
+    
+    checkpoint_doc = checkpoint_ref.get()
+    checkpoint = checkpoint_doc.to_dict() if checkpoint_doc.exists else {}
+    if checkpoint.get('status') != 'RUNNING':
+        checkpoint = {'status': 'RUNNING', 'cursor': None, 'partial_total': 0, 'started_at': datetime.now()}
+    
+    for _ in range(max_chunks):
+        query = runs_ref.order_by('__name__').limit(chunk_size)
+        if checkpoint['cursor']:
+            query = query.start_after({'__name__': runs_ref.document(checkpoint['cursor'])})
+        
+        doc_count = 0
+        for doc in select_fields(query, 'ingestion_run_totals').stream():
+            checkpoint['partial_total'] += doc.to_dict().get('notifications_sent', 0)
+            checkpoint['cursor'] = doc.id
+            doc_count += 1
+        
+        if doc_count < chunk_size:
+            checkpoint['status'] = 'COMPLETE'
+            checkpoint['completed_at'] = datetime.now()
+            checkpoint_ref.set(checkpoint)
+            return checkpoint['partial_total'] + get_compacted_notifications_total(use_aggregation=False)
+        
+        checkpoint['updated_at'] = datetime.now()
+        checkpoint_ref.set(checkpoint)
+    
+    return None
+
+
+def reconcile_stats_core():
+    """
+    Compare the sharded stats counter against the source of truth and repair drift:
+    - total_notifications_sent vs. the sum over ingestion_runs
+    - total_subscribers vs. a count() of active subscriptions
+    - pending_verifications vs. a count() of the verification queue
+    Repairs are applied as Increments on metadata/stats, so concurrent counter
+    writes are never overwritten. The first successful pending count also marks
+    pending_verifications as seeded, after which readers use the counter.
+    
+    Returns:
+        dict: aggregated values, counter values before repair and the applied drift
+    """
+    db = get_firestore_client()
+    
+    aggregate_notifications = calculate_total_notifications_from_runs()
+    if aggregate_notifications is None:
+        aggregate_notifications = continue_notifications_reconciliation()
+    
+    try:
+        count_result = db.collection('subscriptions').where(filter=FieldFilter('disabled', '==', None)).count().get()
+        aggregate_subscribers = count_result[0][0].value
+    except Exception as e:
+        print(f"Error counting active subscriptions: {e}")
+        aggregate_subscribers = None
+    
+    try:
+        count_result = get_pending_verifications_query(db).count().get()
+        aggregate_pending = count_result[0][0].value
+    except Exception as e:
+        print(f"Error counting pending verifications: {e}")
+        aggregate_pending = None
+    
+    totals = get_stats_totals(use_cache=False)
+    expected = {
+        'total_notifications_sent': aggregate_notifications,
+        'total_subscribers': aggregate_subscribers,
+        'pending_verifications': aggregate_pending,
+    }
+    
+    drift = {}
+    for field, value in expected.items():
+        if value is not None and value != (totals.get(field) or 0):
+            drift[field] = value - (totals.get(field) or 0)
+    
+    stats_ref = db.collection('metadata').document('stats')
+    update_data = {field: firestore.Increment(delta) for field, delta in drift.items()}
+    update_data['last_reconciled_at'] = datetime.now()
+    update_data['last_reconciliation_drift'] = drift
+    if aggregate_pending is not None:
+        update_data['pending_verifications_seeded'] = True
+    stats_ref.set(update_data, merge=True)
+    
+    if drift or (aggregate_pending is not None and not totals['pending_verifications_seeded']):
+        print(f"Repaired stats counter drift: {drift}")
+        get_stats_totals(use_cache=False)
+    
+    return {
+        "expected": expected,
+        "counter": totals,
+        "drift": drift
+    }
+
+
+@scheduler_fn.on_schedule(schedule="30 3 * * *", timezone="America/New_York")
+def scheduled_stats_reconciliation(event: scheduler_fn.ScheduledEvent) -> None:
+    """
+    Scheduled function that runs daily to reconcile the stats counter with the
+    aggregated ingestion_runs and subscriptions data (including the verification queue)
+    """
+    try:
+        result = reconcile_stats_core()
+        print(f"Stats reconciliation: expected={result['expected']}, drift={result['drift']}")
+    except Exception as e:
+        print(f"Error in scheduled stats reconciliation: {e}")
+        raise
+
+
+def get_duration_bucket(seconds):
+    """
+    Histogram bucket key for a run duration (upper bound in seconds, "le_inf" past the last one)
+    """
+    for bound in RUN_DURATION_BUCKETS:
+        if seconds <= bound:
+            return f"le_{bound}"
+    return "le_inf"
+
+
+def get_histogram_percentile(histogram, percentile, max_value=None):
+    """
+    Approximate a duration percentile from a bucket histogram as the bucket's upper
+    bound; durations past the last bucket report max_value
+    """
+    total = sum(histogram.values())
+    if not total:
+        return None
+    
+    cumulative = 0
+    for bound in RUN_DURATION_BUCKETS:
+        cumulative += histogram.get(f"le_{bound}", 0)
+        if cumulative >= total * percentile:
+            return bound
+    return max_value
+
+
+def commit_run_compaction_chunk(db, spec, day, chunk, delete_refs):
+    """
+    Add a chunk of same-day runs to their daily and monthly rollups and delete them,
+    in one batch, so a run is never counted twice or lost.
+    Returns (rollup document IDs, longest duration in the chunk).
+    """
+    totals = {field: 0 for field in spec['sum_fields']}
+    histogram = {}
+    max_duration = None
+    for run_data in chunk:
+        for field in spec['sum_fields']:
+            totals[field] += run_data.get(field) or 0
+        duration = run_data.get('duration_seconds', run_data.get('shard_seconds'))
+        if duration is not None:
+            bucket = get_duration_bucket(duration)
+            histogram[bucket] = histogram.get(bucket, 0) + 1
+            max_duration = duration if max_duration is None else max(max_duration, duration)
+    
+    rollups_ref = db.collection('run_rollups')
+    rollup_ids = []
+    batch = db.batch()
+    for granularity, period in (('daily', day), ('monthly', day[:7])):
+        rollup_id = f"{spec['kind']}_{granularity}_{period}"
+        rollup_ids.append(rollup_id)
+        update_data = {
+            'kind': spec['kind'],
+            'granularity': granularity,
+            'period': period,
+            'runs': firestore.Increment(len(chunk)),
+            'updated_at': datetime.now(),
+            'duration_histogram': {bucket: firestore.Increment(count) for bucket, count in histogram.items()},
+        }
+        for field, value in totals.items():
+            update_data[field] = firestore.Increment(value)
+        batch.set(rollups_ref.document(rollup_id), update_data, merge=True)
+    
+    for ref in delete_refs:
+        batch.delete(ref)
+    batch.commit()
+    
+    return rollup_ids, max_duration
+
+
+def compact_run_collection(collection_name, cutoff, max_docs=None):
+    """
+    Roll runs older than cutoff from ingestion_runs or digest_runs into run_rollups
+    ({kind}_daily_{YYYY-MM-DD} and {kind}_monthly_{YYYY-MM}: run count, summed counters,
+    duration histogram and percentiles), then delete them (with their shard results).
+    
+    Returns:
+        int: number of runs compacted
+    """
+    spec = RUN_COMPACTION_SPECS[collection_name]
+    db = get_firestore_client()
+    query = (
+        db.collection(collection_name)
+        .where(filter=FieldFilter('timestamp', '<', cutoff))
+        .order_by('timestamp')
+        .limit(max_docs or RUN_COMPACTION_MAX_DOCS)
+    )
+    
+    rollup_max_durations = {}
+    
+    def commit_chunk(day, chunk, delete_refs):
+        rollup_ids, max_duration = commit_run_compaction_chunk(db, spec, day, chunk, delete_refs)
+        for rollup_id in rollup_ids:
+            durations = [d for d in (rollup_max_durations.get(rollup_id), max_duration) if d is not None]
+            rollup_max_durations[rollup_id] = max(durations) if durations else None
+    
+    compacted = 0
+    day, chunk, delete_refs = None, [], []
+    for doc in select_fields(query, f"{collection_name}_compaction").stream():
+        run_data = doc.to_dict()
+        run_day = run_data['timestamp'].strftime('%Y-%m-%d')
+        
+        run_refs = [doc.reference]
+        if spec['has_shards']:
+            run_refs.extend(shard.reference for shard in select_fields(doc.reference.collection('shards'), 'references').stream())
+        
+        # Each batch covers a single day and stays under the batch write limit
+        if chunk and (run_day != day or len(delete_refs) + len(run_refs) + 2 > RUN_COMPACTION_BATCH_WRITES):
+            commit_chunk(day, chunk, delete_refs)
+            compacted += len(chunk)
+            chunk, delete_refs = [], []
+        
+        day = run_day
+        chunk.append(run_data)
+        delete_refs.extend(run_refs)
+    
+    if chunk:
+        commit_chunk(day, chunk, delete_refs)
+        compacted += len(chunk)
+    
+    # Percentiles aren't additive, so recompute them from the merged histograms
+    rollups_ref = db.collection('run_rollups')
+    for rollup_id, max_duration in rollup_max_durations.items():
+        rollup = rollups_ref.document(rollup_id).get().to_dict() or {}
+        durations = [d for d in (max_duration, rollup.get('duration_max')) if d is not None]
+        max_duration = max(durations) if durations else None
+        histogram = rollup.get('duration_histogram', {})
+        rollups_ref.document(rollup_id).update({
+            'duration_max': max_duration,
+            'duration_p50': get_histogram_percentile(histogram, 0.5, max_duration),
+            'duration_p95': get_histogram_percentile(histogram, 0.95, max_duration),
+            'duration_p99': get_histogram_percentile(histogram, 0.99, max_duration),
+        })
+    
+    return compacted
+
+
+@scheduler_fn.on_schedule(schedule="15 4 * * *", timezone="America/New_York")
+def scheduled_run_compaction(event: scheduler_fn.ScheduledEvent) -> None:
+    """
+    Scheduled function that runs daily to compact ingestion_runs and digest_runs
+    older than RUN_RETENTION_DAYS into run_rollups
+    """
+    try:
+        cutoff = datetime.now() - timedelta(days=RUN_RETENTION_DAYS)
+        for collection_name in RUN_COMPACTION_SPECS:
+            compacted = compact_run_collection(collection_name, cutoff)
+            print(f"Compacted {compacted} {collection_name} older than {cutoff.date()}")
+    except Exception as e:
+        print(f"Error in scheduled run compaction: {e}")
+        raise
+
+
+def build_archived_listing(listing_id, listing_data):
+    """
+    Slim archive schema: enough to recognize the listing and show it in a list,
+    without the description and scraped details
+    """
+    archived = {field: listing_data.get(field) for field in FIELD_PROJECTIONS['listing_archive']}
+    archived['listing_id'] = listing_id
+    archived['archived_at'] = datetime.now()
+    return archived
+
+
+def archive_old_listings(cutoff=None, max_docs=None):
+    """
+    Move listings created before cutoff (default: LISTING_HOT_RETENTION_DAYS ago) from
+    listings to listings_archive. Each batch writes the archive copies and deletes the
+    hot documents together, so a listing is always in exactly one tier.
+    
+    Returns:
+        int: number of listings archived
+    """
+    cutoff = cutoff or datetime.now() - timedelta(days=LISTING_HOT_RETENTION_DAYS)
+    db = get_firestore_client()
+    archive_ref = db.collection('listings_archive')
+    query = (
+        db.collection('listings')
+        .where(filter=FieldFilter('created_at', '<', cutoff))
+        .order_by('created_at')
+        .limit(max_docs or LISTING_ARCHIVE_MAX_DOCS)
+    )
+    
+    docs = list(select_fields(query, 'listing_archive').stream())
+    for i in range(0, len(docs), LISTING_ARCHIVE_BATCH_SIZE):
+        batch = db.batch()
+        for doc in docs[i:i + LISTING_ARCHIVE_BATCH_SIZE]:
+            batch.set(archive_ref.document(doc.id), build_archived_listing(doc.id, doc.to_dict()))
+            batch.delete(doc.reference)
+        batch.commit()
+    
+    return len(docs)
+
+
+@scheduler_fn.on_schedule(schedule="45 4 * * *", timezone="America/New_York")
+def scheduled_listing_archival(event: scheduler_fn.ScheduledEvent) -> None:
+    """
+    Scheduled function that runs daily to move listings older than
+    LISTING_HOT_RETENTION_DAYS into the listings archive
+    """
+    try:
+        archived_count = archive_old_listings()
+        print(f"Archived {archived_count} listings older than {LISTING_HOT_RETENTION_DAYS} days")
+    except Exception as e:
+        print(f"Error in scheduled listing archival: {e}")
+        raise
+
+
+_stats_response_cache = {'payload': None, 'etag': None, 'fetched_at': 0, 'refreshing': False}
+_stats_response_lock = threading.Lock()
+
+
+def compute_public_stats():
+    """
+    Compute the public statistics shown on the landing page.
     
     Uses optimized reads:
     - Subscriber count: Firestore aggregation count() query (server-side)
-    - Notifications sent: Counter document (single doc read)
+    - Notifications sent: Sharded counter summation (cached per instance)
+    
+    Falls back to the counter for subscribers if aggregation isn't available.
+    """
+    db = get_firestore_client()
+    
+    # Get stats from the sharded counter (N+1 small reads, cached)
+    stats_data = get_stats_totals()
+    
+    # Get notifications sent from the counter
+    total_notifications_sent = stats_data.get('total_notifications_sent')
+    
+    # If notifications counter doesn't exist, initialize from historical data (one-time).
+    # If the aggregation is unavailable, report 0 and leave it to the reconciliation job
+    if total_notifications_sent is None:
+        print("Notifications counter not found, initializing from historical data...")
+        total_notifications_sent = calculate_total_notifications_from_runs()
+        if total_notifications_sent is None:
+            total_notifications_sent = 0
+        else:
+            db.collection('metadata').document('stats').set({
+                'total_notifications_sent': total_notifications_sent
+            }, merge=True)
+            get_stats_totals(use_cache=False)
+            print(f"Initialized total_notifications_sent to {total_notifications_sent}")
+    
+    # Try aggregation count for subscribers (server-side, very fast)
+    try:
+        subscribers_ref = db.collection('subscriptions')
+        subscribers_query = subscribers_ref.where(filter=FieldFilter('disabled', '==', None))
+        count_query = subscribers_query.count()
+        count_result = count_query.get()
+        total_subscribers = count_result[0][0].value
+    except Exception as agg_error:
+        # Fallback to counter if aggregation fails
+        print(f"Aggregation count failed, using counter: {agg_error}")
+        total_subscribers = stats_data.get('total_subscribers') or 0
+    
+    return {
+        'total_subscribers': total_subscribers,
+        'total_notifications_sent': total_notifications_sent
+    }
+
+
+def refresh_public_stats():
+    """
+    Recompute the public stats and store them (with their ETag) in the instance cache
+    """
+    try:
+        payload = json.dumps(compute_public_stats())
+        with _stats_response_lock:
+            _stats_response_cache['payload'] = payload
+            _stats_response_cache['etag'] = '"' + hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16] + '"'
+            _stats_response_cache['fetched_at'] = time.time()
+    finally:
+        with _stats_response_lock:
+            _stats_response_cache['refreshing'] = False
+
+
+def get_cached_public_stats():
+    """
+    Get the public stats payload and ETag with stale-while-revalidate semantics:
+    - younger than STATS_RESPONSE_TTL_SECONDS: served from the instance cache
+    - older: the first request refreshes it before responding; requests arriving during
+      that refresh are served the cached value while it is younger than
+      STATS_RESPONSE_STALE_SECONDS
+    - the stale value is still served if the refresh fails
+    
+    Refreshes run on the request, not in a background thread, since the instance may
+    get no CPU once a response has been sent.
+    
+    Returns:
+        tuple: (payload JSON string, ETag)
+    """
+    with _stats_response_lock:
+        age = time.time() - _stats_response_cache['fetched_at']
+        has_payload = _stats_response_cache['payload'] is not None
+        serve_cached = has_payload and (
+            age < STATS_RESPONSE_TTL_SECONDS
+            or (age < STATS_RESPONSE_STALE_SECONDS and _stats_response_cache['refreshing'])
+        )
+        if not serve_cached:
+            _stats_response_cache['refreshing'] = True
+    
+    if not serve_cached:
+        try:
+            refresh_public_stats()
+        except Exception as e:
+            if not has_payload:
+                raise
+            print(f"Error refreshing stats, serving stale value: {e}")
+    
+    with _stats_response_lock:
+        return _stats_response_cache['payload'], _stats_response_cache['etag']
+
+
+@https_fn.on_request()
+def get_stats(req: https_fn.Request) -> https_fn.Response:
+    """Get application statistics including subscriber count and notifications sent.
     
-    Falls back to counter document for subscribers if aggregation isn't available.
+    Responses come from an instance cache with stale-while-revalidate semantics (see
+    get_cached_public_stats) and carry Cache-Control/ETag headers, so browsers and
+    CDNs can reuse them; a matching If-None-Match gets an empty 304.
     """
     if req.method == 'OPTIONS':
         return https_fn.Response(
@@ -1609,52 +3704,33 @@ def get_stats(req: https_fn.Request) -> https_fn.Response:
             headers={
                 'Access-Control-Allow-Origin': '*',
                 'Access-Control-Allow-Methods': 'GET, OPTIONS',
-                'Access-Control-Allow-Headers': 'Content-Type',
+                'Access-Control-Allow-Headers': 'Content-Type, If-None-Match',
                 'Access-Control-Max-Age': '3600'
             }
         )
     
     try:
-        db = get_firestore_client()
-        
-        # Try to get stats from the counter document first (O(1) read)
-        stats_ref = db.collection('metadata').document('stats')
-        stats_doc = stats_ref.get()
-        stats_data = stats_doc.to_dict() if stats_doc.exists else {}
-        
-        # Get notifications sent from counter document
-        total_notifications_sent = stats_data.get('total_notifications_sent')
-        
-        # If notifications counter doesn't exist, initialize from historical data (one-time)
-        if total_notifications_sent is None:
-            print("Notifications counter not found, initializing from historical data...")
-            total_notifications_sent = calculate_total_notifications_from_runs()
-            stats_ref.set({
-                'total_notifications_sent': total_notifications_sent
-            }, merge=True)
-            print(f"Initialized total_notifications_sent to {total_notifications_sent}")
+        payload, etag = get_cached_public_stats()
+        
+        cache_headers = {
+            'Cache-Control': (
+                f'public, max-age={STATS_RESPONSE_TTL_SECONDS}, s-maxage={STATS_RESPONSE_TTL_SECONDS}, '
+                f'stale-while-revalidate={STATS_RESPONSE_STALE_SECONDS}'
+            ),
+            'ETag': etag,
+            'Access-Control-Expose-Headers': 'ETag',
+            'Access-Control-Allow-Origin': '*'
+        }
         
-        # Try aggregation count for subscribers (server-side, very fast)
-        try:
-            from google.cloud.firestore_v1.aggregation import AggregationQuery
-            
-            subscribers_ref = db.collection('subscriptions')
-            subscribers_query = subscribers_ref.where(filter=FieldFilter('disabled', '==', None))
-            count_query = subscribers_query.count()
-            count_result = count_query.get()
-            total_subscribers = count_result[0][0].value
-        except Exception as agg_error:
-            # Fallback to counter document if aggregation fails
-            print(f"Aggregation count failed, using counter: {agg_error}")
-            total_subscribers = stats_data.get('total_subscribers', 0)
+        if_none_match = req.headers.get('If-None-Match', '')
+        # Compare weakly: proxies may hand back W/-prefixed tags
+        if etag in [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')] or if_none_match.strip() == '*':
+            return https_fn.Response('', status=304, headers=cache_headers)
         
         return https_fn.Response(
-            json.dumps({
-                'total_subscribers': total_subscribers,
-                'total_notifications_sent': total_notifications_sent
-            }),
+            payload,
             status=200,
-            headers={'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'}
+            headers={'Content-Type': 'application/json', **cache_headers}
         )
         
     except Exception as e:
@@ -1666,290 +3742,1733 @@ def get_stats(req: https_fn.Request) -> https_fn.Response:
         )
 
 
-def get_listings_since(since_datetime):
+def build_listing_summary(listing_id, listing_data, created_at):
     """
-    Fetch all listings created since the given datetime
+    Compact view of a listing for daily rollups: only the fields digests match on and
+    render, without the description or other scraped details
     """
-    try:
-        db = get_firestore_client()
-        listings_ref = db.collection('listings')
-        query = listings_ref.where('created_at', '>=', since_datetime).order_by('created_at', direction='DESCENDING')
-        
-        listings = []
-        for doc in query.stream():
-            listing_data = doc.to_dict()
-            listing_data['id'] = doc.id
-            listings.append(listing_data)
-        
-        return listings
-    except Exception as e:
-        print(f"Error fetching listings since {since_datetime}: {e}")
-        return []
+    additional_details = listing_data.get('additional_details') or {}
+    return {
+        'id': listing_id,
+        'created_at': created_at,
+        'listing_url': listing_data.get('listing_url'),
+        'image_url': listing_data.get('image_url'),
+        'address': listing_data.get('address'),
+        'price_int': listing_data.get('price_int'),
+        'price_string': listing_data.get('price_string'),
+        'bedroom_bucket': listing_data.get('bedroom_bucket') or 'UNKNOWN',
+        'additional_details': {
+            key: additional_details[key] for key in ('date_available', 'features') if key in additional_details
+        },
+    }
 
 
-def get_subscriptions_for_digest(frequency, current_hour=None):
+def get_day_listing_summaries(listings_ref, day, transaction=None):
     """
-    Get all active subscriptions with the specified frequency that are due for a digest.
-    For daily: subscriptions that haven't been sent a digest today
-    For weekly: subscriptions that haven't been sent a digest this week
-    
-    Args:
-        frequency: 'DAILY' or 'WEEKLY'
-        current_hour: The current hour (0-23) to match against user's preferred sendTime.
-                     If None, all subscriptions for this frequency are returned (for backwards compat).
+    Listing summaries for one day (YYYY-MM-DD of created_at), read from the listings collection
     """
-    try:
-        db = get_firestore_client()
-        subscriptions_ref = db.collection('subscriptions')
-        
-        # Get active subscriptions with the specified frequency
-        query = subscriptions_ref.where(filter=FieldFilter('disabled', '==', None))
-        
-        now = datetime.now()
-        subscriptions = []
-        
-        # Default hour is 9 AM if user hasn't specified
-        DEFAULT_SEND_HOUR = 9
-        
-        for doc in query.stream():
-            subscription_data = doc.to_dict()
-            subscription_data['id'] = doc.id
-            
-            # Check if subscription has the correct frequency
-            sub_frequency = subscription_data.get('frequency', 'REAL_TIME')
-            if sub_frequency != frequency:
-                continue
-            
-            # Only process EMAIL subscriptions for digests
-            if subscription_data.get('type') != 'EMAIL':
-                continue
-            
-            # Check if the current hour matches the user's preferred send time
-            if current_hour is not None:
-                send_time = subscription_data.get('sendTime')
-                if send_time and send_time.strip():
-                    # Parse the sendTime (format: "HH:MM")
-                    try:
-                        preferred_hour = int(send_time.split(':')[0])
-                    except (ValueError, IndexError):
-                        preferred_hour = DEFAULT_SEND_HOUR
-                else:
-                    preferred_hour = DEFAULT_SEND_HOUR
-                
-                # Skip if current hour doesn't match preferred hour
-                if current_hour != preferred_hour:
-                    continue
-            
-            # Check if digest is due
-            last_digest = subscription_data.get('lastDigestSentAt')
-            
-            if last_digest is None:
-                # Never sent a digest, include this subscription
-                subscriptions.append(subscription_data)
-            else:
-                # Convert Firestore timestamp to datetime if needed
-                if hasattr(last_digest, 'timestamp'):
-                    last_digest = datetime.fromtimestamp(last_digest.timestamp())
-                
-                if frequency == 'DAILY':
-                    # Check if last digest was sent more than 23 hours ago
-                    if (now - last_digest).total_seconds() > 23 * 3600:
-                        subscriptions.append(subscription_data)
-                elif frequency == 'WEEKLY':
-                    # Check if last digest was sent more than 6.5 days ago
-                    if (now - last_digest).total_seconds() > 6.5 * 24 * 3600:
-                        subscriptions.append(subscription_data)
-        
-        return subscriptions
-    except Exception as e:
-        print(f"Error fetching subscriptions for {frequency} digest: {e}")
-        return []
+    day_start = datetime.strptime(day, '%Y-%m-%d')
+    query = (
+        listings_ref
+        .where(filter=FieldFilter('created_at', '>=', day_start))
+        .where(filter=FieldFilter('created_at', '<', day_start + timedelta(days=1)))
+    )
+    query = select_fields(query, 'listing_summary')
+    docs = transaction.get(query) if transaction is not None else query.stream()
+    
+    summaries = []
+    for doc in docs:
+        listing_data = doc.to_dict()
+        summaries.append(build_listing_summary(doc.id, listing_data, listing_data.get('created_at')))
+    return summaries
 
 
-def update_last_digest_sent(subscription_id):
+def group_listing_summaries(summaries):
     """
-    Update the lastDigestSentAt timestamp for a subscription
+    Group listing summaries into {bedroom_bucket: summaries sorted by price}
     """
-    try:
-        db = get_firestore_client()
-        doc_ref = db.collection('subscriptions').document(subscription_id)
-        doc_ref.update({
-            'lastDigestSentAt': datetime.now()
-        })
-        return True
-    except Exception as e:
-        print(f"Error updating lastDigestSentAt for {subscription_id}: {e}")
-        return False
+    buckets = {}
+    for summary in summaries:
+        buckets.setdefault(summary['bedroom_bucket'], []).append(summary)
+    for bucket_summaries in buckets.values():
+        bucket_summaries.sort(key=get_price_sort_key)
+    return buckets
 
 
-def send_digest_notifications_core(frequency, current_hour=None):
+@firestore.transactional
+def merge_listing_rollup(transaction, rollup_ref, listings_ref, day, summaries, rebuild=False):
     """
-    Core logic for sending digest notifications.
-    
-    Args:
-        frequency: 'DAILY' or 'WEEKLY'
-        current_hour: Optional. The current hour (0-23) to filter subscriptions by preferred send time.
-                     If None, sends to all subscriptions regardless of their sendTime preference.
+    Add listing summaries to the rollup document for a day (YYYY-MM-DD of created_at).
+    A day's first write seeds it from the listings collection, so listings ingested
+    before the rollup existed are included; rebuild re-reads the listings collection
+    for an existing rollup too (see update_listing_rollups). Returns the resulting buckets.
     """
-    digest_type = frequency.lower()
+    snapshot = rollup_ref.get(transaction=transaction)
+    existing = []
+    if snapshot.exists:
+        existing = [summary for bucket in snapshot.to_dict().get('buckets', {}).values() for summary in bucket]
+    if rebuild or not snapshot.exists:
+        existing.extend(get_day_listing_summaries(listings_ref, day, transaction))
     
-    # Get subscriptions due for digest, filtered by send time if provided
-    subscriptions = get_subscriptions_for_digest(frequency, current_hour)
+    summaries_by_id = {summary['id']: summary for summary in existing}
+    for summary in summaries:
+        summaries_by_id[summary['id']] = summary
     
-    if not subscriptions:
-        print(f"No subscriptions due for {digest_type} digest")
-        return {"sent": 0, "errors": 0}
+    buckets = group_listing_summaries(summaries_by_id.values())
+    transaction.set(rollup_ref, {
+        'day': day,
+        'buckets': buckets,
+        'listing_count': len(summaries_by_id),
+        'updated_at': datetime.now()
+    })
+    return buckets
+
+
+def update_listing_rollups(new_listings):
+    """
+    Add newly ingested listings to their daily rollup documents (listing_rollups/{YYYY-MM-DD}).
     
-    # Determine the time window for listings
-    now = datetime.now()
-    if frequency == 'DAILY':
-        since = now - timedelta(days=1)
-    else:  # WEEKLY
-        since = now - timedelta(days=7)
+    A day whose merge fails is recorded in listing_rollup_repairs and rebuilt from the
+    listings collection on the next run, so its listings aren't missing from digests.
     
-    # Get all listings from the time window
-    all_listings = get_listings_since(since)
+    Args:
+        new_listings: list of (listing_id, listing_data, created_at) tuples
+    """
+    summaries_by_day = {}
+    for listing_id, listing_data, created_at in new_listings:
+        summaries_by_day.setdefault(created_at.strftime('%Y-%m-%d'), []).append(
+            build_listing_summary(listing_id, listing_data, created_at)
+        )
     
-    sent_count = 0
-    error_count = 0
+    db = get_firestore_client()
+    listings_ref = db.collection('listings')
+    rollups_ref = db.collection('listing_rollups')
+    repairs_ref = db.collection('listing_rollup_repairs')
     
-    # Process each subscription
-    for subscription in subscriptions:
+    try:
+        repair_days = {doc.id for doc in select_fields(repairs_ref, 'references').stream()}
+    except Exception as e:
+        print(f"Error reading listing rollup repairs: {e}")
+        repair_days = set()
+    
+    for day in sorted(set(summaries_by_day) | repair_days):
         try:
-            # Filter listings that match this subscription's preferences
-            matching_listings = []
-            
-            bedroom_prefs = subscription.get('bedroomPreferences', ['ANY'])
-            sub_min = subscription.get('minPrice')
-            sub_max = subscription.get('maxPrice')
+            merge_listing_rollup(
+                db.transaction(), rollups_ref.document(day), listings_ref, day,
+                summaries_by_day.get(day, []), rebuild=day in repair_days
+            )
+            if day in repair_days:
+                repairs_ref.document(day).delete()
+                print(f"Rebuilt listing rollup for {day}")
+        except Exception as e:
+            print(f"Error updating listing rollup for {day}, recording it for repair: {e}")
+            try:
+                repairs_ref.document(day).set({'day': day, 'failed_at': datetime.now()})
+            except Exception as record_error:
+                print(f"Error recording listing rollup repair for {day}: {record_error}")
 
-            for listing in all_listings:
-                listing_bedroom_bucket = listing.get('bedroom_bucket')
-                listing_price_int = listing.get('price_int')
 
-                bedroom_match = ('ANY' in bedroom_prefs or listing_bedroom_bucket in bedroom_prefs)
-                p_match = price_matches(listing_price_int, sub_min, sub_max)
+def get_rollup_days(since_datetime, until_datetime):
+    """
+    Rollup document IDs (YYYY-MM-DD) for every day from since_datetime to until_datetime
+    """
+    days = []
+    day = since_datetime.date()
+    while day <= until_datetime.date():
+        days.append(day.strftime('%Y-%m-%d'))
+        day += timedelta(days=1)
+    return days
 
-                if bedroom_match and p_match:
-                    matching_listings.append(listing)
-            
-            # Send digest even if no matching listings (to confirm subscription is active)
-            success = send_digest_email_notification(subscription, matching_listings, digest_type)
-            
-            if success:
-                sent_count += 1
-                update_last_digest_sent(subscription['id'])
+
+def seed_listing_rollups(window_end):
+    """
+    Create the rollup documents missing from the longest digest window ending at
+    window_end. Runs from the scheduled digest run, so the digest workers only read.
+    """
+    db = get_firestore_client()
+    rollups_ref = db.collection('listing_rollups')
+    listings_ref = db.collection('listings')
+    
+    longest_days = max(DIGEST_WINDOW_DAYS.values())
+    days = get_rollup_days(window_end - timedelta(days=longest_days), window_end)
+    for snapshot in db.get_all([rollups_ref.document(day) for day in days]):
+        if snapshot.exists:
+            continue
+        try:
+            merge_listing_rollup(db.transaction(), snapshot.reference, listings_ref, snapshot.id, [])
+        except Exception as e:
+            print(f"Error seeding listing rollup for {snapshot.id}: {e}")
+
+
+def get_listing_rollups_since(since_datetime):
+    """
+    Get the listings created since the given datetime from the daily rollups, as
+    {bedroom_bucket: [summary, ...]} with each bucket sorted by price.
+    Reads one small document per day. A day without a rollup yet is read from the
+    listings collection; this path never writes (see seed_listing_rollups).
+    """
+    try:
+        db = get_firestore_client()
+        rollups_ref = db.collection('listing_rollups')
+        listings_ref = db.collection('listings')
+        
+        days = get_rollup_days(since_datetime, datetime.now())
+        snapshots = {doc.id: doc for doc in db.get_all([rollups_ref.document(day) for day in days])}
+        since_timestamp = since_datetime.timestamp()
+        
+        rollup = {}
+        for day in days:
+            snapshot = snapshots.get(day)
+            if snapshot is not None and snapshot.exists:
+                buckets = snapshot.to_dict().get('buckets', {})
+            else:
+                buckets = group_listing_summaries(get_day_listing_summaries(listings_ref, day))
+            
+            for bucket, summaries in buckets.items():
+                rollup.setdefault(bucket, []).extend(
+                    summary for summary in summaries
+                    if summary.get('created_at') and summary['created_at'].timestamp() >= since_timestamp
+                )
+        
+        for summaries in rollup.values():
+            summaries.sort(key=get_price_sort_key)
+        
+        return rollup
+    except Exception as e:
+        print(f"Error fetching listing rollups since {since_datetime}: {e}")
+        return {}
+
+
+def get_digest_send_hour(subscription):
+    """
+    Get the subscription's preferred digest hour (0-23) from its "HH:MM" sendTime.
+    Defaults to 9 AM if unset or unparseable.
+    """
+    send_time = subscription.get('sendTime')
+    if send_time and send_time.strip():
+        try:
+            return int(send_time.split(':')[0])
+        except (ValueError, IndexError):
+            pass
+    return DEFAULT_DIGEST_SEND_HOUR
+
+
+def compute_next_digest_due_at(subscription, after=None):
+    """
+    Compute when a subscription's next digest is due: the first send-hour slot at or
+    after `after` (default now) in the digest timezone. Daily digests use every day,
+    weekly digests only Sundays. Returns a UTC datetime, or None for subscriptions
+    that don't get digests (REAL_TIME or non-EMAIL).
+    """
+    frequency = subscription.get('frequency', 'REAL_TIME')
+    if subscription.get('type') != 'EMAIL' or frequency not in ('DAILY', 'WEEKLY'):
+        return None
+    
+    after = after or datetime.now(pytz.utc)
+    local_after = after.astimezone(DIGEST_TIMEZONE)
+    send_hour = get_digest_send_hour(subscription)
+    
+    candidate_date = local_after.date()
+    while True:
+        candidate = DIGEST_TIMEZONE.localize(datetime.combine(candidate_date, dt_time(hour=send_hour)))
+        if candidate >= local_after and (frequency == 'DAILY' or candidate.weekday() == 6):
+            return candidate.astimezone(pytz.utc)
+        candidate_date += timedelta(days=1)
+
+
+def get_subscriptions_for_digest(frequencies=DIGEST_FREQUENCIES, now=None, cursor=None, limit=None):
+    """
+    Get a page of active EMAIL subscriptions with the given frequencies that are due
+    for a digest, i.e. whose precomputed nextDigestDueAt has passed.
+
+    This is a range query on the (frequency, disabled, nextDigestDueAt) index, so only
+    due documents are read. A slot missed by an earlier run stays due and is picked up
+    by the next run.
+    
+    Args:
+        frequencies: Digest frequencies to include (default: daily and weekly)
+        now: Optional cutoff (defaults to the current time)
+        cursor: Optional {'nextDigestDueAt', 'id'} of the last document already processed
+        limit: Optional page size
+
+    Returns:
+        tuple: (Subscription models, next_cursor); next_cursor is None after the last page
+
+    Raises on a Firestore error instead of returning an empty page, so the run isn't
+    taken as finished and its checkpoint stays resumable.
+    """
+    db = get_firestore_client()
+    subscriptions_ref = db.collection('subscriptions')
+    now = now or datetime.now(pytz.utc)
+    
+    query = (
+        subscriptions_ref
+        .where(filter=FieldFilter('frequency', 'in', list(frequencies)))
+        .where(filter=FieldFilter('disabled', '==', None))
+        .where(filter=FieldFilter('nextDigestDueAt', '<=', now))
+        .order_by('nextDigestDueAt')
+        .order_by('__name__')
+    )
+    if cursor:
+        query = query.start_after({
+            'nextDigestDueAt': cursor['nextDigestDueAt'],
+            '__name__': subscriptions_ref.document(cursor['id'])
+        })
+    if limit:
+        query = query.limit(limit)
+    
+    subscriptions = []
+    doc_count = 0
+    next_cursor = None
+    for doc in select_fields(query, 'digest_subscriptions').stream():
+        subscription = Subscription.from_document(doc)
+        doc_count += 1
+        next_cursor = {'nextDigestDueAt': subscription.next_digest_due_at, 'id': doc.id}
+        
+        # Only process EMAIL subscriptions for digests
+        if subscription.type != 'EMAIL':
+            continue
+        
+        subscriptions.append(subscription)
+    
+    if not limit or doc_count < limit:
+        next_cursor = None
+    
+    return subscriptions, next_cursor
+
+
+def mark_digests_sent(subscriptions):
+    """
+    Set lastDigestSentAt and schedule the next digest for a chunk of subscriptions
+    in a single WriteBatch commit
+    """
+    if not subscriptions:
+        return True
+    try:
+        db = get_firestore_client()
+        subscriptions_ref = db.collection('subscriptions')
+        now = datetime.now()
+        batch = db.batch()
+        for subscription in subscriptions:
+            update_data = {
+                'lastDigestSentAt': now,
+                'nextDigestDueAt': compute_next_digest_due_at(subscription.to_dict())
+            }
+            if subscription.digest_failures:
+                update_data['digestFailures'] = 0
+            batch.update(subscriptions_ref.document(subscription.id), update_data)
+        batch.commit()
+        return True
+    except Exception as e:
+        print(f"Error updating lastDigestSentAt for {len(subscriptions)} subscriptions: {e}")
+        return False
+
+
+def mark_digests_failed(subscriptions):
+    """
+    Reschedule subscriptions whose digest failed to send: retry with exponential backoff,
+    and after DIGEST_SEND_MAX_ATTEMPTS failures skip this digest and move on to the
+    next regular slot, so a broken recipient isn't retried every run indefinitely
+    """
+    if not subscriptions:
+        return True
+    try:
+        db = get_firestore_client()
+        subscriptions_ref = db.collection('subscriptions')
+        now = datetime.now(pytz.utc)
+        batch = db.batch()
+        given_up = []
+        for subscription in subscriptions:
+            failures = subscription.digest_failures + 1
+            if failures >= DIGEST_SEND_MAX_ATTEMPTS:
+                failures = 0
+                next_due_at = compute_next_digest_due_at(subscription.to_dict(), after=now)
+                given_up.append(subscription.id)
+            else:
+                next_due_at = now + timedelta(seconds=DIGEST_RETRY_BASE_SECONDS * 2 ** (failures - 1))
+            batch.update(subscriptions_ref.document(subscription.id), {
+                'digestFailures': failures,
+                'lastDigestFailedAt': now,
+                'nextDigestDueAt': next_due_at
+            })
+        batch.commit()
+        if given_up:
+            print(f"Skipping digest after {DIGEST_SEND_MAX_ATTEMPTS} failed attempts for: {', '.join(given_up)}")
+        return True
+    except Exception as e:
+        print(f"Error rescheduling {len(subscriptions)} failed digests: {e}")
+        return False
+
+
+@firestore.transactional
+def acquire_digest_checkpoint(transaction, checkpoint_ref):
+    """
+    Start a digest run, or take over the unfinished run recorded in the checkpoint.
+    Returns the checkpoint data, or None if another invocation holds an active lease.
+
+    A sharded run whose shards were all dispatched but never all reported (a lost
+    shard task) is closed out as INCOMPLETE instead, and a fresh run starts; the
+    subscriptions the lost shards didn't send to are still due.
+    """
+    snapshot = checkpoint_ref.get(transaction=transaction)
+    checkpoint = snapshot.to_dict() if snapshot.exists else None
+    now = datetime.now(pytz.utc)
+    
+    if checkpoint and checkpoint.get('status') == 'RUNNING':
+        lease_expires_at = checkpoint.get('lease_expires_at')
+        if lease_expires_at is not None and lease_expires_at.timestamp() > time.time():
+            return None
+        if checkpoint.get('cursor') is None and checkpoint.get('shards_dispatched', 0) > 0:
+            run_ref = get_firestore_client().collection('digest_runs').document(checkpoint['run_id'])
+            transaction.set(run_ref, {'status': 'INCOMPLETE', 'closed_at': datetime.now()}, merge=True)
+            print(f"Digest run {checkpoint['run_id']} lost shards before completing; closing it out")
+            checkpoint = None
+        else:
+            checkpoint['resumed'] = True
+    
+    if not checkpoint or checkpoint.get('status') != 'RUNNING':
+        checkpoint = {
+            'run_id': uuid.uuid4().hex,
+            'status': 'RUNNING',
+            'started_at': now,
+            'cursor': None,
+            'sent': 0,
+            'errors': 0,
+            'subscribers': 0,
+            'signatures': [],
+            'elapsed_seconds': 0,
+            'shards_dispatched': 0,
+            'resumed': False,
+        }
+    
+    checkpoint['lease_expires_at'] = now + timedelta(seconds=DIGEST_CHECKPOINT_LEASE_SECONDS)
+    checkpoint['updated_at'] = now
+    transaction.set(checkpoint_ref, checkpoint)
+    return checkpoint
+
+
+def get_digest_rollups(window_end):
+    """
+    Get the listing window of every digest frequency from a single rollup read of the
+    longest window; shorter windows are sliced from it in memory (buckets stay sorted by price).
+    
+    Returns:
+        dict: {frequency: rollup}
+    """
+    longest_days = max(DIGEST_WINDOW_DAYS.values())
+    rollup = get_listing_rollups_since(window_end - timedelta(days=longest_days))
+    
+    rollups = {}
+    for frequency, days in DIGEST_WINDOW_DAYS.items():
+        if days == longest_days:
+            rollups[frequency] = rollup
+            continue
+        since_timestamp = (window_end - timedelta(days=days)).timestamp()
+        rollups[frequency] = {
+            bucket: [summary for summary in summaries if summary['created_at'].timestamp() >= since_timestamp]
+            for bucket, summaries in rollup.items()
+        }
+    return rollups
+
+
+def send_digest_page(subscriptions, rollups):
+    """
+    Send digests for one page of due subscriptions of any frequency.
+
+    Subscribers with the same frequency and identical filters share one matching pass
+    and render cache.
+    Emails go out from a bounded thread pool, and successful sends are committed
+    in small WriteBatch chunks as they complete, so a timeout loses at most one chunk
+    (those subscribers would get the digest again). A chunk whose commit fails is
+    retried once at the end of the page. Failed sends are rescheduled with backoff
+    (see mark_digests_failed).
+
+    Returns:
+        tuple: (sent_count, error_count, set of "FREQUENCY:signature" keys seen)
+    """
+    # Group subscribers with identical filters so matching and card rendering run once per group
+    signature_groups = {}
+    for subscription in subscriptions:
+        group_key = f"{subscription.frequency}:{subscription.filter_signature}"
+        signature_groups.setdefault(group_key, []).append(subscription)
+    
+    sent_count = 0
+    error_count = 0
+    
+    def send_one(subscription, matching_listings, render_cache):
+        # Send digest even if no matching listings (to confirm subscription is active)
+        digest_type = subscription.frequency.lower()
+        return send_digest_email_notification(subscription, matching_listings, digest_type, render_cache)
+    
+    with ThreadPoolExecutor(max_workers=DIGEST_MAX_WORKERS) as executor:
+        futures = {}
+        for group in signature_groups.values():
+            matching_listings = filter_rollup_for_subscription(rollups[group[0].frequency], group[0])
+            render_cache = {}
+            for subscription in group:
+                futures[executor.submit(send_one, subscription, matching_listings, render_cache)] = subscription
+        
+        pending_commit = []
+        failed_commits = []
+        failed_sends = []
+        for future in as_completed(futures):
+            subscription = futures[future]
+            try:
+                success = future.result()
+            except Exception as e:
+                print(f"Error processing digest for subscription {subscription.id}: {e}")
+                success = False
+            
+            if success:
+                sent_count += 1
+                pending_commit.append(subscription)
+                if len(pending_commit) >= DIGEST_COMMIT_BATCH_SIZE:
+                    if not mark_digests_sent(pending_commit):
+                        failed_commits.extend(pending_commit)
+                    pending_commit = []
             else:
                 error_count += 1
-                
-        except Exception as e:
-            print(f"Error processing digest for subscription {subscription.get('id')}: {e}")
-            error_count += 1
+                failed_sends.append(subscription)
+        
+        mark_digests_failed(failed_sends)
+        if not mark_digests_sent(pending_commit):
+            failed_commits.extend(pending_commit)
+        if failed_commits and not mark_digests_sent(failed_commits):
+            failed_ids = ', '.join(subscription.id for subscription in failed_commits)
+            print(f"Digest sent but not marked for {len(failed_commits)} subscriptions, "
+                  f"they will receive it again: {failed_ids}")
     
-    return {"sent": sent_count, "errors": error_count}
+    return sent_count, error_count, set(signature_groups.keys())
+
+
+def send_digest_notifications_core():
+    """
+    Core logic for sending digest notifications to every subscription whose digest is due.
+
+    Daily and weekly digests are handled in one pass: a single due-subscription query
+    covers both frequencies, and a single 7-day rollup read provides both listing
+    windows (see get_digest_rollups).
+
+    Progress is checkpointed in digest_checkpoints/DIGEST after every page (run ID,
+    cursor and counts so far). If an invocation times out, the next one resumes the same
+    run from the cursor, even in a later hour. The cutoff is always "now", so resumed runs
+    still only send to subscriptions whose nextDigestDueAt has passed.
+    
+    Unless DIGEST_FANOUT_MODE is "inline", this invocation only coordinates: each page
+    becomes a shard handled by digest_shard_worker (see dispatch_digest_shards).
+
+    Returns:
+        dict: cumulative run stats (dispatch stats when sharded), or None if another
+        invocation is still running this digest
+    """
+    db = get_firestore_client()
+    checkpoint_ref = db.collection('digest_checkpoints').document(DIGEST_CHECKPOINT_ID)
+    
+    checkpoint = acquire_digest_checkpoint(db.transaction(), checkpoint_ref)
+    if checkpoint is None:
+        print("A digest run is already in progress; skipping")
+        return None
+    
+    if checkpoint['resumed']:
+        print(f"Resuming digest run {checkpoint['run_id']} from checkpoint")
+    
+    # Listing windows end now and reach back per frequency
+    window_end = datetime.now()
+    seed_listing_rollups(window_end)
+    
+    if DIGEST_FANOUT_MODE != 'inline':
+        return dispatch_digest_shards(checkpoint, checkpoint_ref, window_end)
+    
+    cutoff = datetime.now(pytz.utc)
+    started = time.monotonic()
+    rollups = None
+    signatures = set(checkpoint['signatures'])
+    cursor = checkpoint['cursor']
+    
+    while True:
+        subscriptions, next_cursor = get_subscriptions_for_digest(
+            now=cutoff, cursor=cursor, limit=DIGEST_PAGE_SIZE
+        )
+        
+        if subscriptions:
+            # Get the listing windows (once per run, only if anyone is due)
+            if rollups is None:
+                rollups = get_digest_rollups(window_end)
+            
+            sent, errors, page_signatures = send_digest_page(subscriptions, rollups)
+            checkpoint['sent'] += sent
+            checkpoint['errors'] += errors
+            checkpoint['subscribers'] += len(subscriptions)
+            signatures |= page_signatures
+        
+        cursor = next_cursor
+        is_last_page = cursor is None
+        checkpoint_update = {
+            'status': 'COMPLETE' if is_last_page else 'RUNNING',
+            'cursor': cursor,
+            'sent': checkpoint['sent'],
+            'errors': checkpoint['errors'],
+            'subscribers': checkpoint['subscribers'],
+            'signatures': sorted(signatures),
+            'elapsed_seconds': checkpoint['elapsed_seconds'] + time.monotonic() - started,
+            'lease_expires_at': datetime.now(pytz.utc) + timedelta(seconds=DIGEST_CHECKPOINT_LEASE_SECONDS),
+            'updated_at': datetime.now(pytz.utc),
+        }
+        checkpoint_ref.update(checkpoint_update)
+        
+        if is_last_page:
+            break
+    
+    if checkpoint['subscribers'] == 0:
+        print("No subscriptions due for digest")
+    
+    elapsed_seconds = checkpoint_update['elapsed_seconds']
+    return {
+        "run_id": checkpoint['run_id'],
+        "resumed": checkpoint['resumed'],
+        "sent": checkpoint['sent'],
+        "errors": checkpoint['errors'],
+        "subscribers": checkpoint['subscribers'],
+        "distinct_signatures": len(signatures),
+        "duration_seconds": round(elapsed_seconds, 2),
+        "digests_per_second": round(checkpoint['sent'] / elapsed_seconds, 2) if elapsed_seconds > 0 else 0
+    }
+
+
+def get_digest_task_queue():
+    """
+    Get the enqueue function for digest shards. In "local" mode this is an in-process
+    stand-in that runs the shard immediately, so the coordinator/worker flow can be
+    exercised without Cloud Tasks.
+    """
+    if DIGEST_FANOUT_MODE == 'local':
+        return process_digest_shard
+    return admin_functions.task_queue(DIGEST_SHARD_QUEUE).enqueue
+
+
+def dispatch_digest_shards(checkpoint, checkpoint_ref, window_end):
+    """
+    Coordinator side of a sharded digest run: page through due subscriptions and
+    enqueue each page's subscription IDs as one shard for digest_shard_worker.
+
+    The cursor and shard count are checkpointed after every enqueue, so a coordinator
+    that times out is resumed without re-dispatching earlier pages. Once everything is
+    dispatched the checkpoint keeps a longer lease until the workers finish; the last
+    worker marks the run COMPLETE. If that lease runs out first (lost shards), the
+    next tick closes the run out and starts a fresh one for whatever is still due
+    (see acquire_digest_checkpoint).
+    
+    Returns:
+        dict: run_id, resumed, shards dispatched and subscribers covered by this invocation
+    """
+    db = get_firestore_client()
+    run_id = checkpoint['run_id']
+    run_ref = db.collection('digest_runs').document(run_id)
+    
+    cutoff = datetime.now(pytz.utc)
+    cursor = checkpoint['cursor']
+    shard = checkpoint.get('shards_dispatched', 0)
+    subscribers = 0
+    enqueue = None
+    
+    while True:
+        subscriptions, next_cursor = get_subscriptions_for_digest(
+            now=cutoff, cursor=cursor, limit=DIGEST_PAGE_SIZE
+        )
+        
+        if subscriptions:
+            if enqueue is None:
+                run_ref.set({
+                    "type": "digest",
+                    "hour": datetime.now(DIGEST_TIMEZONE).hour,
+                    "timestamp": datetime.now(),
+                    "resumed": checkpoint['resumed'],
+                    "sharded": True,
+                    "status": "DISPATCHING"
+                }, merge=True)
+                enqueue = get_digest_task_queue()
+            
+            enqueue({
+                "run_id": run_id,
+                "shard": shard,
+                "window_end": window_end.isoformat(),
+                "subscription_ids": [subscription.id for subscription in subscriptions]
+            })
+            shard += 1
+            subscribers += len(subscriptions)
+        
+        cursor = next_cursor
+        lease_seconds = DIGEST_SHARD_LEASE_SECONDS if cursor is None else DIGEST_CHECKPOINT_LEASE_SECONDS
+        checkpoint_ref.update({
+            'cursor': cursor,
+            'shards_dispatched': shard,
+            'lease_expires_at': datetime.now(pytz.utc) + timedelta(seconds=lease_seconds),
+            'updated_at': datetime.now(pytz.utc),
+        })
+        
+        if cursor is None:
+            break
+    
+    if shard == 0:
+        print("No subscriptions due for digest")
+        checkpoint_ref.update({'status': 'COMPLETE', 'updated_at': datetime.now(pytz.utc)})
+    else:
+        run_ref.set({"status": "DISPATCHED", "shards_total": shard}, merge=True)
+        # Shards run in local mode (or fast workers) may already be done
+        finalize_sharded_digest_run(db.transaction(), run_ref, checkpoint_ref, run_id)
+    
+    return {
+        "run_id": run_id,
+        "resumed": checkpoint['resumed'],
+        "sharded": True,
+        "shards": shard - checkpoint.get('shards_dispatched', 0),
+        "subscribers": subscribers
+    }
+
+
+@firestore.transactional
+def finalize_sharded_digest_run(transaction, run_ref, checkpoint_ref, run_id):
+    """
+    Mark a sharded digest run and its checkpoint COMPLETE once every dispatched shard
+    has reported. Safe to call from the coordinator and from every worker.
+    """
+    run_snapshot = run_ref.get(transaction=transaction)
+    checkpoint_snapshot = checkpoint_ref.get(transaction=transaction)
+    if not run_snapshot.exists:
+        return False
+    
+    run = run_snapshot.to_dict()
+    shards_total = run.get('shards_total')
+    if run.get('status') == 'COMPLETE' or shards_total is None or run.get('shards_completed', 0) < shards_total:
+        return False
+    
+    shard_seconds = run.get('shard_seconds', 0)
+    transaction.update(run_ref, {
+        "status": "COMPLETE",
+        "completed_at": datetime.now(),
+        "distinct_signatures": len(run.get('signatures', [])),
+        "digests_per_second": round(run.get('sent', 0) / shard_seconds, 2) if shard_seconds > 0 else 0
+    })
+    if checkpoint_snapshot.exists and checkpoint_snapshot.to_dict().get('run_id') == run_id:
+        transaction.update(checkpoint_ref, {'status': 'COMPLETE', 'updated_at': datetime.now(pytz.utc)})
+    return True
+
+
+def process_digest_shard(payload):
+    """
+    Worker side of a sharded digest run: send digests for one shard of subscription IDs
+    and add the shard's results to digest_runs/{run_id}.
+
+    Subscriptions are re-read and re-checked for being due, so a retried task skips the
+    ones an earlier attempt already sent. The shard's result document is created in the
+    same batch as the run-level increments, so a shard is only ever counted once.
+    """
+    db = get_firestore_client()
+    run_id = payload['run_id']
+    run_ref = db.collection('digest_runs').document(run_id)
+    shard_ref = run_ref.collection('shards').document(str(payload['shard']))
+    
+    if shard_ref.get().exists:
+        print(f"Digest shard {payload['shard']} of run {run_id} already processed; skipping")
+        return None
+    
+    started = time.monotonic()
+    now = datetime.now(pytz.utc)
+    subscriptions_ref = db.collection('subscriptions')
+    refs = [subscriptions_ref.document(subscription_id) for subscription_id in payload['subscription_ids']]
+    
+    subscriptions = []
+    for doc in db.get_all(refs, field_paths=FIELD_PROJECTIONS['digest_subscriptions'] + ['disabled']):
+        if not doc.exists:
+            continue
+        subscription_data = doc.to_dict()
+        due_at = subscription_data.get('nextDigestDueAt')
+        # Skip unsubscribes since dispatch and digests sent by an earlier attempt
+        if subscription_data.get('disabled') is not None or due_at is None or due_at.timestamp() > now.timestamp():
+            continue
+        subscriptions.append(Subscription(doc.id, subscription_data))
+    
+    sent, errors, signatures = 0, 0, set()
+    if subscriptions:
+        rollups = get_digest_rollups(datetime.fromisoformat(payload['window_end']))
+        sent, errors, signatures = send_digest_page(subscriptions, rollups)
+    
+    duration_seconds = round(time.monotonic() - started, 2)
+    result = {
+        "shard": payload['shard'],
+        "sent": sent,
+        "errors": errors,
+        "subscribers": len(subscriptions),
+        "distinct_signatures": len(signatures),
+        "duration_seconds": duration_seconds,
+        "completed_at": datetime.now()
+    }
+    
+    batch = db.batch()
+    batch.create(shard_ref, result)
+    batch.update(run_ref, {
+        "sent": firestore.Increment(sent),
+        "errors": firestore.Increment(errors),
+        "subscribers": firestore.Increment(len(subscriptions)),
+        "signatures": firestore.ArrayUnion(sorted(signatures)),
+        "shards_completed": firestore.Increment(1),
+        "shard_seconds": firestore.Increment(duration_seconds)
+    })
+    batch.commit()
+    
+    print(f"Digest shard {payload['shard']} of run {run_id}: sent={sent}, errors={errors}")
+    
+    checkpoint_ref = db.collection('digest_checkpoints').document(DIGEST_CHECKPOINT_ID)
+    finalize_sharded_digest_run(db.transaction(), run_ref, checkpoint_ref, run_id)
+    return result
+
+
+def record_failed_digest_shard(payload, error):
+    """
+    Count a shard that ran out of retries as done (failed) so its run can still complete.
+    Its subscriptions that weren't sent keep their nextDigestDueAt and go out in the next run.
+    """
+    try:
+        db = get_firestore_client()
+        run_id = payload['run_id']
+        run_ref = db.collection('digest_runs').document(run_id)
+        shard_ref = run_ref.collection('shards').document(str(payload['shard']))
+        
+        batch = db.batch()
+        batch.create(shard_ref, {
+            "shard": payload['shard'],
+            "failed": True,
+            "error": str(error)[:500],
+            "completed_at": datetime.now()
+        })
+        batch.update(run_ref, {
+            "shards_completed": firestore.Increment(1),
+            "shards_failed": firestore.Increment(1)
+        })
+        batch.commit()
+        print(f"Digest shard {payload['shard']} of run {run_id} failed after {DIGEST_SHARD_MAX_ATTEMPTS} attempts")
+        
+        checkpoint_ref = db.collection('digest_checkpoints').document(DIGEST_CHECKPOINT_ID)
+        finalize_sharded_digest_run(db.transaction(), run_ref, checkpoint_ref, run_id)
+    except Exception as e:
+        print(f"Error recording failed digest shard: {e}")
+
+
+@tasks_fn.on_task_dispatched(
+    retry_config=RetryConfig(max_attempts=DIGEST_SHARD_MAX_ATTEMPTS, min_backoff_seconds=60),
+    rate_limits=RateLimits(max_concurrent_dispatches=DIGEST_SHARD_MAX_CONCURRENCY),
+    secrets=["MAILGUN_API_KEY", "MAILGUN_DOMAIN"]
+)
+def digest_shard_worker(req: tasks_fn.CallableRequest) -> None:
+    """
+    Task queue worker for one shard of a digest run (enqueued by dispatch_digest_shards).
+    Raises so Cloud Tasks retries a failed shard; the last attempt records it as failed.
+    """
+    try:
+        process_digest_shard(req.data)
+    except Exception as e:
+        print(f"Error processing digest shard: {e}")
+        retry_count = int(req.raw_request.headers.get('X-CloudTasks-TaskRetryCount', 0))
+        if retry_count + 1 < DIGEST_SHARD_MAX_ATTEMPTS:
+            raise
+        record_failed_digest_shard(req.data, e)
+
+
+@tasks_fn.on_task_dispatched(
+    retry_config=RetryConfig(max_attempts=VERIFICATION_NOTIFY_MAX_ATTEMPTS, min_backoff_seconds=30),
+    secrets=["VERIFICATION_WEBHOOK_URL"]
+)
+def verification_notification_worker(req: tasks_fn.CallableRequest) -> None:
+    """
+    Task queue worker that pings the admin Discord channel about a new email
+    subscription (enqueued by create_subscription_document). Raises on a failed
+    send so Cloud Tasks retries it; skips subscriptions that were already handled.
+    """
+    subscription_id = req.data.get('subscription_id')
+    doc = get_firestore_client().collection('subscriptions').document(subscription_id).get()
+    if not doc.exists or not is_pending_verification(doc.to_dict()):
+        print(f"Subscription {subscription_id} no longer pending verification, skipping notification")
+        return
+    
+    if not get_verification_webhook_url():
+        print("VERIFICATION_WEBHOOK_URL not configured, skipping notification")
+        return
+    
+    if not send_verification_webhook_notification(doc.to_dict(), subscription_id):
+        raise RuntimeError(f"Verification notification for {subscription_id} failed")
 
 
 @scheduler_fn.on_schedule(schedule="0 * * * *", timezone="America/New_York", secrets=["MAILGUN_API_KEY", "MAILGUN_DOMAIN"])
-def scheduled_daily_digest(event: scheduler_fn.ScheduledEvent) -> None:
+def scheduled_digest(event: scheduler_fn.ScheduledEvent) -> None:
+    """
+    Scheduled function that runs every hour to send daily and weekly digest emails.
+    
+    This runs hourly and sends to subscriptions whose nextDigestDueAt has passed.
+    nextDigestDueAt is derived from each subscription's preferred sendTime:
+    - If a user sets sendTime to "11:00", they'll receive their digest at 11 AM EST
+      (every day for daily digests, on Sundays for weekly digests)
+    - If no sendTime is set, the default is 9 AM EST
+    
+    Both frequencies share one due-subscription query and one listing fetch per tick.
+    """
+    try:
+        current_hour = datetime.now(DIGEST_TIMEZONE).hour
+        
+        result = send_digest_notifications_core()
+        
+        if result is None:
+            return
+        
+        if result.get("sharded"):
+            # Workers record their results in digest_runs/{run_id}
+            print(f"Digest (hour {current_hour}): dispatched {result['shards']} shards for {result['subscribers']} subscribers")
+            return
+        
+        print(f"Digest (hour {current_hour}): sent={result['sent']}, errors={result['errors']}")
+        
+        # Only log if we actually sent something
+        if result["sent"] > 0 or result["errors"] > 0:
+            try:
+                db = get_firestore_client()
+                # Keyed by run ID so a resumed run updates its existing entry
+                db.collection('digest_runs').document(result["run_id"]).set({
+                    "type": "digest",
+                    "hour": current_hour,
+                    "timestamp": datetime.now(),
+                    "resumed": result["resumed"],
+                    "sent": result["sent"],
+                    "errors": result["errors"],
+                    "subscribers": result["subscribers"],
+                    "distinct_signatures": result["distinct_signatures"],
+                    "duration_seconds": result["duration_seconds"],
+                    "digests_per_second": result["digests_per_second"]
+                })
+            except Exception as e:
+                print(f"Error saving digest run stats: {e}")
+            
+    except Exception as e:
+        print(f"Error in scheduled digest: {e}")
+        raise
+
+
+def serialize_firestore_timestamp(value):
+    """
+    Convert Firestore timestamp to ISO string for JSON serialization.
     """
-    Scheduled function that runs every hour to send daily digest emails.
+    if value is None:
+        return None
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if hasattr(value, 'timestamp'):
+        return datetime.fromtimestamp(value.timestamp()).isoformat()
+    return str(value)
+
+
+def get_admin_subscriptions_base_query(db, args):
+    """
+    Build the subscriptions query for the admin filters in the request arguments.
+    Each filter is an equality (or array-contains) clause. Sorted by createdAt, any
+    combination is served by merging the (filter, createdAt) indexes; the disabled
+    status is an inequality, which index merging doesn't cover, so each filter
+    combination has its own (filters..., disabled) composite in firestore.indexes.json.
+    
+    Args:
+        db: Firestore client
+        args: Request query arguments (type, frequency, bedroom)
+    
+    Returns:
+        Query with the filters applied, without status or ordering
+    
+    Raises:
+        ValueError: If a filter value is not recognised
+    """
+    query = db.collection('subscriptions')
+    
+    for param, (field, operator, allowed) in ADMIN_SUBSCRIPTION_FILTERS.items():
+        value = args.get(param)
+        if not value:
+            continue
+        if value not in allowed:
+            raise ValueError(f"Invalid {param} filter: {value}")
+        query = query.where(filter=FieldFilter(field, operator, value))
+    
+    return query
+
+
+def apply_admin_subscription_status(query, status):
+    """
+    Restrict an admin subscriptions query to active or disabled subscriptions
+    
+    Args:
+        query: Query from get_admin_subscriptions_base_query
+        status: 'active', 'disabled' or empty for both
+    
+    Returns:
+        Query with the status filter applied
+    
+    Raises:
+        ValueError: If the status is not recognised
+    """
+    if status == 'active':
+        return query.where(filter=FieldFilter('disabled', '==', None))
+    if status == 'disabled':
+        return query.where(filter=FieldFilter('disabled', '!=', None))
+    if status:
+        raise ValueError(f"Invalid status filter: {status}")
+    return query
+
+
+def count_admin_subscriptions(db, args, exclude_unverified=False):
+    """
+    Count active and disabled subscriptions matching the admin filters with
+    server-side count() aggregations
+    
+    Args:
+        db: Firestore client
+        args: Request query arguments (see get_admin_subscriptions_base_query)
+        exclude_unverified: Leave out unverified EMAIL subscriptions (is_unverified_email),
+            by subtracting a count over (type, filters..., isVerified, disabled)
+    
+    Returns:
+        dict: {'active': int, 'disabled': int}, values are None if an aggregation fails
+    """
+    base_query = get_admin_subscriptions_base_query(db, args)
+    unverified_query = None
+    if exclude_unverified and args.get('type') != 'WEBHOOK':
+        unverified_query = (
+            get_admin_subscriptions_base_query(db, {**args, 'type': 'EMAIL'})
+            .where(filter=FieldFilter('isVerified', '==', False))
+        )
+    
+    counts = {}
+    for status in ('active', 'disabled'):
+        try:
+            count_result = apply_admin_subscription_status(base_query, status).count().get()
+            counts[status] = count_result[0][0].value
+            if unverified_query is not None:
+                count_result = apply_admin_subscription_status(unverified_query, status).count().get()
+                counts[status] -= count_result[0][0].value
+        except Exception as e:
+            print(f"Error counting {status} subscriptions: {e}")
+            counts[status] = None
+    return counts
+
+
+@https_fn.on_request(secrets=["ADMIN_EMAILS"])
+def get_all_subscriptions(req: https_fn.Request) -> https_fn.Response:
+    """
+    Admin endpoint to fetch one page of subscriptions.
+    Requires Firebase Auth ID token verification.
+    
+    Query parameters:
+        page_size: Subscriptions per page (default 50, max 200)
+        cursor: next_cursor from the previous page
+        status: active | disabled
+        type, frequency, bedroom: Filters (see ADMIN_SUBSCRIPTION_FILTERS)
+        exclude_unverified: 'true' to leave out unverified EMAIL subscriptions, which
+            the verifications page handles
+        sort: createdAt | disabled (disabled status always sorts by disabled)
+        direction: asc | desc (default desc)
+        include_counts: 'true' to also return active/disabled totals for the filters
+    """
+    # Handle CORS preflight
+    if req.method == 'OPTIONS':
+        return https_fn.Response(
+            '',
+            headers={
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'GET, OPTIONS',
+                'Access-Control-Allow-Headers': 'Content-Type, Authorization',
+                'Access-Control-Max-Age': '3600'
+            }
+        )
+    
+    if req.method != 'GET':
+        return https_fn.Response(
+            json.dumps({"error": "Method not allowed"}),
+            status=405,
+            headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
+        )
+    
+    # Verify admin authentication
+    auth_result = verify_admin_token(req)
+    if not auth_result['success']:
+        return https_fn.Response(
+            json.dumps({'error': auth_result['error']}),
+            status=auth_result['status'],
+            headers={'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'}
+        )
+    
+    try:
+        db = get_firestore_client()
+        args = req.args
+        
+        try:
+            page_size = int(args.get('page_size', ADMIN_PAGE_SIZE_DEFAULT))
+            if page_size < 1:
+                raise ValueError(f"Invalid page_size: {page_size}")
+            page_size = min(page_size, ADMIN_PAGE_SIZE_MAX)
+            
+            status = args.get('status', '')
+            sort_field = 'disabled' if status == 'disabled' else args.get('sort', 'createdAt')
+            if sort_field not in ADMIN_SUBSCRIPTION_SORT_FIELDS or (sort_field == 'disabled' and status != 'disabled'):
+                raise ValueError(f"Invalid sort: {sort_field}")
+            direction = args.get('direction', 'desc')
+            if direction not in ('asc', 'desc'):
+                raise ValueError(f"Invalid direction: {direction}")
+            direction = 'ASCENDING' if direction == 'asc' else 'DESCENDING'
+            
+            base_query = get_admin_subscriptions_base_query(db, args)
+            query = (
+                apply_admin_subscription_status(base_query, status)
+                .order_by(sort_field, direction=direction)
+                .order_by('__name__', direction=direction)
+            )
+            
+            # The cursor is the id of the last subscription on the previous page; its
+            # snapshot carries the sort values to resume after
+            cursor = args.get('cursor')
+            if cursor:
+                cursor_doc = db.collection('subscriptions').document(cursor).get()
+                if not cursor_doc.exists:
+                    raise ValueError("Invalid cursor")
+                query = query.start_after(cursor_doc)
+        except ValueError as e:
+            return https_fn.Response(
+                json.dumps({'error': str(e)}),
+                status=400,
+                headers={'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'}
+            )
+        
+        # Fetch one extra document to know whether there is a next page. Unverified
+        # EMAIL subscriptions can't be excluded in the query without also dropping
+        # legacy documents that have no isVerified field, so they are skipped here
+        # and the page topped up from after the last document read, at most
+        # ADMIN_PAGE_MAX_FETCHES queries per request
+        exclude_unverified = args.get('exclude_unverified') == 'true'
+        page_query = select_fields(query, 'admin_subscriptions')
+        docs = []
+        next_cursor = None
+        for _ in range(ADMIN_PAGE_MAX_FETCHES):
+            wanted = page_size + 1 - len(docs)
+            fetched = list(page_query.limit(wanted).stream())
+            docs.extend(doc for doc in fetched if not (exclude_unverified and is_unverified_email(doc.to_dict())))
+            if len(fetched) < wanted or len(docs) > page_size:
+                break
+            page_query = page_query.start_after(fetched[-1])
+        else:
+            # Still short: the next page resumes after the last document read
+            next_cursor = fetched[-1].id
+        if len(docs) > page_size:
+            docs = docs[:page_size]
+            next_cursor = docs[-1].id
+        
+        subscriptions = []
+        for doc in docs:
+            data = doc.to_dict()
+            data['id'] = doc.id
+            
+            # Convert Firestore timestamps to ISO strings for JSON serialization
+            timestamp_fields = ['createdAt', 'disabled', 'lastDigestSentAt', 'updated_at', 'verifiedAt', 'declinedAt']
+            for field in timestamp_fields:
+                if field in data:
+                    data[field] = serialize_firestore_timestamp(data[field])
+            
+            subscriptions.append(data)
+        
+        result = {
+            'subscriptions': subscriptions,
+            'next_cursor': next_cursor,
+            'page_size': page_size,
+        }
+        if args.get('include_counts') == 'true':
+            result['counts'] = count_admin_subscriptions(db, args, exclude_unverified)
+        
+        return https_fn.Response(
+            json.dumps(result),
+            headers={'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'}
+        )
+        
+    except Exception as e:
+        print(f"Error fetching subscriptions: {e}")
+        return https_fn.Response(
+            json.dumps({'error': 'Internal server error'}),
+            status=500,
+            headers={'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'}
+        )
+
+
+@https_fn.on_request(secrets=["ADMIN_EMAILS"])
+def admin_disable_subscription(req: https_fn.Request) -> https_fn.Response:
+    """
+    Admin endpoint to disable a subscription.
+    Similar to unsubscribe but requires admin auth.
+    """
+    # Handle CORS preflight
+    if req.method == 'OPTIONS':
+        return https_fn.Response(
+            '',
+            headers={
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'POST, OPTIONS',
+                'Access-Control-Allow-Headers': 'Content-Type, Authorization',
+                'Access-Control-Max-Age': '3600'
+            }
+        )
+    
+    if req.method != 'POST':
+        return https_fn.Response(
+            json.dumps({"error": "Method not allowed"}),
+            status=405,
+            headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
+        )
+    
+    # Verify admin authentication
+    auth_result = verify_admin_token(req)
+    if not auth_result['success']:
+        return https_fn.Response(
+            json.dumps({'error': auth_result['error']}),
+            status=auth_result['status'],
+            headers={'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'}
+        )
+    
+    try:
+        request_data = req.get_json()
+        if not request_data:
+            return https_fn.Response(
+                json.dumps({"error": "No JSON data provided"}),
+                status=400,
+                headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
+            )
+        
+        subscription_id = request_data.get('subscription_id')
+        if not subscription_id:
+            return https_fn.Response(
+                json.dumps({"error": "subscription_id is required"}),
+                status=400,
+                headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
+            )
+        
+        db = get_firestore_client()
+        doc_ref = db.collection('subscriptions').document(subscription_id)
+        doc = doc_ref.get()
+        
+        if not doc.exists:
+            return https_fn.Response(
+                json.dumps({"error": "Subscription not found"}),
+                status=404,
+                headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
+            )
+        
+        # Check if already disabled to avoid double-decrementing
+        subscription_data = doc.to_dict()
+        already_disabled = subscription_data.get('disabled') is not None
+        
+        # Disable the subscription
+        batch = db.batch()
+        batch.update(doc_ref, {
+            'disabled': datetime.now(),
+            'updated_at': datetime.now()
+        })
+        remove_from_recipient_index(batch, db, get_recipient_key(subscription_data), [subscription_id])
+        batch.commit()
+        
+        # Decrement subscriber count only if not already disabled
+        if not already_disabled:
+            increment_stats(
+                subscribers_delta=-1,
+                pending_verifications_delta=-1 if is_pending_verification(subscription_data) else 0,
+            )
+        
+        return https_fn.Response(
+            json.dumps({"success": True, "message": "Subscription disabled successfully"}),
+            headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
+        )
+        
+    except Exception as e:
+        print(f"Error disabling subscription: {e}")
+        return https_fn.Response(
+            json.dumps({'error': 'Internal server error'}),
+            status=500,
+            headers={'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'}
+        )
+
+
+@https_fn.on_request(secrets=["ADMIN_EMAILS"])
+def get_pending_verifications(req: https_fn.Request) -> https_fn.Response:
+    """
+    Admin endpoint to fetch one page of subscriptions pending verification
+    (non-disabled EMAIL subscriptions where isVerified is False), oldest first.
+    
+    Query parameters:
+        page_size: Subscriptions per page (default 50, max 200)
+        cursor: next_cursor from the previous page
+        count_only: 'true' to return only the maintained pending_count
+    """
+    # Handle CORS preflight
+    if req.method == 'OPTIONS':
+        return https_fn.Response(
+            '',
+            headers={
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'GET, OPTIONS',
+                'Access-Control-Allow-Headers': 'Content-Type, Authorization',
+                'Access-Control-Max-Age': '3600'
+            }
+        )
+    
+    if req.method != 'GET':
+        return https_fn.Response(
+            json.dumps({"error": "Method not allowed"}),
+            status=405,
+            headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
+        )
+    
+    # Verify admin authentication
+    auth_result = verify_admin_token(req)
+    if not auth_result['success']:
+        return https_fn.Response(
+            json.dumps({'error': auth_result['error']}),
+            status=auth_result['status'],
+            headers={'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'}
+        )
+    
+    try:
+        db = get_firestore_client()
+        totals = get_stats_totals()
+        if totals['pending_verifications_seeded']:
+            pending_count = totals['pending_verifications'] or 0
+        else:
+            # Counter not seeded yet (see admin_reconcile_stats); count the queue
+            pending_count = get_pending_verifications_query(db).count().get()[0][0].value
+        
+        if req.args.get('count_only') == 'true':
+            return https_fn.Response(
+                json.dumps({'pending_count': pending_count}),
+                headers={'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'}
+            )
+        
+        try:
+            page_size = int(req.args.get('page_size', PENDING_VERIFICATIONS_PAGE_SIZE_DEFAULT))
+            if page_size < 1:
+                raise ValueError(f"Invalid page_size: {page_size}")
+            page_size = min(page_size, ADMIN_PAGE_SIZE_MAX)
+            
+            query = get_pending_verifications_query(db).order_by('createdAt').order_by('__name__')
+            
+            cursor = req.args.get('cursor')
+            if cursor:
+                cursor_doc = db.collection('subscriptions').document(cursor).get()
+                if not cursor_doc.exists:
+                    raise ValueError("Invalid cursor")
+                query = query.start_after(cursor_doc)
+        except ValueError as e:
+            return https_fn.Response(
+                json.dumps({'error': str(e)}),
+                status=400,
+                headers={'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'}
+            )
+        
+        docs = list(select_fields(query.limit(page_size + 1), 'admin_subscriptions').stream())
+        has_more = len(docs) > page_size
+        docs = docs[:page_size]
+        
+        subscriptions = []
+        for doc in docs:
+            data = doc.to_dict()
+            data['id'] = doc.id
+            
+            # Convert Firestore timestamps to ISO strings for JSON serialization
+            timestamp_fields = ['createdAt', 'disabled', 'lastDigestSentAt', 'updated_at', 'verifiedAt', 'declinedAt']
+            for field in timestamp_fields:
+                if field in data:
+                    data[field] = serialize_firestore_timestamp(data[field])
+            
+            subscriptions.append(data)
+        
+        return https_fn.Response(
+            json.dumps({
+                'subscriptions': subscriptions,
+                'next_cursor': docs[-1].id if has_more else None,
+                'page_size': page_size,
+                'pending_count': pending_count,
+            }),
+            headers={'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'}
+        )
+        
+    except Exception as e:
+        print(f"Error fetching pending verifications: {e}")
+        return https_fn.Response(
+            json.dumps({'error': 'Internal server error'}),
+            status=500,
+            headers={'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'}
+        )
+
+
+@https_fn.on_request(secrets=["ADMIN_EMAILS"])
+def admin_verify_subscription(req: https_fn.Request) -> https_fn.Response:
+    """
+    Admin endpoint to verify a subscription.
+    Sets isVerified to True for the subscription.
+    """
+    # Handle CORS preflight
+    if req.method == 'OPTIONS':
+        return https_fn.Response(
+            '',
+            headers={
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'POST, OPTIONS',
+                'Access-Control-Allow-Headers': 'Content-Type, Authorization',
+                'Access-Control-Max-Age': '3600'
+            }
+        )
+    
+    if req.method != 'POST':
+        return https_fn.Response(
+            json.dumps({"error": "Method not allowed"}),
+            status=405,
+            headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
+        )
+    
+    # Verify admin authentication
+    auth_result = verify_admin_token(req)
+    if not auth_result['success']:
+        return https_fn.Response(
+            json.dumps({'error': auth_result['error']}),
+            status=auth_result['status'],
+            headers={'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'}
+        )
+    
+    try:
+        request_data = req.get_json()
+        if not request_data:
+            return https_fn.Response(
+                json.dumps({"error": "No JSON data provided"}),
+                status=400,
+                headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
+            )
+        
+        subscription_id = request_data.get('subscription_id')
+        if not subscription_id:
+            return https_fn.Response(
+                json.dumps({"error": "subscription_id is required"}),
+                status=400,
+                headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
+            )
+        
+        db = get_firestore_client()
+        doc_ref = db.collection('subscriptions').document(subscription_id)
+        doc = doc_ref.get()
+        
+        if not doc.exists:
+            return https_fn.Response(
+                json.dumps({"error": "Subscription not found"}),
+                status=404,
+                headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
+            )
+        
+        # Verify the subscription
+        doc_ref.update({
+            'isVerified': True,
+            'verifiedAt': datetime.now(),
+            'updated_at': datetime.now()
+        })
+        
+        if is_pending_verification(doc.to_dict()):
+            increment_stats(pending_verifications_delta=-1)
+        
+        return https_fn.Response(
+            json.dumps({"success": True, "message": "Subscription verified successfully"}),
+            headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
+        )
+        
+    except Exception as e:
+        print(f"Error verifying subscription: {e}")
+        return https_fn.Response(
+            json.dumps({'error': 'Internal server error'}),
+            status=500,
+            headers={'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'}
+        )
+
+
+@https_fn.on_request(secrets=["ADMIN_EMAILS"])
+def admin_decline_subscription(req: https_fn.Request) -> https_fn.Response:
+    """
+    Admin endpoint to decline a subscription verification.
+    Sets the subscription to disabled and keeps isVerified as False.
+    """
+    # Handle CORS preflight
+    if req.method == 'OPTIONS':
+        return https_fn.Response(
+            '',
+            headers={
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'POST, OPTIONS',
+                'Access-Control-Allow-Headers': 'Content-Type, Authorization',
+                'Access-Control-Max-Age': '3600'
+            }
+        )
+    
+    if req.method != 'POST':
+        return https_fn.Response(
+            json.dumps({"error": "Method not allowed"}),
+            status=405,
+            headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
+        )
+    
+    # Verify admin authentication
+    auth_result = verify_admin_token(req)
+    if not auth_result['success']:
+        return https_fn.Response(
+            json.dumps({'error': auth_result['error']}),
+            status=auth_result['status'],
+            headers={'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'}
+        )
+    
+    try:
+        request_data = req.get_json()
+        if not request_data:
+            return https_fn.Response(
+                json.dumps({"error": "No JSON data provided"}),
+                status=400,
+                headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
+            )
+        
+        subscription_id = request_data.get('subscription_id')
+        if not subscription_id:
+            return https_fn.Response(
+                json.dumps({"error": "subscription_id is required"}),
+                status=400,
+                headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
+            )
+        
+        db = get_firestore_client()
+        doc_ref = db.collection('subscriptions').document(subscription_id)
+        doc = doc_ref.get()
+        
+        if not doc.exists:
+            return https_fn.Response(
+                json.dumps({"error": "Subscription not found"}),
+                status=404,
+                headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
+            )
+        
+        # Check if already disabled to avoid double-decrementing
+        subscription_data = doc.to_dict()
+        already_disabled = subscription_data.get('disabled') is not None
+        
+        # Decline the subscription by disabling it (isVerified stays False)
+        batch = db.batch()
+        batch.update(doc_ref, {
+            'disabled': datetime.now(),
+            'declinedAt': datetime.now(),
+            'updated_at': datetime.now()
+        })
+        remove_from_recipient_index(batch, db, get_recipient_key(subscription_data), [subscription_id])
+        batch.commit()
+        
+        # Decrement subscriber count only if not already disabled
+        if not already_disabled:
+            increment_stats(
+                subscribers_delta=-1,
+                pending_verifications_delta=-1 if is_pending_verification(subscription_data) else 0,
+            )
+        
+        return https_fn.Response(
+            json.dumps({"success": True, "message": "Subscription declined successfully"}),
+            headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
+        )
+        
+    except Exception as e:
+        print(f"Error declining subscription: {e}")
+        return https_fn.Response(
+            json.dumps({'error': 'Internal server error'}),
+            status=500,
+            headers={'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'}
+        )
+
+
+def get_admin_action_changes(action, subscription_data, now):
+    """
+    The document update and stats deltas for an admin action on one subscription,
+    matching admin_verify_subscription, admin_decline_subscription and
+    admin_disable_subscription
+    
+    Returns:
+        tuple: (update_data, subscribers_delta, pending_verifications_delta)
+    """
+    pending_delta = -1 if is_pending_verification(subscription_data) else 0
+    
+    if action == 'verify':
+        return {'isVerified': True, 'verifiedAt': now, 'updated_at': now}, 0, pending_delta
+    
+    update_data = {'disabled': now, 'updated_at': now}
+    if action == 'decline':
+        update_data['declinedAt'] = now
+    
+    # Stats only change for subscriptions that weren't already disabled
+    if subscription_data.get('disabled') is not None:
+        return update_data, 0, 0
+    return update_data, -1, pending_delta
+
+
+@https_fn.on_request(secrets=["ADMIN_EMAILS"])
+def admin_bulk_subscription_action(req: https_fn.Request) -> https_fn.Response:
+    """
+    Admin endpoint to verify, decline or disable many subscriptions in one request.
+    The admin token is checked once, the subscriptions are read with one batched
+    get_all, updates are committed in WriteBatch chunks (together with the
+    recipient index removals) and the stats deltas are folded into a single increment.
+    
+    Request body:
+        {"action": "verify" | "decline" | "disable", "subscription_ids": [...]}
+    
+    Returns:
+        {"results": {subscription_id: {"success": bool, "error"?: str}}, "succeeded": int, "failed": int}
+    """
+    # Handle CORS preflight
+    if req.method == 'OPTIONS':
+        return https_fn.Response(
+            '',
+            headers={
+                'Access-Control-Allow-Origin': '*',
+                'Access-Control-Allow-Methods': 'POST, OPTIONS',
+                'Access-Control-Allow-Headers': 'Content-Type, Authorization',
+                'Access-Control-Max-Age': '3600'
+            }
+        )
+    
+    if req.method != 'POST':
+        return https_fn.Response(
+            json.dumps({"error": "Method not allowed"}),
+            status=405,
+            headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
+        )
     
-    This runs hourly and checks each subscription's preferred sendTime.
-    - If a user sets sendTime to "11:00", they'll receive their digest at 11 AM EST
-    - If no sendTime is set, the default is 9 AM EST
+    # Verify admin authentication
+    auth_result = verify_admin_token(req)
+    if not auth_result['success']:
+        return https_fn.Response(
+            json.dumps({'error': auth_result['error']}),
+            status=auth_result['status'],
+            headers={'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'}
+        )
     
-    Example: At 11 AM EST, this will find all DAILY subscribers with sendTime="11:00"
-    (or "11:XX") and send them their digest.
-    """
     try:
-        # Get the current hour in EST (the timezone the function runs in)
-        from datetime import datetime
-        import pytz
+        request_data = req.get_json(silent=True)
+        if not request_data:
+            return https_fn.Response(
+                json.dumps({"error": "No JSON data provided"}),
+                status=400,
+                headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
+            )
+        
+        action = request_data.get('action')
+        if action not in ADMIN_BULK_ACTIONS:
+            return https_fn.Response(
+                json.dumps({"error": f"action must be one of: {', '.join(ADMIN_BULK_ACTIONS)}"}),
+                status=400,
+                headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
+            )
+        
+        subscription_ids = request_data.get('subscription_ids')
+        if not isinstance(subscription_ids, list) or not subscription_ids:
+            return https_fn.Response(
+                json.dumps({"error": "subscription_ids must be a non-empty list"}),
+                status=400,
+                headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
+            )
         
-        est = pytz.timezone('America/New_York')
-        current_hour = datetime.now(est).hour
+        # Deduplicate while keeping the request order
+        subscription_ids = list(dict.fromkeys(subscription_ids))
+        if len(subscription_ids) > ADMIN_BULK_MAX_IDS:
+            return https_fn.Response(
+                json.dumps({"error": f"At most {ADMIN_BULK_MAX_IDS} subscription_ids per request"}),
+                status=400,
+                headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
+            )
         
-        result = send_digest_notifications_core('DAILY', current_hour)
+        results = {}
+        valid_ids = []
+        for subscription_id in subscription_ids:
+            if not isinstance(subscription_id, str) or not subscription_id or '/' in subscription_id:
+                results[str(subscription_id)] = {'success': False, 'error': 'Invalid subscription ID'}
+            else:
+                valid_ids.append(subscription_id)
         
-        print(f"Daily digest (hour {current_hour}): sent={result['sent']}, errors={result['errors']}")
+        db = get_firestore_client()
+        subscriptions_ref = db.collection('subscriptions')
+        snapshots = {}
+        if valid_ids:
+            refs = [subscriptions_ref.document(subscription_id) for subscription_id in valid_ids]
+            for snapshot in db.get_all(refs, field_paths=FIELD_PROJECTIONS['admin_action_state']):
+                snapshots[snapshot.id] = snapshot
         
-        # Only log if we actually sent something
-        if result["sent"] > 0 or result["errors"] > 0:
+        now = datetime.now()
+        changes = []
+        for subscription_id in valid_ids:
+            snapshot = snapshots.get(subscription_id)
+            if snapshot is None or not snapshot.exists:
+                results[subscription_id] = {'success': False, 'error': 'Subscription not found'}
+                continue
+            subscription_data = snapshot.to_dict()
+            changes.append((snapshot.reference, subscription_data, *get_admin_action_changes(action, subscription_data, now)))
+        
+        subscribers_delta = 0
+        pending_delta = 0
+        for i in range(0, len(changes), ADMIN_BULK_BATCH_SIZE):
+            chunk = changes[i:i + ADMIN_BULK_BATCH_SIZE]
+            batch = db.batch()
+            index_removals = {}
+            for ref, subscription_data, update_data, _, _ in chunk:
+                batch.update(ref, update_data)
+                if action != 'verify':
+                    index_removals.setdefault(get_recipient_key(subscription_data), []).append(ref.id)
+            for recipient_key, removed_ids in index_removals.items():
+                remove_from_recipient_index(batch, db, recipient_key, removed_ids)
+            
             try:
-                db = get_firestore_client()
-                db.collection('digest_runs').add({
-                    "type": "daily",
-                    "hour": current_hour,
-                    "timestamp": datetime.now(),
-                    "sent": result["sent"],
-                    "errors": result["errors"]
-                })
+                batch.commit()
             except Exception as e:
-                print(f"Error saving daily digest run stats: {e}")
+                print(f"Error committing bulk {action} chunk: {e}")
+                for ref, _, _, _, _ in chunk:
+                    results[ref.id] = {'success': False, 'error': 'Update failed'}
+                continue
             
-    except Exception as e:
-        print(f"Error in scheduled daily digest: {e}")
-        raise
-
-
-@scheduler_fn.on_schedule(schedule="0 * * * 0", timezone="America/New_York", secrets=["MAILGUN_API_KEY", "MAILGUN_DOMAIN"])
-def scheduled_weekly_digest(event: scheduler_fn.ScheduledEvent) -> None:
-    """
-    Scheduled function that runs every hour on Sundays to send weekly digest emails.
-    
-    This runs hourly on Sundays and checks each subscription's preferred sendTime.
-    - If a user sets sendTime to "11:00", they'll receive their digest at 11 AM EST on Sunday
-    - If no sendTime is set, the default is 9 AM EST
-    """
-    try:
-        # Get the current hour in EST (the timezone the function runs in)
-        from datetime import datetime
-        import pytz
+            for ref, _, _, chunk_subscribers_delta, chunk_pending_delta in chunk:
+                results[ref.id] = {'success': True}
+                subscribers_delta += chunk_subscribers_delta
+                pending_delta += chunk_pending_delta
         
-        est = pytz.timezone('America/New_York')
-        current_hour = datetime.now(est).hour
+        if subscribers_delta or pending_delta:
+            increment_stats(subscribers_delta=subscribers_delta, pending_verifications_delta=pending_delta)
         
-        result = send_digest_notifications_core('WEEKLY', current_hour)
+        succeeded = sum(1 for result in results.values() if result['success'])
+        print(f"Bulk {action}: {succeeded} succeeded, {len(results) - succeeded} failed")
         
-        print(f"Weekly digest (hour {current_hour}): sent={result['sent']}, errors={result['errors']}")
+        return https_fn.Response(
+            json.dumps({
+                "results": results,
+                "succeeded": succeeded,
+                "failed": len(results) - succeeded,
+            }),
+            headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
+        )
         
-        # Only log if we actually sent something
-        if result["sent"] > 0 or result["errors"] > 0:
-            try:
-                db = get_firestore_client()
-                db.collection('digest_runs').add({
-                    "type": "weekly",
-                    "hour": current_hour,
-                    "timestamp": datetime.now(),
-                    "sent": result["sent"],
-                    "errors": result["errors"]
-                })
-            except Exception as e:
-                print(f"Error saving weekly digest run stats: {e}")
-            
     except Exception as e:
-        print(f"Error in scheduled weekly digest: {e}")
-        raise
-
-
-def serialize_firestore_timestamp(value):
-    """
-    Convert Firestore timestamp to ISO string for JSON serialization.
-    """
-    if value is None:
-        return None
-    if hasattr(value, 'isoformat'):
-        return value.isoformat()
-    if hasattr(value, 'timestamp'):
-        return datetime.fromtimestamp(value.timestamp()).isoformat()
-    return str(value)
+        print(f"Error in bulk subscription action: {e}")
+        return https_fn.Response(
+            json.dumps({'error': 'Internal server error'}),
+            status=500,
+            headers={'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'}
+        )
 
 
 @https_fn.on_request(secrets=["ADMIN_EMAILS"])
-def get_all_subscriptions(req: https_fn.Request) -> https_fn.Response:
+def get_suppressed_recipients(req: https_fn.Request) -> https_fn.Response:
     """
-    Admin endpoint to fetch all subscriptions.
-    Requires Firebase Auth ID token verification.
+    Admin endpoint to list recipients suppressed by delivery health tracking
+    (e.g. deleted Discord webhooks), most recently suppressed first.
     """
     # Handle CORS preflight
     if req.method == 'OPTIONS':
@@ -1980,33 +5499,32 @@ def get_all_subscriptions(req: https_fn.Request) -> https_fn.Response:
         )
     
     try:
-        # Fetch all subscriptions from Firestore
         db = get_firestore_client()
-        subscriptions = []
+        query = (
+            db.collection('delivery_health')
+            .where(filter=FieldFilter('suppressed', '==', True))
+            .order_by('suppressed_at', direction='DESCENDING')
+        )
         
-        for doc in db.collection('subscriptions').stream():
+        recipients = []
+        for doc in query.stream():
             data = doc.to_dict()
             data['id'] = doc.id
             
-            # Skip unverified EMAIL subscriptions (they appear in verifications page instead)
-            if data.get('type') == 'EMAIL' and data.get('isVerified') is False:
-                continue
-            
-            # Convert Firestore timestamps to ISO strings for JSON serialization
-            timestamp_fields = ['createdAt', 'disabled', 'lastDigestSentAt', 'updated_at', 'verifiedAt', 'declinedAt']
+            timestamp_fields = ['suppressed_at', 'last_failure_at', 'last_success_at', 'cooldown_until', 'updated_at']
             for field in timestamp_fields:
                 if field in data:
                     data[field] = serialize_firestore_timestamp(data[field])
             
-            subscriptions.append(data)
+            recipients.append(data)
         
         return https_fn.Response(
-            json.dumps({'subscriptions': subscriptions}),
+            json.dumps({'recipients': recipients}),
             headers={'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'}
         )
         
     except Exception as e:
-        print(f"Error fetching subscriptions: {e}")
+        print(f"Error fetching suppressed recipients: {e}")
         return https_fn.Response(
             json.dumps({'error': 'Internal server error'}),
             status=500,
@@ -2015,10 +5533,16 @@ def get_all_subscriptions(req: https_fn.Request) -> https_fn.Response:
 
 
 @https_fn.on_request(secrets=["ADMIN_EMAILS"])
-def admin_disable_subscription(req: https_fn.Request) -> https_fn.Response:
+def admin_unsuppress_recipient(req: https_fn.Request) -> https_fn.Response:
     """
-    Admin endpoint to disable a subscription.
-    Similar to unsubscribe but requires admin auth.
+    Admin endpoint to lift a delivery health suppression so the recipient receives
+    deliveries again. Subscriptions disabled by the suppression stay disabled; the
+    recipient re-subscribes (or is re-enabled) as usual.
+    
+    Expected JSON payload:
+    {
+        "id": "delivery health document ID (from get_suppressed_recipients)"
+    }
     """
     # Handle CORS preflight
     if req.method == 'OPTIONS':
@@ -2049,54 +5573,32 @@ def admin_disable_subscription(req: https_fn.Request) -> https_fn.Response:
         )
     
     try:
-        request_data = req.get_json()
-        if not request_data:
-            return https_fn.Response(
-                json.dumps({"error": "No JSON data provided"}),
-                status=400,
-                headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
-            )
-        
-        subscription_id = request_data.get('subscription_id')
-        if not subscription_id:
+        request_data = req.get_json(silent=True) or {}
+        health_id = request_data.get('id')
+        if not health_id or not isinstance(health_id, str) or '/' in health_id:
             return https_fn.Response(
-                json.dumps({"error": "subscription_id is required"}),
+                json.dumps({"error": "id is required"}),
                 status=400,
                 headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
             )
         
         db = get_firestore_client()
-        doc_ref = db.collection('subscriptions').document(subscription_id)
-        doc = doc_ref.get()
-        
-        if not doc.exists:
+        health_ref = db.collection('delivery_health').document(health_id)
+        if not health_ref.get().exists:
             return https_fn.Response(
-                json.dumps({"error": "Subscription not found"}),
+                json.dumps({"error": "Recipient not found"}),
                 status=404,
                 headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
             )
         
-        # Check if already disabled to avoid double-decrementing
-        subscription_data = doc.to_dict()
-        already_disabled = subscription_data.get('disabled') is not None
-        
-        # Disable the subscription
-        doc_ref.update({
-            'disabled': datetime.now(),
-            'updated_at': datetime.now()
-        })
-        
-        # Decrement subscriber count only if not already disabled
-        if not already_disabled:
-            increment_stats(subscribers_delta=-1)
-        
+        reset = reset_delivery_health(health_ref)
         return https_fn.Response(
-            json.dumps({"success": True, "message": "Subscription disabled successfully"}),
+            json.dumps({"success": True, "reset": reset}),
             headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
         )
         
     except Exception as e:
-        print(f"Error disabling subscription: {e}")
+        print(f"Error unsuppressing recipient: {e}")
         return https_fn.Response(
             json.dumps({'error': 'Internal server error'}),
             status=500,
@@ -2105,10 +5607,14 @@ def admin_disable_subscription(req: https_fn.Request) -> https_fn.Response:
 
 
 @https_fn.on_request(secrets=["ADMIN_EMAILS"])
-def get_pending_verifications(req: https_fn.Request) -> https_fn.Response:
+def admin_backfill_digest_schedule(req: https_fn.Request) -> https_fn.Response:
     """
-    Admin endpoint to fetch all subscriptions pending verification.
-    Returns non-disabled EMAIL subscriptions where isVerified is False.
+    One-time admin endpoint to populate nextDigestDueAt on existing digest subscriptions.
+    
+    Expected JSON payload (optional):
+    {
+        "force": true (recompute for every digest subscription, not just ones missing the field)
+    }
     """
     # Handle CORS preflight
     if req.method == 'OPTIONS':
@@ -2116,13 +5622,13 @@ def get_pending_verifications(req: https_fn.Request) -> https_fn.Response:
             '',
             headers={
                 'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Methods': 'GET, OPTIONS',
+                'Access-Control-Allow-Methods': 'POST, OPTIONS',
                 'Access-Control-Allow-Headers': 'Content-Type, Authorization',
                 'Access-Control-Max-Age': '3600'
             }
         )
     
-    if req.method != 'GET':
+    if req.method != 'POST':
         return https_fn.Response(
             json.dumps({"error": "Method not allowed"}),
             status=405,
@@ -2139,35 +5645,50 @@ def get_pending_verifications(req: https_fn.Request) -> https_fn.Response:
         )
     
     try:
+        request_data = req.get_json(silent=True) or {}
+        force = request_data.get('force') is True
+        
         db = get_firestore_client()
-        subscriptions = []
+        now = datetime.now(pytz.utc)
+        query = db.collection('subscriptions').where(filter=FieldFilter('frequency', 'in', ['DAILY', 'WEEKLY']))
         
-        # Query for EMAIL subscriptions that are not disabled and not verified
-        # We need to filter in code since Firestore doesn't support != and == in same query well
-        for doc in db.collection('subscriptions').stream():
-            data = doc.to_dict()
-            data['id'] = doc.id
+        updated_count = 0
+        batch = db.batch()
+        batch_size = 0
+        for doc in select_fields(query, 'digest_schedule').stream():
+            subscription_data = doc.to_dict()
+            if not force and subscription_data.get('nextDigestDueAt') is not None:
+                continue
             
-            # Only include EMAIL subscriptions that are not disabled and not yet verified
-            if (data.get('type') == 'EMAIL' and 
-                data.get('disabled') is None and 
-                data.get('isVerified') is False):
-                
-                # Convert Firestore timestamps to ISO strings for JSON serialization
-                timestamp_fields = ['createdAt', 'disabled', 'lastDigestSentAt', 'updated_at', 'verifiedAt', 'declinedAt']
-                for field in timestamp_fields:
-                    if field in data:
-                        data[field] = serialize_firestore_timestamp(data[field])
-                
-                subscriptions.append(data)
+            # Respect the old due windows (23 hours daily, 6.5 days weekly) for recent sends
+            due_after = now
+            last_digest = subscription_data.get('lastDigestSentAt')
+            if last_digest is not None:
+                window = timedelta(hours=23) if subscription_data.get('frequency') == 'DAILY' else timedelta(days=6.5)
+                last_digest_utc = datetime.fromtimestamp(last_digest.timestamp(), pytz.utc)
+                due_after = max(now, last_digest_utc + window)
+            
+            batch.update(doc.reference, {
+                'nextDigestDueAt': compute_next_digest_due_at(subscription_data, after=due_after)
+            })
+            updated_count += 1
+            batch_size += 1
+            
+            if batch_size >= DIGEST_BACKFILL_BATCH_SIZE:
+                batch.commit()
+                batch = db.batch()
+                batch_size = 0
+        
+        if batch_size:
+            batch.commit()
         
         return https_fn.Response(
-            json.dumps({'subscriptions': subscriptions}),
-            headers={'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'}
+            json.dumps({"success": True, "updated": updated_count}),
+            headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
         )
         
     except Exception as e:
-        print(f"Error fetching pending verifications: {e}")
+        print(f"Error backfilling digest schedule: {e}")
         return https_fn.Response(
             json.dumps({'error': 'Internal server error'}),
             status=500,
@@ -2176,10 +5697,12 @@ def get_pending_verifications(req: https_fn.Request) -> https_fn.Response:
 
 
 @https_fn.on_request(secrets=["ADMIN_EMAILS"])
-def admin_verify_subscription(req: https_fn.Request) -> https_fn.Response:
+def admin_backfill_recipient_index(req: https_fn.Request) -> https_fn.Response:
     """
-    Admin endpoint to verify a subscription.
-    Sets isVerified to True for the subscription.
+    One-time admin endpoint to build the recipient_index documents from the active
+    subscriptions. Recipients are grouped by normalized key, so subscriptions whose
+    emails differ only in case (which the lazy seed in read_recipient_index can't
+    find) end up in the same index document.
     """
     # Handle CORS preflight
     if req.method == 'OPTIONS':
@@ -2210,47 +5733,47 @@ def admin_verify_subscription(req: https_fn.Request) -> https_fn.Response:
         )
     
     try:
-        request_data = req.get_json()
-        if not request_data:
-            return https_fn.Response(
-                json.dumps({"error": "No JSON data provided"}),
-                status=400,
-                headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
-            )
-        
-        subscription_id = request_data.get('subscription_id')
-        if not subscription_id:
-            return https_fn.Response(
-                json.dumps({"error": "subscription_id is required"}),
-                status=400,
-                headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
-            )
-        
         db = get_firestore_client()
-        doc_ref = db.collection('subscriptions').document(subscription_id)
-        doc = doc_ref.get()
+        query = db.collection('subscriptions').where(filter=FieldFilter('disabled', '==', None))
         
-        if not doc.exists:
-            return https_fn.Response(
-                json.dumps({"error": "Subscription not found"}),
-                status=404,
-                headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
-            )
+        recipients = {}
+        for doc in select_fields(query, 'recipient_index').stream():
+            subscription_data = doc.to_dict()
+            recipient_key = get_recipient_key(subscription_data)
+            if recipient_key:
+                recipients.setdefault(recipient_key, {})[doc.id] = build_recipient_index_entry(subscription_data)
         
-        # Verify the subscription
-        doc_ref.update({
-            'isVerified': True,
-            'verifiedAt': datetime.now(),
-            'updated_at': datetime.now()
-        })
+        now = datetime.now()
+        batch = db.batch()
+        batch_size = 0
+        for recipient_key, entries in recipients.items():
+            batch.set(get_recipient_index_ref(db, recipient_key), {
+                'recipient_key': recipient_key,
+                'subscriptions': entries,
+                'seeded': True,
+                'updated_at': now
+            })
+            batch_size += 1
+            
+            if batch_size >= RECIPIENT_INDEX_BACKFILL_BATCH_SIZE:
+                batch.commit()
+                batch = db.batch()
+                batch_size = 0
+        
+        if batch_size:
+            batch.commit()
         
         return https_fn.Response(
-            json.dumps({"success": True, "message": "Subscription verified successfully"}),
+            json.dumps({
+                "success": True,
+                "recipients": len(recipients),
+                "subscriptions": sum(len(entries) for entries in recipients.values())
+            }),
             headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
         )
         
     except Exception as e:
-        print(f"Error verifying subscription: {e}")
+        print(f"Error backfilling recipient index: {e}")
         return https_fn.Response(
             json.dumps({'error': 'Internal server error'}),
             status=500,
@@ -2259,10 +5782,11 @@ def admin_verify_subscription(req: https_fn.Request) -> https_fn.Response:
 
 
 @https_fn.on_request(secrets=["ADMIN_EMAILS"])
-def admin_decline_subscription(req: https_fn.Request) -> https_fn.Response:
+def admin_reconcile_stats(req: https_fn.Request) -> https_fn.Response:
     """
-    Admin endpoint to decline a subscription verification.
-    Sets the subscription to disabled and keeps isVerified as False.
+    Admin endpoint to run the stats reconciliation on demand. Run it once after
+    deploying the pending_verifications counter so the counter is seeded from a
+    count() of the queue before the first scheduled reconciliation.
     """
     # Handle CORS preflight
     if req.method == 'OPTIONS':
@@ -2293,59 +5817,16 @@ def admin_decline_subscription(req: https_fn.Request) -> https_fn.Response:
         )
     
     try:
-        request_data = req.get_json()
-        if not request_data:
-            return https_fn.Response(
-                json.dumps({"error": "No JSON data provided"}),
-                status=400,
-                headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
-            )
-        
-        subscription_id = request_data.get('subscription_id')
-        if not subscription_id:
-            return https_fn.Response(
-                json.dumps({"error": "subscription_id is required"}),
-                status=400,
-                headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
-            )
-        
-        db = get_firestore_client()
-        doc_ref = db.collection('subscriptions').document(subscription_id)
-        doc = doc_ref.get()
-        
-        if not doc.exists:
-            return https_fn.Response(
-                json.dumps({"error": "Subscription not found"}),
-                status=404,
-                headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
-            )
-        
-        # Check if already disabled to avoid double-decrementing
-        subscription_data = doc.to_dict()
-        already_disabled = subscription_data.get('disabled') is not None
-        
-        # Decline the subscription by disabling it (isVerified stays False)
-        doc_ref.update({
-            'disabled': datetime.now(),
-            'declinedAt': datetime.now(),
-            'updated_at': datetime.now()
-        })
-        
-        # Decrement subscriber count only if not already disabled
-        if not already_disabled:
-            increment_stats(subscribers_delta=-1)
-        
+        result = reconcile_stats_core()
         return https_fn.Response(
-            json.dumps({"success": True, "message": "Subscription declined successfully"}),
+            json.dumps({"success": True, "expected": result['expected'], "drift": result['drift']}),
             headers={"Content-Type": "application/json", "Access-Control-Allow-Origin": "*"}
         )
         
     except Exception as e:
-        print(f"Error declining subscription: {e}")
+        print(f"Error reconciling stats: {e}")
         return https_fn.Response(
             json.dumps({'error': 'Internal server error'}),
             status=500,
             headers={'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'}
         )
-
-
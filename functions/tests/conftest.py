@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+FUNCTIONS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if FUNCTIONS_DIR not in sys.path:
+    sys.path.insert(0, FUNCTIONS_DIR)
+
+
+@pytest.fixture(scope='session')
+def main_module():
+    """The functions module; skipped when its Firebase dependencies aren't installed"""
+    for dependency in ('firebase_admin', 'firebase_functions', 'bs4', 'pytz', 'requests'):
+        pytest.importorskip(dependency)
+    import main
+    return main
@@ -0,0 +1,58 @@
+"""
+Golden-output test for the in-process email renderer: the precompiled templates
+filled by main.py must produce byte-for-byte the HTML that the React Email
+components render for the same props.
+
+The expected HTML is generated by email-render-function (yarn build:fixtures) and
+committed next to cases.json; a case without it fails. The templates are build
+output (yarn build:templates), so the tests skip where they haven't been built.
+"""
+import json
+import os
+
+import pytest
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'email')
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'email_templates')
+
+with open(os.path.join(FIXTURES_DIR, 'cases.json'), 'r', encoding='utf-8') as f:
+    CASES = json.load(f)
+
+
+@pytest.fixture(scope='module')
+def templates(main_module):
+    if not os.path.exists(os.path.join(TEMPLATES_DIR, 'manifest.json')):
+        pytest.skip('email templates not built; run yarn build:templates in email-render-function')
+    main_module.EMAIL_TEMPLATES_DIR = TEMPLATES_DIR
+    main_module.LOCAL_EMAIL_RENDER_ENABLED = True
+    main_module._email_templates = None
+    assert main_module.load_email_templates() is not None
+    return main_module
+
+
+@pytest.mark.parametrize('case', CASES, ids=[case['name'] for case in CASES])
+def test_local_render_matches_react_render(templates, case):
+    expected_path = os.path.join(FIXTURES_DIR, f"{case['name']}.html")
+    assert os.path.exists(expected_path), (
+        f"golden output {case['name']}.html missing; run yarn build:fixtures in email-render-function "
+        "and commit functions/tests/fixtures/email"
+    )
+    with open(expected_path, 'rb') as f:
+        expected = f.read()
+
+    if case['kind'] == 'alert':
+        html = templates.render_alert_email_locally(case['props'])
+    else:
+        html = templates.render_digest_email_locally(case['props'])
+
+    assert html is not None, 'local renderer declined props the templates should cover'
+    assert html.encode('utf-8') == expected
+
+
+def test_digest_render_cache_reuses_cards(templates):
+    case = next(case for case in CASES if case['name'] == 'digest_weekly_many')
+    render_cache = {}
+    first = templates.render_digest_email_locally(case['props'], render_cache)
+    second = templates.render_digest_email_locally(case['props'], render_cache)
+    assert 'cards_html' in render_cache
+    assert first == second
@@ -0,0 +1,720 @@
+"""
+Checks every FIELD_PROJECTIONS call site in main.py: the query is restricted to the
+projection its key names, and the consumer of the results doesn't read a field the
+projection drops.
+
+Each call site is driven through an in-memory Firestore fake that records select() and
+get_all(field_paths=...) arguments. It runs twice, once returning projected documents
+and once returning full documents, and the two runs must produce the same output
+(return value, Firestore writes, responses). A consumer reading a dropped field sees
+None in the projected run and diverges. The admin listings pass documents through to
+the dashboard, so their reference run returns the fields the dashboard reads instead.
+"""
+import ast
+import json
+import os
+import types
+from datetime import datetime, timedelta
+
+import pytest
+
+FUNCTIONS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN_PATH = os.path.join(FUNCTIONS_DIR, 'main.py')
+SUBSCRIPTIONS_TABLE_PATH = os.path.join(
+    FUNCTIONS_DIR, '..', 'frontend', 'src', 'components', 'SubscriptionsTable.tsx'
+)
+
+FIXED_NOW = datetime(2026, 10, 19, 12, 0, 0)
+
+
+# -- Static: every call site is known and covered below -----------------------------
+
+# (enclosing function, projection key) for every FIELD_PROJECTIONS use in main.py.
+# Adding a call site means adding it here and a case in CALL_SITE_CASES.
+COVERED_CALL_SITES = {
+    ('get_active_subscriptions', 'active_subscriptions'),
+    ('suppress_recipient_subscriptions', 'recipient_subscriptions'),
+    ('drain_notification_outbox', 'references'),
+    ('read_recipient_index', 'subscription_filters'),
+    ('get_compacted_notifications_total', 'ingestion_run_totals'),
+    ('continue_notifications_reconciliation', 'ingestion_run_totals'),
+    ('compact_run_collection', 'ingestion_runs_compaction'),
+    ('compact_run_collection', 'digest_runs_compaction'),
+    ('compact_run_collection', 'references'),
+    ('build_archived_listing', 'listing_archive'),
+    ('archive_old_listings', 'listing_archive'),
+    ('get_day_listing_summaries', 'listing_summary'),
+    ('update_listing_rollups', 'references'),
+    ('get_subscriptions_for_digest', 'digest_subscriptions'),
+    ('process_digest_shard', 'digest_subscriptions'),
+    ('get_all_subscriptions', 'admin_subscriptions'),
+    ('get_pending_verifications', 'admin_subscriptions'),
+    ('admin_bulk_subscription_action', 'admin_action_state'),
+    ('admin_backfill_digest_schedule', 'digest_schedule'),
+    ('admin_backfill_recipient_index', 'recipient_index'),
+}
+
+
+def parse_main():
+    with open(MAIN_PATH, 'r', encoding='utf-8') as f:
+        return ast.parse(f.read())
+
+
+def get_module_literal(tree, name):
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(t, 'id', None) == name for t in node.targets):
+            return ast.literal_eval(node.value)
+    raise AssertionError(f'{name} not found in main.py')
+
+
+def walk_function_body(function):
+    """Nodes of a function, excluding nested functions (they are visited on their own)"""
+    pending = list(function.body)
+    while pending:
+        node = pending.pop()
+        yield node
+        if not isinstance(node, (ast.FunctionDef, ast.Lambda)):
+            pending.extend(ast.iter_child_nodes(node))
+
+
+def find_projection_call_sites(tree):
+    """(enclosing function, projection key) for each select_fields / FIELD_PROJECTIONS[...] use"""
+    compaction_keys = [f'{name}_compaction' for name in get_module_literal(tree, 'RUN_COMPACTION_SPECS')]
+    sites = set()
+    for function in ast.walk(tree):
+        if not isinstance(function, ast.FunctionDef) or function.name == 'select_fields':
+            continue
+        for node in walk_function_body(function):
+            key_node = None
+            if isinstance(node, ast.Call) and getattr(node.func, 'id', None) == 'select_fields':
+                key_node = node.args[1]
+            elif isinstance(node, ast.Subscript) and getattr(node.value, 'id', None) == 'FIELD_PROJECTIONS':
+                key_node = node.slice
+            if key_node is None:
+                continue
+            if isinstance(key_node, ast.Constant):
+                sites.add((function.name, key_node.value))
+            elif isinstance(key_node, ast.JoinedStr):
+                # f"{collection_name}_compaction" in compact_run_collection
+                sites.update((function.name, key) for key in compaction_keys)
+            else:
+                raise AssertionError(f'Unrecognised projection key in {function.name}: {ast.dump(key_node)}')
+    return sites
+
+
+def dashboard_fields():
+    with open(SUBSCRIPTIONS_TABLE_PATH, 'r', encoding='utf-8') as f:
+        interface = f.read().split('export interface Subscription {', 1)[1].split('}', 1)[0]
+    return {line.strip().split(':')[0].rstrip('?') for line in interface.splitlines() if ':' in line}
+
+
+def test_every_projection_call_site_is_covered():
+    tree = parse_main()
+    projections = get_module_literal(tree, 'FIELD_PROJECTIONS')
+    sites = find_projection_call_sites(tree)
+
+    assert {key for _, key in sites} <= set(projections), 'select_fields called with an unknown projection key'
+    assert set(projections) <= {key for _, key in sites}, 'FIELD_PROJECTIONS has unused keys'
+    assert sites == COVERED_CALL_SITES
+
+
+def test_admin_projection_covers_dashboard_fields():
+    """The admin tables render the Subscription interface of SubscriptionsTable.tsx"""
+    projections = get_module_literal(parse_main(), 'FIELD_PROJECTIONS')
+    assert dashboard_fields() - {'id'} <= set(projections['admin_subscriptions'])
+
+
+# -- In-memory Firestore ---------------------------------------------------------------
+
+def project(data, field_paths):
+    """Keep only field_paths (dotted for nested fields) of a document, like select()"""
+    if field_paths is None:
+        return dict(data)
+    projected = {}
+    for field_path in field_paths:
+        source, target = data, projected
+        parts = field_path.split('.')
+        for part in parts[:-1]:
+            if not isinstance(source.get(part), dict):
+                break
+            source = source[part]
+            target = target.setdefault(part, {})
+        else:
+            if parts[-1] in source:
+                target[parts[-1]] = source[parts[-1]]
+    return projected
+
+
+class FakeSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+    def get(self, field):
+        return self._data.get(field)
+
+
+class FakeDocumentRef:
+    def __init__(self, db, path):
+        self._db = db
+        self.path = path
+        self.id = path.rsplit('/', 1)[-1]
+
+    def collection(self, name):
+        return FakeQuery(self._db, f'{self.path}/{name}')
+
+    def get(self, field_paths=None, transaction=None):
+        data = self._db.documents.get(self.path)
+        if data is not None:
+            data = project(data, self._db.get_returned_fields(field_paths))
+        return FakeSnapshot(self, data)
+
+    def set(self, data, merge=False):
+        self._db.writes.append(('set', self.path, data, merge))
+
+    def update(self, data):
+        self._db.writes.append(('update', self.path, data))
+
+    def create(self, data):
+        self._db.writes.append(('create', self.path, data))
+
+    def delete(self):
+        self._db.writes.append(('delete', self.path))
+
+    def __eq__(self, other):
+        return isinstance(other, FakeDocumentRef) and other.path == self.path
+
+    def __hash__(self):
+        return hash(self.path)
+
+
+def get_field(data, field_path):
+    for part in field_path.split('.'):
+        if not isinstance(data, dict) or part not in data:
+            return KeyError
+        data = data[part]
+    return data
+
+
+def matches_filter(data, field_filter):
+    op = getattr(field_filter.op_string, 'name', field_filter.op_string)
+    value = get_field(data, field_filter.field_path)
+    if op == 'IS_NULL':
+        return value is None
+    if op == 'IS_NOT_NULL':
+        return value is not KeyError and value is not None
+    if value is KeyError or value is None:
+        return False
+    if op == '==':
+        return value == field_filter.value
+    if op == 'in':
+        return value in field_filter.value
+    if op == 'array_contains':
+        return field_filter.value in value
+    compare = {'<': value.__lt__, '<=': value.__le__, '>': value.__gt__, '>=': value.__ge__}[op]
+    return compare(field_filter.value)
+
+
+class FakeQuery:
+    def __init__(self, db, collection_path, filters=(), orders=(), limit=None, start_after=None):
+        self._db = db
+        self._path = collection_path
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+        self._limit = limit
+        self._start_after = start_after
+        self._field_paths = None
+
+    def _copy(self, **changes):
+        query = FakeQuery(self._db, self._path, self._filters, self._orders, self._limit, self._start_after)
+        query._field_paths = self._field_paths
+        for name, value in changes.items():
+            setattr(query, f'_{name}', value)
+        return query
+
+    def document(self, document_id):
+        return FakeDocumentRef(self._db, f'{self._path}/{document_id}')
+
+    def where(self, filter):
+        return self._copy(filters=self._filters + (filter,))
+
+    def order_by(self, field, direction='ASCENDING'):
+        return self._copy(orders=self._orders + ((field, direction),))
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def start_after(self, cursor):
+        return self._copy(start_after=cursor)
+
+    def select(self, field_paths):
+        self._db.selects.append((self._path, list(field_paths)))
+        return self._copy(field_paths=list(field_paths))
+
+    def _sort_key(self, doc_id, data):
+        return tuple(doc_id if field == '__name__' else get_field(data, field) for field, _ in self._orders)
+
+    def _cursor_key(self):
+        cursor = self._start_after
+        if isinstance(cursor, FakeSnapshot):
+            return self._sort_key(cursor.id, self._db.documents[cursor.reference.path])
+        return tuple(
+            cursor[field].id if field == '__name__' else cursor[field] for field, _ in self._orders
+        )
+
+    def _after_cursor(self, key, cursor_key):
+        for value, cursor_value, (_, direction) in zip(key, cursor_key, self._orders):
+            if value != cursor_value:
+                return value > cursor_value if direction == 'ASCENDING' else value < cursor_value
+        return False
+
+    def stream(self, transaction=None):
+        depth = self._path.count('/') + 1
+        results = []
+        for path in sorted(self._db.documents):
+            if not path.startswith(self._path + '/') or path.count('/') != depth:
+                continue
+            doc_id, data = path.rsplit('/', 1)[-1], self._db.documents[path]
+            if not all(matches_filter(data, f) for f in self._filters):
+                continue
+            if any(field != '__name__' and get_field(data, field) is KeyError for field, _ in self._orders):
+                continue
+            results.append((doc_id, path, data))
+        for field, direction in reversed(self._orders):
+            results.sort(
+                key=lambda r: r[0] if field == '__name__' else get_field(r[2], field),
+                reverse=direction == 'DESCENDING',
+            )
+        if self._start_after is not None:
+            cursor_key = self._cursor_key()
+            results = [r for r in results if self._after_cursor(self._sort_key(r[0], r[2]), cursor_key)]
+        if self._limit is not None:
+            results = results[:self._limit]
+        field_paths = self._db.get_returned_fields(self._field_paths)
+        return [FakeSnapshot(FakeDocumentRef(self._db, path), project(data, field_paths)) for _, path, data in results]
+
+    get = stream
+
+
+class FakeWriter:
+    """WriteBatch and Transaction: writes are recorded on commit (batches) or at once"""
+    def __init__(self, db, buffered):
+        self._db = db
+        self._buffered = buffered
+        self._writes = []
+
+    def _record(self, write):
+        (self._writes if self._buffered else self._db.writes).append(write)
+
+    def set(self, ref, data, merge=False):
+        self._record(('set', ref.path, data, merge))
+
+    def update(self, ref, data):
+        self._record(('update', ref.path, data))
+
+    def create(self, ref, data):
+        self._record(('create', ref.path, data))
+
+    def delete(self, ref):
+        self._record(('delete', ref.path))
+
+    def get(self, ref_or_query):
+        if isinstance(ref_or_query, FakeDocumentRef):
+            return iter([ref_or_query.get()])
+        return iter(ref_or_query.stream())
+
+    def commit(self):
+        self._db.writes.extend(self._writes)
+        self._writes = []
+
+
+class FakeFirestore:
+    """
+    apply_projections: return documents restricted to the select()/field_paths of the
+    read; otherwise restricted to reference_fields (None returns full documents)
+    """
+    def __init__(self, documents, apply_projections, reference_fields=None):
+        self.documents = documents
+        self.apply_projections = apply_projections
+        self.reference_fields = reference_fields
+        self.selects = []
+        self.writes = []
+
+    def get_returned_fields(self, field_paths):
+        return field_paths if self.apply_projections else self.reference_fields
+
+    def collection(self, name):
+        return FakeQuery(self, name)
+
+    def batch(self):
+        return FakeWriter(self, buffered=True)
+
+    def transaction(self):
+        return FakeWriter(self, buffered=False)
+
+    def get_all(self, refs, field_paths=None, transaction=None):
+        refs = list(refs)
+        if field_paths is not None and refs:
+            self.selects.append((refs[0].path.rsplit('/', 1)[0], list(field_paths)))
+        return [ref.get(field_paths=field_paths) for ref in refs]
+
+
+class FrozenDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return FIXED_NOW if tz is None else tz.localize(FIXED_NOW)
+
+
+class FakeRequest:
+    def __init__(self, method='GET', args=None, body=None):
+        self.method = method
+        self.args = args or {}
+        self.headers = {'Authorization': 'Bearer test'}
+        self._body = body
+
+    def get_json(self, silent=False):
+        return self._body
+
+
+# -- Fixture data ---------------------------------------------------------------------
+
+def utc(main, *args):
+    return main.pytz.utc.localize(datetime(*args))
+
+
+def build_documents(main):
+    """Full documents, including fields no projection selects"""
+    created = utc(main, 2026, 9, 1, 15, 30)
+    subscriptions = {
+        'sub_alice_rt': {
+            'type': 'EMAIL', 'email': 'Alice@Example.com', 'frequency': 'REAL_TIME',
+            'bedroomPreferences': ['B1', 'B2'], 'minPrice': 500, 'maxPrice': 1500,
+            'disabled': None, 'isVerified': True, 'verifiedAt': created, 'createdAt': created,
+            'updated_at': created, 'turnstileVerified': True,
+        },
+        'sub_hook': {
+            'type': 'WEBHOOK', 'webhookUrl': 'https://discord.com/api/webhooks/1/abc',
+            'frequency': 'REAL_TIME', 'bedroomPreferences': ['ANY'], 'minPrice': None, 'maxPrice': None,
+            'disabled': None, 'isVerified': True, 'createdAt': created + timedelta(days=1),
+            'updated_at': created,
+        },
+        'sub_carol_pending': {
+            'type': 'EMAIL', 'email': 'carol@example.com', 'frequency': 'REAL_TIME',
+            'bedroomPreferences': ['ANY'], 'minPrice': None, 'maxPrice': 1200,
+            'disabled': None, 'isVerified': False, 'createdAt': created + timedelta(days=2),
+            'updated_at': created,
+        },
+        'sub_alice_weekly': {
+            'type': 'EMAIL', 'email': 'alice@example.com', 'frequency': 'WEEKLY', 'sendTime': '09:00',
+            'bedroomPreferences': ['B1'], 'minPrice': None, 'maxPrice': 1000,
+            'disabled': None, 'isVerified': True, 'createdAt': created + timedelta(days=3),
+            'nextDigestDueAt': utc(main, 2026, 10, 19, 13, 0), 'lastDigestSentAt': utc(main, 2026, 10, 12, 13, 0),
+            'updated_at': created,
+        },
+        'sub_dave_daily': {
+            'type': 'EMAIL', 'email': 'dave@example.com', 'frequency': 'DAILY', 'sendTime': '08:00',
+            'bedroomPreferences': ['B2', 'B3'], 'minPrice': 800, 'maxPrice': None,
+            'disabled': None, 'isVerified': True, 'createdAt': created + timedelta(days=4),
+            'nextDigestDueAt': utc(main, 2026, 10, 19, 12, 0), 'lastDigestSentAt': utc(main, 2026, 10, 18, 12, 0),
+            'digestFailures': 1, 'updated_at': created,
+        },
+        'sub_erin_legacy_daily': {
+            'type': 'EMAIL', 'email': 'erin@example.com', 'frequency': 'DAILY', 'sendTime': '18:00',
+            'bedroomPreferences': ['ANY'], 'minPrice': None, 'maxPrice': None,
+            'disabled': None, 'isVerified': True, 'createdAt': created + timedelta(days=5),
+            'lastDigestSentAt': utc(main, 2026, 10, 19, 2, 0), 'updated_at': created,
+        },
+        'sub_frank_disabled': {
+            'type': 'EMAIL', 'email': 'frank@example.com', 'frequency': 'DAILY', 'sendTime': '08:00',
+            'bedroomPreferences': ['B1'], 'minPrice': None, 'maxPrice': None,
+            'disabled': created + timedelta(days=10), 'disabledReason': 'unsubscribed', 'isVerified': True,
+            'createdAt': created + timedelta(days=6), 'nextDigestDueAt': utc(main, 2026, 10, 18, 12, 0),
+            'updated_at': created,
+        },
+        'sub_alice_pending_variant': {
+            'type': 'EMAIL', 'email': 'ALICE@example.com', 'frequency': 'REAL_TIME',
+            'bedroomPreferences': ['B4'], 'minPrice': None, 'maxPrice': None,
+            'disabled': None, 'isVerified': False, 'createdAt': created + timedelta(days=7),
+            'updated_at': created,
+        },
+    }
+    documents = {f'subscriptions/{doc_id}': data for doc_id, data in subscriptions.items()}
+
+    for i, (bucket, price) in enumerate([('B1', 900), ('B2', 1400), ('B1', None)]):
+        documents[f'listings/old{i}'] = {
+            'listing_url': f'https://www.thecannon.ca/housing/old{i}', 'image_url': f'https://img/{i}.jpg',
+            'address': f'{i} Gordon St', 'description': 'Long scraped description', 'price_int': price,
+            'price_string': f'${price}' if price else 'Contact', 'bedroom_count': 1, 'bedroom_bucket': bucket,
+            'created_at': datetime(2026, 10, 17, 8 + i), 'updated_at': datetime(2026, 10, 17, 9),
+            'listing_id': f'old{i}', 'additional_details': {
+                'date_available': 'Nov 1', 'features': ['Laundry'], 'utilities': 'Included', 'lease': '12 months',
+            },
+        }
+
+    documents['listing_rollup_repairs/2026-10-17'] = {'day': '2026-10-17', 'failed_at': datetime(2026, 10, 17, 21)}
+
+    for i in range(3):
+        documents[f'ingestion_runs/run{i}'] = {
+            'timestamp': datetime(2026, 9, 1 + i, 10), 'duration_seconds': 20 + i, 'new_listings_count': i,
+            'notifications_sent': 3 * i, 'notification_errors': i % 2, 'listing_ids': ['x', 'y'],
+        }
+        documents[f'run_rollups/ingestion_daily_2026-08-0{i + 1}'] = {
+            'kind': 'ingestion', 'granularity': 'daily', 'period': f'2026-08-0{i + 1}',
+            'notifications_sent': 10 + i, 'runs': 4, 'duration_histogram': {'lt_30s': 4},
+        }
+    documents['digest_runs/drun0'] = {
+        'timestamp': datetime(2026, 9, 2, 9), 'shard_seconds': 40.5, 'sent': 12, 'errors': 1,
+        'subscribers': 13, 'signatures': ['DAILY:abc'], 'shards_completed': 2,
+    }
+    documents['digest_runs/drun0/shards/0'] = {'shard': 0, 'sent': 6, 'errors': 0}
+    documents['digest_runs/drun0/shards/1'] = {'shard': 1, 'sent': 6, 'errors': 1}
+
+    for i, status in enumerate(['PENDING', 'SENDING', 'SENT']):
+        documents[f'notification_outbox/entry{i}'] = {
+            'status': status, 'next_attempt_at': datetime(2026, 10, 19, 11, i), 'recipient_key': 'EMAIL:x',
+            'listing_id': 'old0', 'subscription': {'type': 'EMAIL', 'email': 'x'}, 'attempts': 0,
+        }
+
+    alice_index = main.get_recipient_index_ref(FakeFirestore({}, apply_projections=True), 'EMAIL:alice@example.com')
+    documents[alice_index.path] = {
+        'recipient_key': 'EMAIL:alice@example.com', 'seeded': True, 'subscriptions': {
+            doc_id: main.build_recipient_index_entry(subscriptions[doc_id])
+            for doc_id in ('sub_alice_rt', 'sub_alice_weekly', 'sub_alice_pending_variant')
+        },
+    }
+    return documents
+
+
+# -- Call sites -----------------------------------------------------------------------
+# Each case drives the consumer of one or more call sites and returns its output; the
+# expected projections are (collection path, projection key or explicit field list).
+
+def run_active_subscriptions(main, db, calls):
+    listing = {'listing_url': 'https://www.thecannon.ca/housing/new1', 'price_int': 900, 'bedroom_bucket': 'B1'}
+    return main.enqueue_notifications_for_listing(listing)
+
+
+def run_outbox_drain(main, db, calls):
+    def claim(transaction, entry_ref):
+        calls.append(entry_ref.path)
+        return None
+    main.claim_outbox_entry = claim
+    return main.drain_notification_outbox(max_workers=1)
+
+
+def run_read_recipient_index(main, db, calls):
+    # Unseeded index: the entries are seeded from the exact-match subscriptions query
+    _, entries = main.read_recipient_index(db, {'type': 'EMAIL', 'email': 'dave@example.com'})
+    return entries
+
+
+def run_suppress_recipient(main, db, calls):
+    main.increment_stats = lambda **deltas: calls.append(deltas)
+    return main.suppress_recipient_subscriptions({'type': 'EMAIL', 'email': 'alice@example.com'}, 'bounced')
+
+
+def run_compacted_notifications_total(main, db, calls):
+    return main.get_compacted_notifications_total(use_aggregation=False)
+
+
+def run_notifications_reconciliation(main, db, calls):
+    return main.continue_notifications_reconciliation(chunk_size=2, max_chunks=3)
+
+
+def run_compaction(main, db, calls):
+    return [
+        main.compact_run_collection('ingestion_runs', datetime(2026, 10, 1)),
+        main.compact_run_collection('digest_runs', datetime(2026, 10, 1)),
+    ]
+
+
+def run_archive(main, db, calls):
+    return main.archive_old_listings(cutoff=datetime(2026, 10, 18))
+
+
+def run_listing_rollup_seed(main, db, calls):
+    rollup_ref = db.collection('listing_rollups').document('2026-10-17')
+    summary = main.build_listing_summary('new1', {'price_int': 700, 'bedroom_bucket': 'B1'}, datetime(2026, 10, 17, 20))
+    return main.merge_listing_rollup.to_wrap(
+        db.transaction(), rollup_ref, db.collection('listings'), '2026-10-17', [summary]
+    )
+
+
+def run_listing_rollup_repair(main, db, calls):
+    main.merge_listing_rollup = getattr(main.merge_listing_rollup, 'to_wrap', main.merge_listing_rollup)
+    created_at = datetime(2026, 10, 18, 7)
+    return main.update_listing_rollups([('new2', {'price_int': 1100, 'bedroom_bucket': 'B2'}, created_at)])
+
+
+def run_listing_rollups_read(main, db, calls):
+    rollup = main.get_listing_rollups_since(datetime(2026, 10, 17, 9))
+    assert db.writes == []
+    return rollup
+
+
+def describe_subscription(subscription):
+    return (
+        subscription.id, subscription.to_dict(), subscription.next_digest_due_at, subscription.digest_failures,
+        subscription.recipient_key, subscription.filter_signature, subscription.unsubscribe_url,
+    )
+
+
+def run_digest_query(main, db, calls):
+    subscriptions, cursor = main.get_subscriptions_for_digest(limit=10)
+    return [describe_subscription(s) for s in subscriptions], cursor
+
+
+def run_digest_shard(main, db, calls):
+    def send_digest_page(subscriptions, rollups):
+        calls.extend(describe_subscription(s) for s in subscriptions)
+        return len(subscriptions), 0, {f'{s.frequency}:{s.filter_signature}' for s in subscriptions}
+    main.send_digest_page = send_digest_page
+    main.get_digest_rollups = lambda window_end: {}
+    main.finalize_sharded_digest_run = lambda transaction, run_ref, checkpoint_ref, run_id: None
+    return main.process_digest_shard({
+        'run_id': 'drun1', 'shard': 0, 'window_end': FIXED_NOW.isoformat(),
+        'subscription_ids': ['sub_alice_weekly', 'sub_dave_daily', 'sub_frank_disabled'],
+    })
+
+
+def read_admin_response(response):
+    """Response body restricted to what the dashboard reads (the Subscription interface)"""
+    body = json.loads(response.get_data(as_text=True))
+    fields = dashboard_fields()
+    body['subscriptions'] = [
+        {field: value for field, value in subscription.items() if field in fields}
+        for subscription in body.get('subscriptions', [])
+    ]
+    return response.status_code, body
+
+
+def run_admin_listing(main, db, calls):
+    return [
+        read_admin_response(main.get_all_subscriptions.__wrapped__(FakeRequest(args={'page_size': '3'}))),
+        read_admin_response(main.get_all_subscriptions.__wrapped__(
+            FakeRequest(args={'page_size': '3', 'cursor': 'sub_carol_pending'})
+        )),
+        read_admin_response(main.get_all_subscriptions.__wrapped__(FakeRequest(args={'status': 'disabled'}))),
+        read_admin_response(main.get_all_subscriptions.__wrapped__(
+            FakeRequest(args={'status': 'active', 'page_size': '2', 'exclude_unverified': 'true'})
+        )),
+        read_admin_listing_with_one_fetch(main),
+    ]
+
+
+def read_admin_listing_with_one_fetch(main):
+    """A page left short by the fetch cap ends with a cursor after the last document read"""
+    main.ADMIN_PAGE_MAX_FETCHES = 1
+    status, body = read_admin_response(main.get_all_subscriptions.__wrapped__(
+        FakeRequest(args={'status': 'active', 'page_size': '1', 'exclude_unverified': 'true'})
+    ))
+    assert body['next_cursor'] is not None and len(body['subscriptions']) <= 1
+    return status, body
+
+
+def run_pending_verifications(main, db, calls):
+    main.get_stats_totals = lambda use_cache=True: {'pending_verifications': 2, 'pending_verifications_seeded': True}
+    return read_admin_response(main.get_pending_verifications.__wrapped__(FakeRequest(args={'page_size': '1'})))
+
+
+def run_bulk_action(main, db, calls):
+    main.increment_stats = lambda **deltas: calls.append(deltas)
+    response = main.admin_bulk_subscription_action.__wrapped__(FakeRequest('POST', body={
+        'action': 'disable', 'subscription_ids': ['sub_alice_rt', 'sub_carol_pending', 'missing'],
+    }))
+    return response.status_code, json.loads(response.get_data(as_text=True))
+
+
+def run_digest_schedule_backfill(main, db, calls):
+    response = main.admin_backfill_digest_schedule.__wrapped__(FakeRequest('POST', body={'force': True}))
+    return response.status_code, json.loads(response.get_data(as_text=True))
+
+
+def run_recipient_index_backfill(main, db, calls):
+    response = main.admin_backfill_recipient_index.__wrapped__(FakeRequest('POST'))
+    return response.status_code, json.loads(response.get_data(as_text=True))
+
+
+CALL_SITE_CASES = {
+    'active_subscriptions': (run_active_subscriptions, [('subscriptions', 'active_subscriptions')]),
+    'outbox_drain': (run_outbox_drain, [('notification_outbox', 'references')]),
+    'read_recipient_index': (run_read_recipient_index, [('subscriptions', 'subscription_filters')]),
+    'suppress_recipient': (run_suppress_recipient, [('subscriptions', 'recipient_subscriptions')]),
+    'compacted_notifications_total': (run_compacted_notifications_total, [('run_rollups', 'ingestion_run_totals')]),
+    'notifications_reconciliation': (run_notifications_reconciliation, [
+        ('ingestion_runs', 'ingestion_run_totals'),
+        ('ingestion_runs', 'ingestion_run_totals'),
+        ('run_rollups', 'ingestion_run_totals'),
+    ]),
+    'compaction': (run_compaction, [
+        ('ingestion_runs', 'ingestion_runs_compaction'),
+        ('digest_runs', 'digest_runs_compaction'),
+        ('digest_runs/drun0/shards', 'references'),
+    ]),
+    'archive': (run_archive, [('listings', 'listing_archive')]),
+    'listing_rollup_seed': (run_listing_rollup_seed, [('listings', 'listing_summary')]),
+    'listing_rollup_repair': (run_listing_rollup_repair, [
+        ('listing_rollup_repairs', 'references'),
+        ('listings', 'listing_summary'),
+        ('listings', 'listing_summary'),
+    ]),
+    'listing_rollups_read': (run_listing_rollups_read, [('listings', 'listing_summary')] * 3),
+    'digest_query': (run_digest_query, [('subscriptions', 'digest_subscriptions')]),
+    'digest_shard': (run_digest_shard, [('subscriptions', ('digest_subscriptions', 'disabled'))]),
+    'admin_listing': (run_admin_listing, [('subscriptions', 'admin_subscriptions')] * 5),
+    'pending_verifications': (run_pending_verifications, [('subscriptions', 'admin_subscriptions')]),
+    'bulk_action': (run_bulk_action, [('subscriptions', 'admin_action_state')]),
+    'digest_schedule_backfill': (run_digest_schedule_backfill, [('subscriptions', 'digest_schedule')]),
+    'recipient_index_backfill': (run_recipient_index_backfill, [('subscriptions', 'recipient_index')]),
+}
+
+
+@pytest.fixture
+def main(main_module, monkeypatch):
+    """main with a frozen clock, admin auth passed and no stats writes; runners patch more"""
+    for name in ('claim_outbox_entry', 'merge_listing_rollup', 'send_digest_page', 'get_digest_rollups', 'finalize_sharded_digest_run',
+                 'get_stats_totals', 'get_firestore_client', 'ADMIN_PAGE_MAX_FETCHES'):
+        monkeypatch.setattr(main_module, name, getattr(main_module, name))
+    monkeypatch.setattr(main_module, 'datetime', FrozenDatetime)
+    monkeypatch.setattr(main_module, 'time', types.SimpleNamespace(
+        time=lambda: FIXED_NOW.timestamp(), monotonic=lambda: 0.0, sleep=lambda seconds: None,
+    ))
+    monkeypatch.setattr(main_module, 'verify_admin_token', lambda req: {'success': True, 'user': {}})
+    monkeypatch.setattr(main_module, 'increment_stats', lambda **deltas: None)
+    return main_module
+
+
+# Cases whose consumer is the admin dashboard: the reference run returns the dashboard's fields
+DASHBOARD_CASES = ('admin_listing', 'pending_verifications')
+
+
+def run_call_site(main, runner, apply_projections, reference_fields=None):
+    db = FakeFirestore(build_documents(main), apply_projections, reference_fields)
+    main.get_firestore_client = lambda: db
+    calls = []
+    output = runner(main, db, calls)
+    return db, (output, calls, db.writes)
+
+
+@pytest.mark.parametrize('case', sorted(CALL_SITE_CASES))
+def test_projection_matches_consumer(main, case):
+    runner, expected_selects = CALL_SITE_CASES[case]
+
+    projected_db, projected_output = run_call_site(main, runner, apply_projections=True)
+    reference_fields = sorted(dashboard_fields() - {'id'}) if case in DASHBOARD_CASES else None
+    _, reference_output = run_call_site(main, runner, apply_projections=False, reference_fields=reference_fields)
+
+    expected = []
+    for collection, key in expected_selects:
+        if isinstance(key, tuple):
+            key, *extra_fields = key
+            expected.append((collection, main.FIELD_PROJECTIONS[key] + extra_fields))
+        else:
+            expected.append((collection, main.FIELD_PROJECTIONS[key]))
+    assert projected_db.selects == expected
+    assert projected_output == reference_output